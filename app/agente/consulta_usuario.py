@@ -7,4 +7,12 @@ def consulta_usuario(state: StateSchema):
     historial = state.get("historial_formateado", [])
     
     stream = asistente_rag.responder_consulta(contexto, historial, pregunta,"consulta")
-    return {"stream": stream}
\ No newline at end of file
+    return {"stream": stream, "ruta": "entrevistador"}
+
+async def aconsulta_usuario(state: StateSchema):
+    contexto = state.get("contexto", "")
+    pregunta = state.get("pregunta_reformulada", "")
+    historial = state.get("historial_formateado", [])
+    
+    stream = asistente_rag.aresponder_consulta(contexto, historial, pregunta,"consulta")
+    return {"stream": stream, "ruta": "entrevistador"}
@@ -0,0 +1,29 @@
+import time
+from classes.StateSchema import StateSchema
+from services.rag import asistente_rag
+
+def detector(state: StateSchema):
+    inicio = time.perf_counter()
+    
+    pregunta = state.get("pregunta", "")
+    historial = state.get("historial_formateado", [])
+    
+    intencion = asistente_rag.decide_ruta_inicial(pregunta, historial)
+    
+    return {
+        "intencion": intencion,
+        "tiempos": {"deteccion": time.perf_counter() - inicio}
+    }
+
+async def adetector(state: StateSchema):
+    inicio = time.perf_counter()
+    
+    pregunta = state.get("pregunta", "")
+    historial = state.get("historial_formateado", [])
+    
+    intencion = await asistente_rag.adecide_ruta_inicial(pregunta, historial)
+    
+    return {
+        "intencion": intencion,
+        "tiempos": {"deteccion": time.perf_counter() - inicio}
+    }
@@ -1,12 +1,7 @@
-import datetime
 from classes.StateSchema import StateSchema
-from services.rag import AsistenteRAG
-
-rag = AsistenteRAG()
+from services.rag import asistente_rag as rag, CATEGORIAS_VALIDAS
 
 def decide_ruta_inicial(state: StateSchema) -> str:
-    print("\n--- EDGE: DECIDIENDO INTENCIÓN ---", datetime.datetime.now())
-    
     pregunta = state.get("pregunta", "")
     historial = state.get("historial_formateado", [])
     
@@ -14,34 +9,66 @@ def decide_ruta_inicial(state: StateSchema) -> str:
     
     return decision
 
-def decide_suficiente_informacion(state: StateSchema) -> str:
-    print("\n--- EDGE: DECIDIENDO SIGUIENTE PASO ---", datetime.datetime.now())
+async def adecide_ruta_inicial(state: StateSchema) -> str:
+    pregunta = state.get("pregunta", "")
+    historial = state.get("historial_formateado", [])
     
+    return await rag.adecide_ruta_inicial(pregunta, historial)
+
+def decide_suficiente_informacion(state: StateSchema) -> str:
     pregunta_reformulada = state.get("pregunta_reformulada", "")
     historial = state.get("historial_formateado", [])
     contexto = state.get("contexto", "")
     
     decision = rag.contiene_suficiente_informacion(pregunta_reformulada, historial, contexto)
     
-    print(f"Decisión tomada: ir a nodo '{decision}'", datetime.datetime.now())
-    
     return decision
-        
-def decide_respuesta(state: StateSchema) -> str:
-    print("\n--- EDGE: DECIDIENDO TIPO DE RESPUESTA ---", datetime.datetime.now())
+
+async def adecide_suficiente_informacion(state: StateSchema) -> str:
+    pregunta_reformulada = state.get("pregunta_reformulada", "")
+    historial = state.get("historial_formateado", [])
+    contexto = state.get("contexto", "")
+    
+    return await rag.acontiene_suficiente_informacion(pregunta_reformulada, historial, contexto)
+
+def _categoria_valida(decision: str) -> str:
+    decision_limpia = decision.strip().lower()
     
+    if decision_limpia not in CATEGORIAS_VALIDAS:
+        decision_limpia = "normativo"
+    
+    return decision_limpia
+
+def decide_respuesta(state: StateSchema) -> str:
     pregunta_reformulada = state.get("pregunta_reformulada", state.get("pregunta", ""))
     historial = state.get("historial_formateado", [])
     contexto = state.get("contexto", "")
     
     decision = rag.clasificar_categoria(pregunta_reformulada, historial,contexto)
     
-    decision_limpia = decision.strip().lower()
+    return _categoria_valida(decision)
+
+async def adecide_respuesta(state: StateSchema) -> str:
+    pregunta_reformulada = state.get("pregunta_reformulada", state.get("pregunta", ""))
+    historial = state.get("historial_formateado", [])
+    contexto = state.get("contexto", "")
     
-    categorias_validas = ["procedimental", "calendario", "normativo", "baremo"]
-    if decision_limpia not in categorias_validas:
-        decision_limpia = "normativo"
+    decision = await rag.aclasificar_categoria(pregunta_reformulada, historial, contexto)
     
-    print(f"Pregunta clasificada como: '{decision_limpia}'", datetime.datetime.now())
+    return _categoria_valida(decision)
+
+def decide_ruta_unificada(state: StateSchema) -> str:
+    return state.get("ruta", "normativo")
+
+
+def decide_tras_sincronizar(state: StateSchema) -> str:
+    if state.get("intencion") == "rechazo_amable":
+        return "rechazo_amable"
+    
+    return decide_suficiente_informacion(state)
+
+async def adecide_tras_sincronizar(state: StateSchema) -> str:
+    if state.get("intencion") == "rechazo_amable":
+        return "rechazo_amable"
     
-    return decision_limpia
\ No newline at end of file
+    return await adecide_suficiente_informacion(state)
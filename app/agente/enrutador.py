@@ -0,0 +1,22 @@
+from classes.StateSchema import StateSchema
+from services.rag import asistente_rag
+
+def enrutador(state: StateSchema):
+    pregunta = state.get("pregunta", "")
+    pregunta_reformulada = state.get("pregunta_reformulada", pregunta)
+    historial = state.get("historial_formateado", [])
+    contexto = state.get("contexto", "")
+    
+    ruta = asistente_rag.enrutar(pregunta, pregunta_reformulada, historial, contexto)
+    
+    return {"ruta": ruta}
+
+async def aenrutador(state: StateSchema):
+    pregunta = state.get("pregunta", "")
+    pregunta_reformulada = state.get("pregunta_reformulada", pregunta)
+    historial = state.get("historial_formateado", [])
+    contexto = state.get("contexto", "")
+    
+    ruta = await asistente_rag.aenrutar(pregunta, pregunta_reformulada, historial, contexto)
+    
+    return {"ruta": ruta}
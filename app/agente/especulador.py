@@ -0,0 +1,51 @@
+from classes.StateSchema import StateSchema
+from services.rag import asistente_rag
+from services.trazas import trazador
+
+def especulador(state: StateSchema):
+    if state.get("intencion") == "rechazo_amable":
+        return {"especulacion": None}
+
+    contexto = state.get("contexto", "")
+    pregunta = state.get("pregunta_reformulada", "")
+    historial = state.get("historial_formateado", [])
+
+    return {"especulacion": asistente_rag.especular_respuesta(contexto, historial, pregunta)}
+
+async def aespeculador(state: StateSchema):
+    if state.get("intencion") == "rechazo_amable":
+        return {"especulacion": None}
+
+    contexto = state.get("contexto", "")
+    pregunta = state.get("pregunta_reformulada", "")
+    historial = state.get("historial_formateado", [])
+
+    return {"especulacion": asistente_rag.aespecular_respuesta(contexto, historial, pregunta)}
+
+def _reclamar(state: StateSchema, ruta: str):
+    especulacion = state.get("especulacion")
+    if especulacion is None:
+        return None
+
+    if especulacion.coincide(ruta, state.get("pregunta_reformulada", ""), state.get("contexto", "")):
+        trazador.aviso(f"Respuesta especulativa aprovechada: {ruta}")
+        return especulacion
+
+    especulacion.cancelar()
+    trazador.aviso(f"Respuesta especulativa descartada: {especulacion.categoria} frente a {ruta}")
+    return None
+
+def con_especulacion(ruta: str, nodo, anodo):
+    def envuelto(state: StateSchema):
+        especulacion = _reclamar(state, ruta)
+        if especulacion is None:
+            return nodo(state)
+        return {"stream": especulacion.liberar(), "ruta": ruta}
+
+    async def aenvuelto(state: StateSchema):
+        especulacion = _reclamar(state, ruta)
+        if especulacion is None:
+            return await anodo(state)
+        return {"stream": especulacion.aliberar(), "ruta": ruta}
+
+    return envuelto, aenvuelto
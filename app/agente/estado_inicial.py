@@ -1,9 +1,31 @@
+from services.rag import asistente_rag
+
 def estado_inicial(state):
     historial = state.get("historial", [])
     
-    if historial:
-        historial_formateado = "\n".join([f"{msg['role']}: {msg['content']}" for msg in historial])
+    historial_formateado, resumen, mensajes_resumidos = asistente_rag.preparar_historial(
+        historial,
+        state.get("resumen_historial", ""),
+        state.get("mensajes_resumidos", 0)
+    )
     
     return {
         "historial_formateado": historial_formateado,
-    }
\ No newline at end of file
+        "resumen_historial": resumen,
+        "mensajes_resumidos": mensajes_resumidos,
+    }
+
+async def aestado_inicial(state):
+    historial = state.get("historial", [])
+    
+    historial_formateado, resumen, mensajes_resumidos = await asistente_rag.apreparar_historial(
+        historial,
+        state.get("resumen_historial", ""),
+        state.get("mensajes_resumidos", 0)
+    )
+    
+    return {
+        "historial_formateado": historial_formateado,
+        "resumen_historial": resumen,
+        "mensajes_resumidos": mensajes_resumidos,
+    }
@@ -7,4 +7,12 @@ def rechazo_amable(state: StateSchema):
     historial = state.get("historial_formateado", [])
     
     stream = asistente_rag.responder_consulta(contexto, historial, pregunta,"rechazo")
-    return {"stream": stream}
\ No newline at end of file
+    return {"stream": stream, "ruta": "rechazo_amable"}
+
+async def arechazo_amable(state: StateSchema):
+    contexto = state.get("contexto", "")
+    pregunta = state.get("pregunta_reformulada", "")
+    historial = state.get("historial_formateado", [])
+    
+    stream = asistente_rag.aresponder_consulta(contexto, historial, pregunta,"rechazo")
+    return {"stream": stream, "ruta": "rechazo_amable"}
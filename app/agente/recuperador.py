@@ -1,18 +1,36 @@
-import datetime
 from classes.StateSchema import StateSchema
 from services.rag import asistente_rag
 
 def recuperador(state: StateSchema):
-    print("\n--- NODO: RECUPERANDO CONTEXTO ---", datetime.datetime.now())
+    pregunta = state["pregunta"]
+    historial = state.get("historial_formateado", [])
+    
+    if state.get("pregunta_reformulada"):
+        pregunta_busqueda = state["pregunta_reformulada"]
+        contexto, referencias = asistente_rag.buscar_contexto(pregunta_busqueda)
+    else:
+        pregunta_busqueda, contexto, referencias = asistente_rag.insertar_contexto(pregunta, historial)
     
+    return {
+        "pregunta_reformulada": pregunta_busqueda,
+        "contexto": contexto,
+        "referencias": referencias,
+        "historial_formateado": historial
+    }
+
+async def arecuperador(state: StateSchema):
     pregunta = state["pregunta"]
     historial = state.get("historial_formateado", [])
     
-    pregunta_busqueda, contexto, referencias = asistente_rag.insertar_contexto(pregunta, historial)
+    if state.get("pregunta_reformulada"):
+        pregunta_busqueda = state["pregunta_reformulada"]
+        contexto, referencias = await asistente_rag.abuscar_contexto(pregunta_busqueda)
+    else:
+        pregunta_busqueda, contexto, referencias = await asistente_rag.ainsertar_contexto(pregunta, historial)
     
     return {
         "pregunta_reformulada": pregunta_busqueda,
         "contexto": contexto,
         "referencias": referencias,
         "historial_formateado": historial
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,25 @@
+import time
+from classes.StateSchema import StateSchema
+from services.rag import asistente_rag
+
+def recuperador_especulativo(state: StateSchema):
+    inicio = time.perf_counter()
+    
+    contexto, referencias = asistente_rag.buscar_contexto(state.get("pregunta", ""))
+    
+    return {
+        "contexto_especulativo": contexto,
+        "referencias_especulativas": referencias,
+        "tiempos": {"recuperacion_especulativa": time.perf_counter() - inicio}
+    }
+
+async def arecuperador_especulativo(state: StateSchema):
+    inicio = time.perf_counter()
+    
+    contexto, referencias = await asistente_rag.abuscar_contexto(state.get("pregunta", ""))
+    
+    return {
+        "contexto_especulativo": contexto,
+        "referencias_especulativas": referencias,
+        "tiempos": {"recuperacion_especulativa": time.perf_counter() - inicio}
+    }
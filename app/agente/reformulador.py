@@ -0,0 +1,29 @@
+import time
+from classes.StateSchema import StateSchema
+from services.rag import asistente_rag
+
+def reformulador(state: StateSchema):
+    inicio = time.perf_counter()
+    
+    pregunta = state.get("pregunta", "")
+    historial = state.get("historial_formateado", [])
+    
+    pregunta_reformulada = state.get("pregunta_reformulada") or asistente_rag.reformular_pregunta(pregunta, historial)
+    
+    return {
+        "pregunta_reformulada": pregunta_reformulada,
+        "tiempos": {"reformulacion": time.perf_counter() - inicio}
+    }
+
+async def areformulador(state: StateSchema):
+    inicio = time.perf_counter()
+    
+    pregunta = state.get("pregunta", "")
+    historial = state.get("historial_formateado", [])
+    
+    pregunta_reformulada = state.get("pregunta_reformulada") or await asistente_rag.areformular_pregunta(pregunta, historial)
+    
+    return {
+        "pregunta_reformulada": pregunta_reformulada,
+        "tiempos": {"reformulacion": time.perf_counter() - inicio}
+    }
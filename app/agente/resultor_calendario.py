@@ -6,5 +6,23 @@ def resultor_calendario(state: StateSchema):
     pregunta = state.get("pregunta_reformulada", "")
     historial = state.get("historial_formateado", [])
     
+    directa = asistente_rag.consultar_calendario(pregunta)
+    if directa:
+        respuesta, referencias = directa
+        return {"stream": asistente_rag.trocear(respuesta), "ruta": "calendario", "referencias": referencias}
+    
     stream = asistente_rag.responder_consulta(contexto, historial, pregunta,"calendario")
-    return {"stream": stream}
\ No newline at end of file
+    return {"stream": stream, "ruta": "calendario"}
+
+async def aresultor_calendario(state: StateSchema):
+    contexto = state.get("contexto", "")
+    pregunta = state.get("pregunta_reformulada", "")
+    historial = state.get("historial_formateado", [])
+    
+    directa = asistente_rag.consultar_calendario(pregunta)
+    if directa:
+        respuesta, referencias = directa
+        return {"stream": asistente_rag.atrocear(respuesta), "ruta": "calendario", "referencias": referencias}
+    
+    stream = asistente_rag.aresponder_consulta(contexto, historial, pregunta,"calendario")
+    return {"stream": stream, "ruta": "calendario"}
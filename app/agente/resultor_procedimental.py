@@ -7,4 +7,12 @@ def resultor_procedimental(state: StateSchema):
     historial = state.get("historial_formateado", [])
     
     stream = asistente_rag.responder_consulta(contexto, historial, pregunta,"procedimental")
-    return {"stream": stream}
\ No newline at end of file
+    return {"stream": stream, "ruta": "procedimental"}
+
+async def aresultor_procedimental(state: StateSchema):
+    contexto = state.get("contexto", "")
+    pregunta = state.get("pregunta_reformulada", "")
+    historial = state.get("historial_formateado", [])
+    
+    stream = asistente_rag.aresponder_consulta(contexto, historial, pregunta,"procedimental")
+    return {"stream": stream, "ruta": "procedimental"}
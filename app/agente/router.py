@@ -1,63 +1,160 @@
 from langgraph.graph import END, StateGraph, START
 from classes.StateSchema import StateSchema
-from agente.edges import decide_suficiente_informacion, decide_respuesta, decide_ruta_inicial
-from agente.consulta_usuario import consulta_usuario
-from agente.rechazo_amable import rechazo_amable
-from agente.resultor_procedimental import resultor_procedimental
-from agente.resultor_calendario import resultor_calendario
-from agente.resultor_normativo import resultor_normativo
-from agente.resultor_baremo import resultor_baremo
-from agente.recuperador import recuperador
-from agente.estado_inicial import estado_inicial
-
-graph = StateGraph(state_schema=StateSchema)
-
-graph.add_node("estado_inicial", estado_inicial)
-graph.add_node("recuperador", recuperador)
-graph.add_node("entrevistador", consulta_usuario)
-graph.add_node("rechazo_amable", rechazo_amable)
-graph.add_node("clasificador", lambda state: state) 
-graph.add_node("procedimental", resultor_procedimental)
-graph.add_node("calendario", resultor_calendario)
-graph.add_node("normativo", resultor_normativo)
-graph.add_node("baremo", resultor_baremo)
-
-graph.add_conditional_edges(
-    "estado_inicial",
-    decide_ruta_inicial,
-    {
-        "recuperador":"recuperador",
-        "rechazo_amable":"rechazo_amable"
-    }
-)
-
-graph.add_conditional_edges(
-    "recuperador", 
-    decide_suficiente_informacion,
-    {
-        "entrevistador": "entrevistador",
-        "resultor": "clasificador",
-    }
-)
-
-graph.add_conditional_edges(
-    "clasificador",
-    decide_respuesta,
-    {
-        "procedimental": "procedimental",
-        "calendario": "calendario",
-        "normativo": "normativo",
-        "baremo": "baremo"
-    }
-)
-
-graph.add_edge(START, "estado_inicial")
-graph.add_edge("entrevistador", END)
-graph.add_edge("rechazo_amable", END)
-graph.add_edge("procedimental", END)
-graph.add_edge("calendario", END)
-graph.add_edge("normativo", END)
-graph.add_edge("baremo", END)
-
-router = graph.compile()
-print(router.get_graph().draw_mermaid(), "\n\n")
\ No newline at end of file
+from agente.edges import decide_suficiente_informacion, decide_respuesta, decide_ruta_inicial, decide_ruta_unificada, decide_tras_sincronizar
+from agente.edges import adecide_suficiente_informacion, adecide_respuesta, adecide_ruta_inicial, adecide_tras_sincronizar
+from agente.consulta_usuario import consulta_usuario, aconsulta_usuario
+from agente.rechazo_amable import rechazo_amable, arechazo_amable
+from agente.resultor_procedimental import resultor_procedimental, aresultor_procedimental
+from agente.resultor_calendario import resultor_calendario, aresultor_calendario
+from agente.resultor_normativo import resultor_normativo, aresultor_normativo
+from agente.resultor_baremo import resultor_baremo, aresultor_baremo
+from agente.recuperador import recuperador, arecuperador
+from agente.enrutador import enrutador, aenrutador
+from agente.detector import detector, adetector
+from agente.reformulador import reformulador, areformulador
+from agente.recuperador_especulativo import recuperador_especulativo, arecuperador_especulativo
+from agente.sincronizador import sincronizador, asincronizador
+from agente.estado_inicial import estado_inicial, aestado_inicial
+from agente.especulador import especulador, aespeculador, con_especulacion
+from utils.config import settings
+from services.trazas import trazar_nodo, trazar_arista
+
+def _agregar_nodos_respuesta(graph: StateGraph):
+    graph.add_node("entrevistador", trazar_nodo("entrevistador", *con_especulacion("entrevistador", consulta_usuario, aconsulta_usuario)))
+    graph.add_node("rechazo_amable", trazar_nodo("rechazo_amable", *con_especulacion("rechazo_amable", rechazo_amable, arechazo_amable)))
+    graph.add_node("procedimental", trazar_nodo("procedimental", *con_especulacion("procedimental", resultor_procedimental, aresultor_procedimental)))
+    graph.add_node("calendario", trazar_nodo("calendario", *con_especulacion("calendario", resultor_calendario, aresultor_calendario)))
+    graph.add_node("normativo", trazar_nodo("normativo", *con_especulacion("normativo", resultor_normativo, aresultor_normativo)))
+    graph.add_node("baremo", trazar_nodo("baremo", *con_especulacion("baremo", resultor_baremo, aresultor_baremo)))
+    graph.add_edge("entrevistador", END)
+    graph.add_edge("rechazo_amable", END)
+    graph.add_edge("procedimental", END)
+    graph.add_edge("calendario", END)
+    graph.add_edge("normativo", END)
+    graph.add_edge("baremo", END)
+
+def _agregar_especulador(graph: StateGraph, origen: str) -> str:
+    if not settings.RESPUESTA_ESPECULATIVA:
+        return origen
+    
+    graph.add_node("especulador", trazar_nodo("especulador", especulador, aespeculador))
+    graph.add_edge(origen, "especulador")
+    return "especulador"
+
+def construir_grafo_secuencial():
+    graph = StateGraph(state_schema=StateSchema)
+
+    graph.add_node("estado_inicial", trazar_nodo("estado_inicial", estado_inicial, aestado_inicial))
+    graph.add_node("recuperador", trazar_nodo("recuperador", recuperador, arecuperador))
+    graph.add_node("clasificador", trazar_nodo("clasificador", lambda state: state))
+    _agregar_nodos_respuesta(graph)
+    tras_recuperar = _agregar_especulador(graph, "recuperador")
+
+    graph.add_conditional_edges(
+        "estado_inicial",
+        trazar_arista("decide_ruta_inicial", decide_ruta_inicial, adecide_ruta_inicial),
+        {
+            "recuperador":"recuperador",
+            "rechazo_amable":"rechazo_amable"
+        }
+    )
+
+    graph.add_conditional_edges(
+        tras_recuperar, 
+        trazar_arista("decide_suficiente_informacion", decide_suficiente_informacion, adecide_suficiente_informacion),
+        {
+            "entrevistador": "entrevistador",
+            "resultor": "clasificador",
+        }
+    )
+
+    graph.add_conditional_edges(
+        "clasificador",
+        trazar_arista("decide_respuesta", decide_respuesta, adecide_respuesta),
+        {
+            "procedimental": "procedimental",
+            "calendario": "calendario",
+            "normativo": "normativo",
+            "baremo": "baremo"
+        }
+    )
+
+    graph.add_edge(START, "estado_inicial")
+
+    return graph.compile()
+
+def construir_grafo_unificado():
+    graph = StateGraph(state_schema=StateSchema)
+
+    graph.add_node("estado_inicial", trazar_nodo("estado_inicial", estado_inicial, aestado_inicial))
+    graph.add_node("recuperador", trazar_nodo("recuperador", recuperador, arecuperador))
+    graph.add_node("enrutador", trazar_nodo("enrutador", enrutador, aenrutador))
+    _agregar_nodos_respuesta(graph)
+
+    graph.add_conditional_edges(
+        "enrutador",
+        trazar_arista("decide_ruta_unificada", decide_ruta_unificada),
+        {
+            "rechazo_amable": "rechazo_amable",
+            "entrevistador": "entrevistador",
+            "procedimental": "procedimental",
+            "calendario": "calendario",
+            "normativo": "normativo",
+            "baremo": "baremo"
+        }
+    )
+
+    graph.add_edge(START, "estado_inicial")
+    graph.add_edge("estado_inicial", "recuperador")
+    graph.add_edge(_agregar_especulador(graph, "recuperador"), "enrutador")
+
+    return graph.compile()
+
+def construir_grafo_concurrente():
+    graph = StateGraph(state_schema=StateSchema)
+
+    graph.add_node("estado_inicial", trazar_nodo("estado_inicial", estado_inicial, aestado_inicial))
+    graph.add_node("detector", trazar_nodo("detector", detector, adetector))
+    graph.add_node("reformulador", trazar_nodo("reformulador", reformulador, areformulador))
+    graph.add_node("recuperador_especulativo", trazar_nodo("recuperador_especulativo", recuperador_especulativo, arecuperador_especulativo))
+    graph.add_node("sincronizador", trazar_nodo("sincronizador", sincronizador, asincronizador))
+    graph.add_node("clasificador", trazar_nodo("clasificador", lambda state: state))
+    _agregar_nodos_respuesta(graph)
+
+    graph.add_edge(START, "estado_inicial")
+    graph.add_edge("estado_inicial", "detector")
+    graph.add_edge("estado_inicial", "reformulador")
+    graph.add_edge("estado_inicial", "recuperador_especulativo")
+    graph.add_edge(["detector", "reformulador", "recuperador_especulativo"], "sincronizador")
+
+    graph.add_conditional_edges(
+        _agregar_especulador(graph, "sincronizador"),
+        trazar_arista("decide_tras_sincronizar", decide_tras_sincronizar, adecide_tras_sincronizar),
+        {
+            "rechazo_amable": "rechazo_amable",
+            "entrevistador": "entrevistador",
+            "resultor": "clasificador",
+        }
+    )
+
+    graph.add_conditional_edges(
+        "clasificador",
+        trazar_arista("decide_respuesta", decide_respuesta, adecide_respuesta),
+        {
+            "procedimental": "procedimental",
+            "calendario": "calendario",
+            "normativo": "normativo",
+            "baremo": "baremo"
+        }
+    )
+
+    return graph.compile()
+
+CONSTRUCTORES_GRAFO = {
+    "secuencial": construir_grafo_secuencial,
+    "unificado": construir_grafo_unificado,
+    "concurrente": construir_grafo_concurrente,
+}
+
+router = CONSTRUCTORES_GRAFO.get(settings.MODO_ENRUTAMIENTO, construir_grafo_secuencial)()
+print(router.get_graph().draw_mermaid(), "\n\n")
@@ -0,0 +1,67 @@
+import time
+from classes.StateSchema import StateSchema
+from services.rag import asistente_rag
+from utils.config import settings
+from utils.texto import similitud_jaccard
+
+def _estimar_ahorro(tiempos: dict) -> float:
+    deteccion = tiempos.get("deteccion", 0.0)
+    reformulacion = tiempos.get("reformulacion", 0.0)
+    recuperacion = tiempos.get("recuperacion_especulativa", 0.0)
+    sincronizacion = tiempos.get("sincronizacion", 0.0)
+    
+    if tiempos.get("especulacion") == "descartada_rechazo":
+        secuencial = deteccion
+    elif tiempos.get("especulacion") == "aprovechada":
+        secuencial = deteccion + reformulacion + recuperacion
+    else:
+        secuencial = deteccion + reformulacion + sincronizacion
+    
+    concurrente = max(deteccion, reformulacion, recuperacion) + sincronizacion
+    return secuencial - concurrente
+
+def _aprovechar_especulacion(state: StateSchema):
+    pregunta = state.get("pregunta", "")
+    pregunta_reformulada = state.get("pregunta_reformulada", pregunta)
+    tiempos = dict(state.get("tiempos", {}))
+    
+    if state.get("intencion") == "rechazo_amable":
+        tiempos["especulacion"] = "descartada_rechazo"
+        return {"contexto": "", "referencias": []}, tiempos, pregunta_reformulada
+    if similitud_jaccard(pregunta, pregunta_reformulada) >= settings.UMBRAL_REFORMULACION:
+        tiempos["especulacion"] = "aprovechada"
+        return {
+            "contexto": state.get("contexto_especulativo", ""),
+            "referencias": state.get("referencias_especulativas", [])
+        }, tiempos, pregunta_reformulada
+    
+    tiempos["especulacion"] = "descartada_reformulacion"
+    return None, tiempos, pregunta_reformulada
+
+def _cerrar_sincronizacion(actualizacion: dict, tiempos: dict, inicio: float):
+    tiempos["sincronizacion"] = time.perf_counter() - inicio
+    tiempos["ahorro_estimado"] = _estimar_ahorro(tiempos)
+    
+    print("Tiempos por etapa:", {etapa: (f"{valor:.3f}s" if isinstance(valor, float) else valor) for etapa, valor in tiempos.items()})
+    
+    return {**actualizacion, "tiempos": tiempos}
+
+def sincronizador(state: StateSchema):
+    inicio = time.perf_counter()
+    
+    actualizacion, tiempos, pregunta_reformulada = _aprovechar_especulacion(state)
+    if actualizacion is None:
+        contexto, referencias = asistente_rag.buscar_contexto(pregunta_reformulada)
+        actualizacion = {"contexto": contexto, "referencias": referencias}
+    
+    return _cerrar_sincronizacion(actualizacion, tiempos, inicio)
+
+async def asincronizador(state: StateSchema):
+    inicio = time.perf_counter()
+    
+    actualizacion, tiempos, pregunta_reformulada = _aprovechar_especulacion(state)
+    if actualizacion is None:
+        contexto, referencias = await asistente_rag.abuscar_contexto(pregunta_reformulada)
+        actualizacion = {"contexto": contexto, "referencias": referencias}
+    
+    return _cerrar_sincronizacion(actualizacion, tiempos, inicio)
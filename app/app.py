@@ -1,7 +1,10 @@
 import streamlit as st
-from agente.router import router
-import datetime
-import time 
+from utils.config import settings
+from utils.streaming import pautar_stream
+from services.trazas import trazador
+import threading
+import time
+import uuid
 
 st.set_page_config(page_title="Asistente US", page_icon="🎓")
 
@@ -12,17 +15,26 @@ Bienvenido. Soy tu asistente virtual especializado en normativas de la Universid
 Pregúntame sobre **matrículas, exámenes, convalidaciones o plazos**.
 """)
 
-def generador_lento(stream_original):
-    """
-    Ralentiza ligeramente el stream para que Groq no lo imprima 
-    de golpe y se vea el efecto 'máquina de escribir'.
-    """
-    for chunk in stream_original:
-        yield chunk
-        time.sleep(0.05) 
+@st.cache_resource
+def iniciar_asistente():
+    if settings.URL_BACKEND:
+        from services.cliente_backend import crear_cliente_backend
+        return crear_cliente_backend().consultar, None
+
+    from orquestacion import preparar_consulta, cerrar_consulta
+    from services.rag import obtener_asistente
+    asistente = obtener_asistente()
+    asistente.calentar_cache_faq()
+    if settings.PRECARGAR_CLIENTES:
+        threading.Thread(target=asistente.precargar, daemon=True).start()
+    return preparar_consulta, cerrar_consulta
+
+preparar_consulta, cerrar_consulta = iniciar_asistente()
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
+    st.session_state.resumen_historial = ""
+    st.session_state.mensajes_resumidos = 0
 
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
@@ -31,33 +43,32 @@ for message in st.session_state.messages:
 prompt = st.chat_input("Escribe tu duda aquí (ej: ¿Cómo anulo la matrícula?)")
 
 if prompt:
+    inicio_consulta = time.perf_counter()
+    id_peticion = uuid.uuid4().hex[:12]
     st.chat_message("user").markdown(prompt)
     st.session_state.messages.append({"role": "user", "content": prompt})
 
-    with st.chat_message("assistant"):
+    with st.chat_message("assistant"), trazador.peticion(id_peticion):
         error_ocurrido = False
         
         with st.status("Consultando la normativa vigente...", expanded=False) as status:
-            estado_inicial = {
-                "pregunta": prompt, 
-                "historial": st.session_state.messages, 
-                "contexto": "", 
-                "stream": None,
-                "referencias":[]
-            }
-            
             try:
-                estado_final = router.invoke(estado_inicial)
-                print("Finalizada consulta", datetime.datetime.now(), "\n\n")
-                
-                stream = estado_final["stream"]
-                referencias = estado_final.get("referencias", [])
-                status.update(label="Normativa consultada", state="complete", expanded=False)
+                consulta = preparar_consulta(
+                    id_peticion,
+                    prompt,
+                    st.session_state.messages,
+                    st.session_state.resumen_historial,
+                    st.session_state.mensajes_resumidos
+                )
+                st.session_state.resumen_historial = consulta["resumen_historial"]
+                st.session_state.mensajes_resumidos = consulta["mensajes_resumidos"]
+                stream, referencias, ruta = consulta["stream"], consulta["referencias"], consulta["ruta"]
+                status.update(label=consulta["estado"], state="complete", expanded=False)
                 
             except Exception as e:
                 error_msg = str(e).lower()
                 error_ocurrido = True
-                if "429" in error_msg or "rate limit" in error_msg:
+                if "429" in error_msg or "rate limit" in error_msg or getattr(e, "limite_tasa", False):
                     status.update(label="Servidores saturados", state="error", expanded=False)
                     st.error("⚠️ El sistema ha recibido demasiadas peticiones seguidas (Límite de API gratuito). Por favor, **espera 1 minuto** y vuelve a preguntar.")
                 else:
@@ -66,8 +77,14 @@ if prompt:
 
         if not error_ocurrido:
             try:
-                stream_visual = generador_lento(stream)
+                metricas_render = {}
+                stream_visual = pautar_stream(stream, metricas_render, inicio_consulta)
                 respuesta_texto = st.write_stream(stream_visual)
+                trazador.registrar_duracion("primer_token", "render", metricas_render.get("tiempo_primer_token", 0.0), ruta=ruta)
+                trazador.registrar_duracion("total", "render", metricas_render["tiempo_total"], ruta=ruta)
+                
+                if cerrar_consulta is not None:
+                    cerrar_consulta(consulta, respuesta_texto)
                 
                 if referencias:
                     st.markdown("**Fuentes consultadas**")
@@ -80,7 +97,7 @@ if prompt:
                 
             except Exception as e:
                 error_msg = str(e).lower()
-                if "429" in error_msg or "rate limit" in error_msg:
+                if "429" in error_msg or "rate limit" in error_msg or getattr(e, "limite_tasa", False):
                     st.error("⚠️ El sistema se saturó a mitad de la respuesta. Espera 1 minuto y reinténtalo.")
                 else:
                     st.error(f"⚠️ Error al escribir la respuesta: {e}")
\ No newline at end of file
@@ -1,12 +1,25 @@
 
-from typing import TypedDict
+from typing import Annotated, TypedDict
+
+
+def combinar_tiempos(tiempos: dict, nuevos: dict) -> dict:
+    return {**(tiempos or {}), **(nuevos or {})}
 
 
 class StateSchema(TypedDict):
+    id_peticion: str
     pregunta: str
     pregunta_reformulada: str
     historial: list
     historial_formateado:list
+    resumen_historial: str
+    mensajes_resumidos: int
     contexto: str
     stream: str
-    referencias: list
\ No newline at end of file
+    referencias: list
+    ruta: str
+    intencion: str
+    contexto_especulativo: str
+    referencias_especulativas: list
+    especulacion: object
+    tiempos: Annotated[dict, combinar_tiempos]
@@ -0,0 +1,90 @@
+import asyncio
+from agente.router import router
+from services.rag import asistente_rag
+from utils.config import settings
+from utils.asincrono import ejecutar, iterar
+
+def _estado_inicial(id_peticion: str, pregunta: str, historial: list, resumen_historial: str, mensajes_resumidos: int, pregunta_reformulada: str):
+    estado = {
+        "id_peticion": id_peticion,
+        "pregunta": pregunta,
+        "historial": historial,
+        "resumen_historial": resumen_historial,
+        "mensajes_resumidos": mensajes_resumidos,
+        "contexto": "",
+        "stream": None,
+        "referencias": []
+    }
+    if pregunta_reformulada:
+        estado["pregunta_reformulada"] = pregunta_reformulada
+    return estado
+
+def _consultar_atajos(pregunta: str, historial: list):
+    if len(historial) != 1:
+        return None, None, None
+
+    acierto = asistente_rag.consultar_faq(pregunta) or asistente_rag.consultar_cache(pregunta)
+    respuesta_calendario = None if acierto else asistente_rag.atajo_calendario(pregunta)
+    return pregunta, acierto, respuesta_calendario
+
+def _consulta_directa(acierto_cache, respuesta_calendario, pregunta_reformulada: str, resumen_historial: str, mensajes_resumidos: int):
+    if acierto_cache:
+        texto, referencias, ruta = acierto_cache["respuesta"], acierto_cache["referencias"], acierto_cache["ruta"]
+        estado = "Respuesta de preguntas frecuentes" if acierto_cache.get("origen") == "faq" else "Respuesta recuperada de consultas anteriores"
+    else:
+        (texto, referencias), ruta = respuesta_calendario, "calendario"
+        estado = "Fechas consultadas en el calendario académico"
+
+    return {
+        "texto": texto,
+        "referencias": referencias,
+        "ruta": ruta,
+        "estado": estado,
+        "pregunta_reformulada": pregunta_reformulada,
+        "resumen_historial": resumen_historial,
+        "mensajes_resumidos": mensajes_resumidos,
+        "guardar_en_cache": False
+    }
+
+def _consulta_grafo(estado_final: dict, stream, pregunta_reformulada: str):
+    pregunta_reformulada = estado_final.get("pregunta_reformulada", pregunta_reformulada)
+    return {
+        "stream": stream,
+        "referencias": estado_final.get("referencias", []),
+        "ruta": estado_final.get("ruta"),
+        "estado": "Normativa consultada",
+        "pregunta_reformulada": pregunta_reformulada,
+        "resumen_historial": estado_final.get("resumen_historial", ""),
+        "mensajes_resumidos": estado_final.get("mensajes_resumidos", 0),
+        "guardar_en_cache": bool(pregunta_reformulada)
+    }
+
+def preparar_consulta(id_peticion: str, pregunta: str, historial: list, resumen_historial: str = "", mensajes_resumidos: int = 0) -> dict:
+    pregunta_reformulada, acierto_cache, respuesta_calendario = _consultar_atajos(pregunta, historial)
+    if acierto_cache or respuesta_calendario:
+        consulta = _consulta_directa(acierto_cache, respuesta_calendario, pregunta_reformulada, resumen_historial, mensajes_resumidos)
+        consulta["stream"] = asistente_rag.trocear(consulta.pop("texto"))
+        return consulta
+
+    estado_inicial = _estado_inicial(id_peticion, pregunta, historial, resumen_historial, mensajes_resumidos, pregunta_reformulada)
+    if settings.MODO_ASINCRONO:
+        estado_final = ejecutar(router.ainvoke(estado_inicial))
+        return _consulta_grafo(estado_final, iterar(estado_final["stream"]), pregunta_reformulada)
+
+    estado_final = router.invoke(estado_inicial)
+    return _consulta_grafo(estado_final, estado_final["stream"], pregunta_reformulada)
+
+async def apreparar_consulta(id_peticion: str, pregunta: str, historial: list, resumen_historial: str = "", mensajes_resumidos: int = 0) -> dict:
+    pregunta_reformulada, acierto_cache, respuesta_calendario = await asyncio.to_thread(_consultar_atajos, pregunta, historial)
+    if acierto_cache or respuesta_calendario:
+        consulta = _consulta_directa(acierto_cache, respuesta_calendario, pregunta_reformulada, resumen_historial, mensajes_resumidos)
+        consulta["stream"] = asistente_rag.atrocear(consulta.pop("texto"))
+        return consulta
+
+    estado_inicial = _estado_inicial(id_peticion, pregunta, historial, resumen_historial, mensajes_resumidos, pregunta_reformulada)
+    estado_final = await router.ainvoke(estado_inicial)
+    return _consulta_grafo(estado_final, estado_final["stream"], pregunta_reformulada)
+
+def cerrar_consulta(consulta: dict, respuesta: str):
+    if consulta["guardar_en_cache"]:
+        asistente_rag.guardar_en_cache(consulta["pregunta_reformulada"], respuesta, consulta["referencias"], consulta["ruta"])
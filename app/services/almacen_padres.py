@@ -0,0 +1,117 @@
+import json
+import mmap
+import os
+import threading
+from langchain_core.documents import Document
+from utils.texto import estimar_tokens
+
+FICHERO_TEXTOS = "padres.bin"
+FICHERO_INDICE = "padres.json"
+
+class AlmacenPadres:
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._indice = {}
+        self._nuevos = {}
+        self._eliminados = set()
+        self._fichero = None
+        self._mapa = None
+        self._lock = threading.RLock()
+        self._cargar()
+
+    def _cargar(self):
+        ruta_textos = os.path.join(self.ruta, FICHERO_TEXTOS)
+        ruta_indice = os.path.join(self.ruta, FICHERO_INDICE)
+        if not (os.path.exists(ruta_textos) and os.path.exists(ruta_indice)):
+            return
+
+        with open(ruta_indice, encoding="utf-8") as f:
+            self._indice = json.load(f)
+        self._fichero = open(ruta_textos, "rb")
+        if os.path.getsize(ruta_textos):
+            self._mapa = mmap.mmap(self._fichero.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _cerrar(self):
+        if self._mapa is not None:
+            self._mapa.close()
+        if self._fichero is not None:
+            self._fichero.close()
+        self._mapa = self._fichero = None
+
+    def _leer(self, id_padre: str):
+        if id_padre in self._nuevos:
+            return self._nuevos[id_padre]
+        if id_padre in self._eliminados or id_padre not in self._indice:
+            return None
+        inicio, longitud, metadatos = self._indice[id_padre]
+        return self._mapa[inicio:inicio + longitud].decode("utf-8"), metadatos
+
+    def agregar(self, id_padre: str, texto: str, metadatos: dict):
+        with self._lock:
+            self._eliminados.discard(id_padre)
+            self._nuevos[id_padre] = (texto, metadatos)
+
+    def eliminar(self, ids: list):
+        with self._lock:
+            for id_padre in ids:
+                self._nuevos.pop(id_padre, None)
+                if id_padre in self._indice:
+                    self._eliminados.add(id_padre)
+
+    def guardar(self):
+        with self._lock:
+            os.makedirs(self.ruta, exist_ok=True)
+            ruta_textos = os.path.join(self.ruta, FICHERO_TEXTOS)
+            ruta_indice = os.path.join(self.ruta, FICHERO_INDICE)
+
+            indice, posicion = {}, 0
+            with open(ruta_textos + ".tmp", "wb") as f:
+                for id_padre in sorted((set(self._indice) - self._eliminados) | set(self._nuevos)):
+                    texto, metadatos = self._leer(id_padre)
+                    datos = texto.encode("utf-8")
+                    f.write(datos)
+                    indice[id_padre] = [posicion, len(datos), metadatos]
+                    posicion += len(datos)
+            with open(ruta_indice + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(indice, f, ensure_ascii=False)
+
+            self._cerrar()
+            os.replace(ruta_textos + ".tmp", ruta_textos)
+            os.replace(ruta_indice + ".tmp", ruta_indice)
+            self._indice, self._nuevos, self._eliminados = {}, {}, set()
+            self._cargar()
+
+    def obtener(self, id_padre: str):
+        with self._lock:
+            leido = self._leer(id_padre)
+        if leido is None:
+            return None
+        texto, metadatos = leido
+        return Document(id=id_padre, page_content=texto, metadata=dict(metadatos))
+
+    def __contains__(self, id_padre: str):
+        return id_padre in self._nuevos or (id_padre in self._indice and id_padre not in self._eliminados)
+
+    def __len__(self):
+        return len((set(self._indice) - self._eliminados) | set(self._nuevos))
+
+
+def expandir_padres(docs: list, almacen: AlmacenPadres, presupuesto: int) -> list:
+    grupos = {}
+    for doc in docs:
+        grupos.setdefault(doc.metadata.get("id_padre") or id(doc), []).append(doc)
+
+    expandidos, restante = [], presupuesto
+    for clave, hijos in grupos.items():
+        padre = almacen.obtener(clave) if isinstance(clave, str) else None
+        coste_hijos = sum(estimar_tokens(hijo.page_content) for hijo in hijos)
+        coste_padre = estimar_tokens(padre.page_content) if padre is not None else None
+        if padre is not None and coste_padre <= max(restante, coste_hijos):
+            padre.metadata.update({campo: valor for campo, valor in hijos[0].metadata.items() if campo.startswith("puntuacion") or campo == "relevance_score"})
+            padre.metadata["hijos"] = len(hijos)
+            expandidos.append(padre)
+            restante -= coste_padre
+        else:
+            expandidos.extend(hijos)
+            restante -= coste_hijos
+    return expandidos
@@ -0,0 +1,201 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from utils.texto import normalizar_texto
+
+class CacheLRU:
+    def __init__(self, capacidad: int, ttl_segundos: float = None):
+        self.capacidad = capacidad
+        self.ttl_segundos = ttl_segundos
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _caducada(self, instante: float) -> bool:
+        return self.ttl_segundos is not None and time.time() - instante > self.ttl_segundos
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            
+            valor, instante = entrada
+            if self._caducada(instante):
+                del self._entradas[clave]
+                return None
+            
+            self._entradas.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._entradas[clave] = (valor, time.time())
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+
+    def elementos(self):
+        with self._lock:
+            caducadas = [clave for clave, (_, instante) in self._entradas.items() if self._caducada(instante)]
+            for clave in caducadas:
+                del self._entradas[clave]
+            return [(clave, valor) for clave, (valor, _) in self._entradas.items()]
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+class CacheSemantica:
+    def __init__(self, capacidad: int, ttl_segundos: float, umbral: float, ruta: str = None):
+        self.umbral = umbral
+        self._entradas = CacheVersionada("semantica", capacidad, ruta, ttl_segundos)
+
+    def buscar(self, vector: list, version: str):
+        elementos = self._entradas.elementos(version)
+        if not elementos:
+            return None
+        
+        consulta = np.asarray(vector, dtype=np.float32)
+        consulta = consulta / (np.linalg.norm(consulta) or 1.0)
+        matriz = np.stack([np.asarray(entrada["vector"], dtype=np.float32) for _, entrada in elementos])
+        similitudes = matriz @ consulta
+        
+        mejor = int(np.argmax(similitudes))
+        if similitudes[mejor] < self.umbral:
+            return None
+        
+        clave, _ = elementos[mejor]
+        entrada = self._entradas.obtener(clave, version)
+        if entrada is None:
+            return None
+        return {**entrada, "similitud": float(similitudes[mejor])}
+
+    def guardar(self, pregunta: str, vector: list, respuesta: str, referencias: list, ruta: str, version: str):
+        vector = np.asarray(vector, dtype=np.float32)
+        
+        self._entradas.guardar(normalizar_texto(pregunta), {
+            "pregunta": pregunta,
+            "vector": vector / (np.linalg.norm(vector) or 1.0),
+            "respuesta": respuesta,
+            "referencias": list(referencias),
+            "ruta": ruta
+        }, version)
+
+
+class CacheVersionada:
+    def __init__(self, nombre: str, capacidad: int, ruta: str = None, ttl_segundos: float = None):
+        self.nombre = nombre
+        self.capacidad = capacidad
+        self.ruta = ruta
+        self.ttl_segundos = ttl_segundos
+        self._entradas = CacheLRU(capacidad, ttl_segundos)
+        self._version = None
+        self._sincronizado = 0.0
+        self._conexion = None
+        self._lock = threading.Lock()
+
+    def _conectar(self):
+        if self._conexion is None:
+            os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+            self._conexion = sqlite3.connect(self.ruta, timeout=5.0, check_same_thread=False)
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute(f"CREATE TABLE IF NOT EXISTS {self.nombre} (clave TEXT PRIMARY KEY, version TEXT, valor TEXT, instante REAL)")
+        return self._conexion
+
+    def _vigente_desde(self) -> float:
+        return time.time() - self.ttl_segundos if self.ttl_segundos is not None else 0.0
+
+    def _comprobar_version(self, version: str):
+        with self._lock:
+            if version == self._version:
+                return
+            self._entradas.limpiar()
+            self._version = version
+            self._sincronizado = 0.0
+            if self.ruta:
+                conexion = self._conectar()
+                conexion.execute(f"DELETE FROM {self.nombre} WHERE version != ?", (version,))
+                conexion.commit()
+
+    def obtener(self, clave: str, version: str):
+        self._comprobar_version(version)
+        valor = self._entradas.obtener(clave)
+        if valor is not None or not self.ruta:
+            return valor
+
+        with self._lock:
+            fila = self._conectar().execute(
+                f"SELECT valor FROM {self.nombre} WHERE clave = ? AND version = ? AND instante > ?",
+                (clave, version, self._vigente_desde())
+            ).fetchone()
+        if fila is None:
+            return None
+        valor = json.loads(fila[0])
+        self._entradas.guardar(clave, valor)
+        return valor
+
+    def elementos(self, version: str) -> list:
+        self._comprobar_version(version)
+        if self.ruta:
+            with self._lock:
+                filas = self._conectar().execute(
+                    f"SELECT clave, valor, instante FROM {self.nombre} WHERE version = ? AND instante > ? ORDER BY instante",
+                    (version, max(self._sincronizado, self._vigente_desde()))
+                ).fetchall()
+                for clave, valor, instante in filas:
+                    self._entradas.guardar(clave, json.loads(valor))
+                    self._sincronizado = instante
+        return self._entradas.elementos()
+
+    def guardar(self, clave: str, valor, version: str):
+        self._comprobar_version(version)
+        self._entradas.guardar(clave, valor)
+        if not self.ruta:
+            return
+
+        with self._lock:
+            conexion = self._conectar()
+            conexion.execute(
+                f"INSERT OR REPLACE INTO {self.nombre} VALUES (?, ?, ?, ?)",
+                (clave, version, json.dumps(valor, ensure_ascii=False, default=_serializable), time.time())
+            )
+            conexion.execute(f"DELETE FROM {self.nombre} WHERE clave IN (SELECT clave FROM {self.nombre} ORDER BY instante DESC LIMIT -1 OFFSET ?)", (self.capacidad,))
+            conexion.commit()
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+def _serializable(valor):
+    return valor.tolist() if isinstance(valor, np.ndarray) else float(valor)
+
+
+def embedding_cacheado(cache: CacheVersionada, embeddings, texto: str, version: str) -> list:
+    clave = normalizar_texto(texto)
+    vector = cache.obtener(clave, version)
+    if vector is None:
+        vector = embeddings.embed_query(texto)
+        cache.guardar(clave, [float(x) for x in vector], version)
+    return vector
+
+
+class EmbeddingsCacheadas(Embeddings):
+    def __init__(self, base: Embeddings, cache: CacheVersionada, version):
+        self.base = base
+        self.cache = cache
+        self.version = version
+
+    def embed_documents(self, texts: list) -> list:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list:
+        return embedding_cacheado(self.cache, self.base, text, self.version())
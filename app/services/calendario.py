@@ -0,0 +1,390 @@
+import datetime
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from services.trazas import trazador
+from utils.texto import normalizar_texto, tokenizar
+
+MESES = ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"]
+
+_DIA = r"(\d{1,2})(?:\s*\([LMXJVSD]\))?"
+_DE = r"\s+(?:de\s+)?"
+_MES = r"(" + "|".join(MESES) + r")(?:\s*\([LMXJVSD]\))?"
+_ANIO = r"(?:,?\s+(?:de\s+)?(20\d\s?\d))?"
+
+_PATRONES_FECHA = [
+    ("rango", re.compile(rf"(?:(?:del?|desde el)\s+)?{_DIA}(?:{_DE}{_MES}{_ANIO})?\s+al\s+{_DIA}{_DE}{_MES}{_ANIO}", re.IGNORECASE)),
+    ("rango", re.compile(rf"entre\s+(?:el\s+)?{_DIA}(?:{_DE}{_MES}{_ANIO})?\s+y\s+(?:el\s+)?{_DIA}{_DE}{_MES}{_ANIO}", re.IGNORECASE)),
+    ("limite", re.compile(rf"(?:hasta|antes|con anterioridad)\s+(?:(?:de|a)\s+)?(?:las\s+\d{{1,2}}:\d{{2}}\s*h\s+)?(?:el|del|al)\s+(?:d[ií]a\s+)?{_DIA}{_DE}{_MES}{_ANIO}", re.IGNORECASE)),
+    ("inicio", re.compile(rf"(?:a partir|desde)\s+(?:de\s+)?(?:las\s+\d{{1,2}}:\d{{2}}\s*h\s+)?(?:el|del)\s+(?:d[ií]a\s+)?{_DIA}{_DE}{_MES}{_ANIO}", re.IGNORECASE)),
+    ("dia", re.compile(rf"(?:el\s+)?{_DIA}{_DE}{_MES}{_ANIO}", re.IGNORECASE)),
+]
+
+_CITA_LEGAL = re.compile(r"(\d+/\d{4}|ley|decreto|orden|resoluci[oó]n rectoral)[^.;]{0,12}$", re.IGNORECASE)
+_MARCA_DIA = re.compile(r"\s*\([LMXJVSD]\)")
+_ENCABEZADO = re.compile(r"^(?:\d+(?:\.\d+)*\.?\s+|ANEXO\s+[IVX]+\s*:?\s*)(.+)$")
+_SUBENCABEZADO = re.compile(r"^(CALENDARIO DE .+)$")
+_CAMPUS = re.compile(r"\bcampus (?:de )?([a-z]+(?: [a-z]+){0,3})")
+
+PROGRAMAS = {
+    "grado": r"\bgrados?\b",
+    "master": r"\bmaster(?:es)?\b",
+    "doctorado": r"\bdoctora\w*",
+    "idiomas": r"\bidiomas?\b",
+}
+
+PROGRAMAS_EXPLICITOS = {"doctorado", "idiomas"}
+
+TEMAS_EXPLICITOS = {"examen", "actas", "convocatoria"}
+
+GENERICAS = {
+    "plazo", "fecha", "dia", "dias", "cual", "curso", "academico", "universidad", "sevilla", "tengo", "puedo", "hay",
+    "empiezan", "empieza", "comienzan", "comienza", "terminan", "termina", "acaban", "acaba", "abre", "cierra",
+    "periodo", "sera", "seran", "estudiante", "alumno", "quiero", "saber", "dime", "2025", "2026"
+}
+
+_ORDINAL = re.compile(r"\b(primer[oa]?|segund[oa]|tercer[oa]?|[123](?: ?(?:o|a|er))?) (cuatrimestre|convocatoria)")
+_NUMERO_ORDINAL = {"p": 1, "1": 1, "s": 2, "2": 2, "t": 3, "3": 3}
+_ORDINAL_NUMERICO = re.compile(r"\b([123])(?: ?(?:o|a|er))? (?=cuatrimestre|convocatoria)")
+_ORDINAL_ESCRITO = {"1": "primero ", "2": "segundo ", "3": "tercero "}
+LONGITUD_RAIZ = 7
+
+def _raiz(token: str) -> str:
+    if len(token) > 4 and token[-1] in "ao":
+        token = token[:-1]
+    return token[:LONGITUD_RAIZ]
+
+_GENERICAS = {_raiz(token) for token in tokenizar(" ".join(GENERICAS))}
+_TEMAS_EXPLICITOS = {_raiz(token) for token in tokenizar(" ".join(TEMAS_EXPLICITOS))}
+
+def _raices(texto: str) -> set:
+    texto = _ORDINAL_NUMERICO.sub(lambda m: _ORDINAL_ESCRITO[m.group(1)], normalizar_texto(texto))
+    return {raiz for raiz in map(_raiz, tokenizar(texto)) if raiz not in _GENERICAS}
+
+def _ordinales(texto: str) -> dict:
+    encontrados = {}
+    for ordinal, sustantivo in _ORDINAL.findall(normalizar_texto(texto)):
+        encontrados.setdefault(sustantivo, set()).add(_NUMERO_ORDINAL[ordinal[0]])
+    return encontrados
+
+def _mayusculas(texto: str) -> bool:
+    letras = [c for c in texto if c.isalpha()]
+    return len(letras) >= 4 and sum(c.isupper() for c in letras) / len(letras) > 0.8
+
+def _limpiar_fecha(texto: str) -> str:
+    texto = _MARCA_DIA.sub("", texto)
+    texto = re.sub(r"(20\d)\s(\d)\b", r"\1\2", texto)
+    texto = re.sub(r"\s+", " ", texto).strip()
+    return texto[0].lower() + texto[1:]
+
+def _iso(dia, mes, anio) -> str:
+    if not (dia and mes and anio):
+        return None
+    try:
+        return datetime.date(int(anio.replace(" ", "")), MESES.index(mes.lower()) + 1, int(dia)).isoformat()
+    except ValueError:
+        return None
+
+def _interpretar(tipo: str, grupos: tuple):
+    if tipo == "rango":
+        dia_inicio, mes_inicio, anio_inicio, dia_fin, mes_fin, anio_fin = grupos
+        inicio, fin = _iso(dia_inicio, mes_inicio or mes_fin, anio_inicio or anio_fin), _iso(dia_fin, mes_fin, anio_fin)
+        if inicio and fin and inicio > fin and mes_inicio and not anio_inicio:
+            inicio = _iso(dia_inicio, mes_inicio, str(int(anio_fin.replace(" ", "")) - 1))
+        return inicio, fin, anio_inicio or anio_fin
+    dia, mes, anio = grupos
+    fecha = _iso(dia, mes, anio)
+    if tipo == "limite":
+        return None, fecha, anio
+    if tipo == "inicio":
+        return fecha, None, anio
+    return fecha, fecha, anio
+
+def _buscar_fechas(texto: str) -> list:
+    ocupado = [False] * len(texto)
+    encontradas = []
+    for tipo, patron in _PATRONES_FECHA:
+        for coincidencia in patron.finditer(texto):
+            inicio, fin = coincidencia.span()
+            if any(ocupado[inicio:fin]) or _CITA_LEGAL.search(texto[max(0, inicio - 40):inicio]):
+                continue
+            ocupado[inicio:fin] = [True] * (fin - inicio)
+            encontradas.append((inicio, fin, tipo, coincidencia.groups()))
+    return sorted(encontradas)
+
+def _programa(*textos: str) -> str:
+    for texto in textos:
+        normalizado = normalizar_texto(texto)
+        encontrados = [programa for programa, patron in PROGRAMAS.items() if re.search(patron, normalizado)]
+        if len(encontrados) == 1:
+            return encontrados[0]
+    return "general"
+
+_LIMITE = re.compile(r"•|\s\+\s|\s-\s|(?<!\bSto)(?<!\bSta)(?<!\bart)[.;](?=\s+[A-ZÁÉÍÓÚ(•+])")
+_CABECERA = re.compile(r"\b(\w{4,})((?:\s+de)?)\s+(\w{4,})\s+(?:\1\2\s+(\w{4,})|(\w{4,})\s+\3)\b", re.IGNORECASE)
+PALABRAS_CELDA = 4
+_GRUPO = re.compile(r"^([A-ZÁÉÍÓÚÑ]{4,})\s+(?=[A-ZÁÉÍÓÚÑ][a-záéíóúñ])")
+
+def _contenido(texto: str) -> list:
+    return [token for token in tokenizar(texto) if not token.isdigit()]
+
+def _recortar(texto: str, limite: int = 200) -> str:
+    texto = re.sub(r"\((?:\d|\*)\)|\*", "", _MARCA_DIA.sub("", texto))
+    texto = re.sub(r"\s+", " ", texto).strip(" .;:,•+-")
+    if len(texto) > limite:
+        texto = texto[:limite].rsplit(" ", 1)[0]
+    return texto
+
+def _segmento(texto: str, inicio: int, fin: int, desde: int, hasta: int, fecha_primero: bool):
+    if fecha_primero:
+        return _recortar(texto[fin:hasta]), False
+
+    antes = texto[desde:inicio]
+    separado = False
+    for limite in (_LIMITE, _CABECERA):
+        cortes = list(limite.finditer(antes))
+        if cortes:
+            antes = antes[cortes[-1].end():]
+            separado = True
+    despues = texto[fin:hasta]
+    corte = _LIMITE.search(despues)
+    if corte:
+        despues = despues[:corte.start()]
+    elif hasta < len(texto) or len(_contenido(antes)) >= 2:
+        despues = ""
+    return _recortar(f"{antes} {despues}"), separado
+
+def _columnas(cabecera) -> list:
+    primera, de, comun, segunda_final, segunda_inicial = cabecera.groups()
+    if segunda_final:
+        columnas = [f"{primera}{de} {comun}", f"{primera}{de} {segunda_final}"]
+    else:
+        columnas = [f"{primera} {comun}", f"{segunda_inicial} {comun}"]
+    return [re.sub(r"\s+", " ", columna).capitalize() for columna in columnas]
+
+def _descripciones(segmentos: list, cabeceras: list) -> list:
+    columnas = _columnas(cabeceras[0]) if len(cabeceras) == 1 else []
+    filas, grupo, estilo = [], "", None
+    for segmento, separado in segmentos:
+        propio = len(_contenido(segmento)) >= 2 or (separado and bool(segmento))
+        if cabeceras and propio and len(_contenido(segmento)) <= PALABRAS_CELDA:
+            inicial = _GRUPO.match(segmento)
+            if inicial:
+                grupo = inicial.group(1)
+            elif grupo:
+                segmento = f"{grupo} {segmento}"
+
+        if not filas or (propio and (not columnas or estilo is None or _mayusculas(segmento) == estilo)):
+            filas.append((segmento, []))
+            if propio and estilo is None:
+                estilo = _mayusculas(segmento)
+            filas[-1][1].append("")
+        else:
+            filas[-1][1].append(segmento if propio else (filas[-1][1][-1] if filas[-1][1] else ""))
+
+    descripciones = []
+    for etiqueta, celdas in filas:
+        for posicion, subetiqueta in enumerate(celdas):
+            columna = columnas[min(posicion, len(columnas) - 1)] if columnas and len(celdas) > 1 else ""
+            descripciones.append(", ".join(parte for parte in (etiqueta, columna, subetiqueta) if parte))
+    return descripciones
+
+def _lineas_repetidas(paginas: list) -> set:
+    if len(paginas) < 3:
+        return set()
+    conteo = Counter()
+    for texto in paginas:
+        conteo.update({re.sub(r"\d+", "#", linea.strip()) for linea in texto.splitlines() if linea.strip()})
+    return {linea for linea, veces in conteo.items() if veces >= len(paginas) / 2}
+
+def _eventos_bloque(texto: str, seccion: str, programa_seccion: str, anios: set, source: str, page: int) -> list:
+    texto = re.sub(r"\s+", " ", texto).strip()
+    fechas = _buscar_fechas(texto)
+    fecha_primero = bool(re.search(r"\bFECHA ACTIVIDAD\b", texto))
+    segmentos = [
+        _segmento(texto, inicio, fin, fechas[indice - 1][1] if indice else 0, fechas[indice + 1][0] if indice + 1 < len(fechas) else len(texto), fecha_primero)
+        for indice, (inicio, fin, _, _) in enumerate(fechas)
+    ]
+    descripciones = _descripciones(segmentos, [] if fecha_primero else list(_CABECERA.finditer(texto)))
+    eventos = []
+    for (inicio, fin, tipo, grupos), descripcion in zip(fechas, descripciones):
+        fecha_inicio, fecha_fin, anio = _interpretar(tipo, grupos)
+        if anio and anios and int(anio.replace(" ", "")) not in anios:
+            continue
+        if fecha_inicio and fecha_fin and fecha_inicio > fecha_fin:
+            continue
+
+        fecha = _limpiar_fecha(texto[inicio:fin])
+        campus = _CAMPUS.search(normalizar_texto(f"{seccion} {descripcion}"))
+        programa = _programa(descripcion, seccion)
+        eventos.append({
+            "id": hashlib.sha256(f"{source}|{page}|{seccion}|{descripcion}|{fecha}".encode("utf-8")).hexdigest()[:16],
+            "seccion": seccion,
+            "descripcion": descripcion,
+            "fecha": fecha,
+            "inicio": fecha_inicio,
+            "fin": fecha_fin,
+            "programa": programa if programa != "general" else programa_seccion,
+            "campus": campus.group(1) if campus else None,
+            "source": source,
+            "page": page
+        })
+    return eventos
+
+def extraer_eventos(paginas: list, source: str, anios: set = None) -> list:
+    repetidas = _lineas_repetidas(paginas)
+    anios = set(anios or [])
+    eventos = []
+    seccion, programa_seccion = "", "general"
+
+    for numero, texto in enumerate(paginas, start=1):
+        bloque = []
+        for linea in texto.splitlines():
+            linea = linea.strip()
+            if not linea or re.sub(r"\d+", "#", linea) in repetidas:
+                continue
+
+            encabezado = _ENCABEZADO.match(linea) or _SUBENCABEZADO.match(linea)
+            if encabezado and _mayusculas(encabezado.group(1)):
+                eventos.extend(_eventos_bloque(" ".join(bloque), seccion, programa_seccion, anios, source, numero))
+                bloque = []
+                seccion = re.sub(r"\s+", " ", encabezado.group(1)).strip().capitalize()
+                programa = _programa(linea)
+                if programa != "general" or linea.upper().startswith("ANEXO") or _SUBENCABEZADO.match(linea):
+                    programa_seccion = programa
+                continue
+            bloque.append(linea)
+        eventos.extend(_eventos_bloque(" ".join(bloque), seccion, programa_seccion, anios, source, numero))
+
+    unicos = {}
+    for evento in eventos:
+        unicos.setdefault(evento["id"], evento)
+    return list(unicos.values())
+
+def extraer_eventos_pdf(ruta: str, anios: set = None) -> list:
+    from pypdf import PdfReader
+    paginas = [pagina.extract_text() or "" for pagina in PdfReader(ruta).pages]
+    return extraer_eventos(paginas, os.path.basename(ruta), anios)
+
+def guardar_calendario(ruta: str, eventos: list, archivos: dict):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    datos = {
+        "generado": datetime.datetime.now().isoformat(timespec="seconds"),
+        "archivos": archivos,
+        "eventos": eventos
+    }
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+    os.replace(ruta + ".tmp", ruta)
+
+
+class AlmacenCalendario:
+    def __init__(self, ruta: str, umbral: float = 0.75, margen: float = 0.1, max_eventos: int = 3, ruta_manifiesto: str = None):
+        self.ruta = ruta
+        self.umbral = umbral
+        self.margen = margen
+        self.max_eventos = max_eventos
+        self.ruta_manifiesto = ruta_manifiesto
+        self._eventos = None
+        self._lock = threading.Lock()
+
+    def _cargar(self) -> list:
+        if self._eventos is not None:
+            return self._eventos
+
+        with self._lock:
+            if self._eventos is None:
+                eventos = []
+                if os.path.exists(self.ruta):
+                    with open(self.ruta, encoding="utf-8") as f:
+                        datos = json.load(f)
+                    vigentes = {}
+                    if self.ruta_manifiesto and os.path.exists(self.ruta_manifiesto):
+                        with open(self.ruta_manifiesto, encoding="utf-8") as f:
+                            vigentes = json.load(f).get("archivos", {})
+                    caducados = [
+                        nombre for nombre, hash_archivo in datos.get("archivos", {}).items()
+                        if nombre in vigentes and vigentes[nombre].get("hash") != hash_archivo
+                    ]
+                    if caducados:
+                        trazador.aviso(f"Calendario estructurado desactualizado respecto a {', '.join(caducados)}, se ignora")
+                    else:
+                        eventos = datos.get("eventos", [])
+                self._indexar(eventos)
+                self._eventos = eventos
+        return self._eventos
+
+    def _indexar(self, eventos: list):
+        self._tokens = [_raices(f"{evento['seccion']} {evento['descripcion']} {evento['programa']}") for evento in eventos]
+        self._ordinales = [_ordinales(f"{evento['seccion']} {evento['descripcion']}") for evento in eventos]
+        frecuencias = Counter(token for tokens in self._tokens for token in tokens)
+        self._idf = {token: math.log(1 + len(eventos) / frecuencia) for token, frecuencia in frecuencias.items()}
+        self._idf_desconocido = math.log(1 + len(eventos)) if eventos else 0.0
+        self._campus = {evento["campus"] for evento in eventos if evento.get("campus")}
+
+    def __len__(self):
+        return len(self._cargar())
+
+    def _puntuar(self, pregunta: str) -> list:
+        eventos = self._cargar()
+        normalizada = normalizar_texto(pregunta)
+        tokens = _raices(pregunta)
+        if not eventos or not tokens:
+            return []
+
+        programa = _programa(pregunta)
+        campus = next((nombre for nombre in self._campus if nombre in normalizada), None)
+        ordinales = _ordinales(pregunta)
+        temas = tokens & _TEMAS_EXPLICITOS
+        total = sum(self._idf.get(token, self._idf_desconocido) for token in tokens)
+
+        puntuados = []
+        for evento, tokens_evento, ordinales_evento in zip(eventos, self._tokens, self._ordinales):
+            if evento["programa"] != programa and (programa != "general" or evento["programa"] in PROGRAMAS_EXPLICITOS) and evento["programa"] != "general":
+                continue
+            if campus and evento.get("campus") not in (campus, None):
+                continue
+            if not temas and tokens_evento & _TEMAS_EXPLICITOS:
+                continue
+            if any(sustantivo in ordinales_evento and not valores & ordinales_evento[sustantivo] for sustantivo, valores in ordinales.items()):
+                continue
+            puntuacion = sum(self._idf.get(token, 0.0) for token in tokens & tokens_evento) / total
+            puntuados.append((puntuacion, evento))
+        return sorted(puntuados, key=lambda par: par[0], reverse=True)
+
+    def buscar(self, pregunta: str):
+        puntuados = self._puntuar(pregunta)
+        if not puntuados or puntuados[0][0] < self.umbral:
+            return [], puntuados[0][0] if puntuados else 0.0
+
+        mejor = puntuados[0][0]
+        candidatos, vistos = [], set()
+        for puntuacion, evento in puntuados:
+            if puntuacion < mejor - self.margen:
+                break
+            clave = (evento["seccion"], evento["fecha"])
+            if clave not in vistos:
+                vistos.add(clave)
+                candidatos.append(evento)
+
+        if len(candidatos) > self.max_eventos:
+            return [], mejor
+        return candidatos, mejor
+
+
+def redactar_respuesta(eventos: list) -> str:
+    lineas = []
+    for evento in eventos:
+        titulo = f"**{evento['seccion']}**" if evento["seccion"] else ""
+        detalle = f" ({evento['descripcion']})" if evento["descripcion"] else ""
+        lineas.append(f"- {titulo}{': ' if titulo else ''}{evento['fecha']}{detalle}. _{evento['source']}, pág. {evento['page']}_")
+
+    return (
+        "Según el calendario académico vigente:\n\n"
+        + "\n".join(lineas)
+        + "\n\nSi tu titulación o centro tiene un calendario propio, confírmalo en la secretaría del centro."
+    )
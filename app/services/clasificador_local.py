@@ -0,0 +1,150 @@
+import datetime
+import json
+import os
+import re
+import threading
+import numpy as np
+from services.trazas import trazador
+from utils.texto import normalizar_texto
+
+CONFIANZA_REGLAS = 0.95
+
+REGLAS = {
+    "intencion": {
+        "recuperador": [
+            r"\bmatricul\w*", r"\bbecas?\b", r"\bcreditos?\b", r"\bconvalid\w*", r"\bsecretaria\b", r"\bbaremo\w*",
+            r"\b(grado|master|doctorado|tfg|tfm)\b", r"\b(examen|examenes|convocatoria\w*|cuatrimestre\w*)\b",
+            r"\b(plazos?|calendario academico)\b", r"\btitulo\w*", r"\b(normativa|reglamento)\b",
+        ],
+    },
+    "categoria": {
+        "calendario": [
+            r"\b(plazos?|fechas?|calendario|cuando|periodos?)\b", r"\b(empiezan?|comienzan?|terminan?|acaban?) (las )?clases\b",
+            r"\b(inicio|fin) de (las )?clases\b", r"\bdias? (lectivos?|festivos?)\b",
+        ],
+        "baremo": [
+            r"\bbaremo\w*", r"\bpuntua\w*", r"\bpuntos?\b", r"\bmeritos?\b", r"\btribunal\w*", r"\bcomision de seleccion\b",
+        ],
+        "normativo": [
+            r"\bnormativa\w*", r"\breglamento\w*", r"\breconoc\w* (de )?creditos?\b", r"\bcreditos?\b.*\breconoc\w*", r"\bconvalid\w*",
+            r"\btransferencia de creditos\b", r"\bpermanencia\b", r"\barticulo\b",
+        ],
+        "procedimental": [
+            r"\bcomo (hago|solicito|pido|anulo|presento|justifico|tramito|realizo|me matriculo)\b", r"\bpaso a paso\b",
+            r"\b(impreso|formulario|sede electronica|secretaria virtual)\b", r"\bliquida\w*", r"\bviajes?\b",
+        ],
+    },
+}
+
+_REGLAS_COMPILADAS = {
+    tarea: {etiqueta: [re.compile(patron) for patron in patrones] for etiqueta, patrones in etiquetas.items()}
+    for tarea, etiquetas in REGLAS.items()
+}
+
+def aplicar_reglas(tarea: str, pregunta: str):
+    texto = normalizar_texto(pregunta)
+    coincidencias = [
+        etiqueta for etiqueta, patrones in _REGLAS_COMPILADAS.get(tarea, {}).items()
+        if any(patron.search(texto) for patron in patrones)
+    ]
+    if len(coincidencias) == 1:
+        return coincidencias[0], CONFIANZA_REGLAS
+    return None, 0.0
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exponenciales = np.exp(logits)
+    return exponenciales / exponenciales.sum(axis=-1, keepdims=True)
+
+def entrenar_softmax(vectores: np.ndarray, etiquetas: list, iteraciones: int = 500, tasa: float = 0.5, regularizacion: float = 1e-3) -> dict:
+    clases = sorted(set(etiquetas))
+    indices = np.array([clases.index(etiqueta) for etiqueta in etiquetas])
+    objetivo = np.eye(len(clases))[indices]
+
+    pesos = np.zeros((vectores.shape[1], len(clases)))
+    sesgo = np.zeros(len(clases))
+    for _ in range(iteraciones):
+        error = (_softmax(vectores @ pesos + sesgo) - objetivo) / len(vectores)
+        pesos -= tasa * (vectores.T @ error + regularizacion * pesos)
+        sesgo -= tasa * error.sum(axis=0)
+    return {"pesos": pesos, "sesgo": sesgo, "clases": np.array(clases)}
+
+def predecir_softmax(modelo: dict, vectores: np.ndarray) -> np.ndarray:
+    return _softmax(vectores @ modelo["pesos"] + modelo["sesgo"])
+
+def guardar_modelos(ruta: str, modelos: dict, modelo_embeddings: str):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    arrays = {"modelo_embeddings": np.array(modelo_embeddings or "")}
+    for tarea, modelo in modelos.items():
+        for nombre, valor in modelo.items():
+            arrays[f"{tarea}__{nombre}"] = valor
+    with open(ruta + ".tmp", "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(ruta + ".tmp", ruta)
+
+
+class ClasificadorLocal:
+    def __init__(self, ruta_modelo: str, ruta_decisiones: str, modelo_embeddings: str = None, registrar: bool = True):
+        self.ruta_modelo = ruta_modelo
+        self.ruta_decisiones = ruta_decisiones
+        self.modelo_embeddings = modelo_embeddings or ""
+        self.registrar = registrar
+        self._modelos = None
+        self._lock = threading.Lock()
+
+    def _cargar(self) -> dict:
+        if self._modelos is not None:
+            return self._modelos
+
+        with self._lock:
+            if self._modelos is None:
+                modelos = {}
+                if os.path.exists(self.ruta_modelo):
+                    datos = np.load(self.ruta_modelo, allow_pickle=False)
+                    if str(datos["modelo_embeddings"]) != self.modelo_embeddings:
+                        trazador.aviso(f"Clasificador local entrenado con otros embeddings ({datos['modelo_embeddings']}), se ignora")
+                    else:
+                        for clave in datos.files:
+                            if "__" in clave:
+                                tarea, nombre = clave.split("__", 1)
+                                modelos.setdefault(tarea, {})[nombre] = datos[clave]
+                self._modelos = modelos
+        return self._modelos
+
+    def tiene_modelo(self, tarea: str) -> bool:
+        return tarea in self._cargar()
+
+    def clasificar(self, tarea: str, pregunta: str, vector=None):
+        etiqueta, confianza = aplicar_reglas(tarea, pregunta)
+        if etiqueta is not None:
+            return etiqueta, confianza, "reglas"
+
+        modelo = self._cargar().get(tarea)
+        if modelo is None or vector is None:
+            return None, 0.0, None
+
+        probabilidades = predecir_softmax(modelo, np.asarray(vector, dtype=np.float64)[None, :])[0]
+        mejor = int(probabilidades.argmax())
+        return str(modelo["clases"][mejor]), float(probabilidades[mejor]), "modelo"
+
+    def registrar_decision(self, tarea: str, pregunta: str, etiqueta: str):
+        if not self.registrar:
+            return
+
+        registro = {
+            "tarea": tarea,
+            "pregunta": pregunta,
+            "etiqueta": etiqueta,
+            "fecha": datetime.datetime.now().isoformat(timespec="seconds")
+        }
+        with self._lock:
+            os.makedirs(os.path.dirname(self.ruta_decisiones), exist_ok=True)
+            with open(self.ruta_decisiones, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+def leer_decisiones(ruta: str) -> list:
+    if not os.path.exists(ruta):
+        return []
+    with open(ruta, encoding="utf-8") as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
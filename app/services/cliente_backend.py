@@ -0,0 +1,59 @@
+import json
+import httpx
+from utils.config import settings
+
+class ErrorBackend(Exception):
+    def __init__(self, mensaje: str, limite_tasa: bool = False):
+        super().__init__(mensaje)
+        self.limite_tasa = limite_tasa
+
+
+def leer_eventos_sse(lineas):
+    evento, datos = "message", []
+    for linea in lineas:
+        if not linea:
+            if datos:
+                yield evento, json.loads("\n".join(datos))
+            evento, datos = "message", []
+        elif linea.startswith("event:"):
+            evento = linea[6:].strip()
+        elif linea.startswith("data:"):
+            datos.append(linea[5:].lstrip())
+
+
+class ClienteBackend:
+    def __init__(self, url: str, tiempo_espera: float):
+        self.url = url
+        self.cliente = httpx.Client(timeout=httpx.Timeout(tiempo_espera, connect=10.0))
+
+    def _eventos(self, cuerpo: dict):
+        with self.cliente.stream("POST", f"{self.url}/consultas", json=cuerpo) as respuesta:
+            respuesta.raise_for_status()
+            for evento, datos in leer_eventos_sse(respuesta.iter_lines()):
+                if evento == "error":
+                    raise ErrorBackend(datos["mensaje"], datos.get("limite_tasa", False))
+                yield evento, datos
+
+    def _fragmentos(self, eventos):
+        for evento, datos in eventos:
+            if evento == "fin":
+                return
+            if evento == "fragmento":
+                yield datos
+
+    def consultar(self, id_peticion: str, pregunta: str, historial: list, resumen_historial: str = "", mensajes_resumidos: int = 0) -> dict:
+        eventos = self._eventos({
+            "id_peticion": id_peticion,
+            "pregunta": pregunta,
+            "historial": historial,
+            "resumen_historial": resumen_historial,
+            "mensajes_resumidos": mensajes_resumidos
+        })
+        evento, datos = next(eventos)
+        if evento != "consulta":
+            raise ErrorBackend(f"Respuesta inesperada del backend: {evento}")
+        return {**datos, "stream": self._fragmentos(eventos)}
+
+
+def crear_cliente_backend() -> ClienteBackend:
+    return ClienteBackend(settings.URL_BACKEND, settings.TIEMPO_ESPERA_BACKEND)
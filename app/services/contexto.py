@@ -0,0 +1,133 @@
+import math
+import re
+import zlib
+import numpy as np
+from langchain_core.documents import Document
+from utils.texto import estimar_tokens, normalizar_texto, tokenizar
+
+PERMUTACIONES_MINHASH = 64
+TAMANO_SHINGLE = 4
+SOLAPAMIENTO_MINIMO = 20
+_PRIMO = 4294967311
+
+_generador = np.random.default_rng(7)
+_COEFICIENTES = _generador.integers(1, 1 << 31, size=PERMUTACIONES_MINHASH, dtype=np.uint64)
+_DESPLAZAMIENTOS = _generador.integers(0, 1 << 31, size=PERMUTACIONES_MINHASH, dtype=np.uint64)
+
+_FRASE = re.compile(r"(?<=[.;!?])\s+|\n(?=\s*(?:[•·\-–]|\d+[.)º]|[a-z]\))\s)")
+
+def _shingles(texto: str) -> set:
+    palabras = normalizar_texto(texto).split()
+    if len(palabras) <= TAMANO_SHINGLE:
+        return {" ".join(palabras)}
+    return {" ".join(palabras[i:i + TAMANO_SHINGLE]) for i in range(len(palabras) - TAMANO_SHINGLE + 1)}
+
+def firma_minhash(texto: str) -> np.ndarray:
+    hashes = np.array([zlib.crc32(shingle.encode("utf-8")) for shingle in _shingles(texto)], dtype=np.uint64)
+    return ((np.outer(hashes, _COEFICIENTES) + _DESPLAZAMIENTOS) % _PRIMO).min(axis=0)
+
+def similitud_minhash(firma_a: np.ndarray, firma_b: np.ndarray) -> float:
+    return float((firma_a == firma_b).mean())
+
+def _solapamiento(anterior: str, siguiente: str) -> int:
+    cabeza = siguiente[:SOLAPAMIENTO_MINIMO]
+    posicion = anterior.find(cabeza)
+    while posicion >= 0:
+        if siguiente.startswith(anterior[posicion:]):
+            return len(anterior) - posicion
+        posicion = anterior.find(cabeza, posicion + 1)
+    return 0
+
+def _unir(a: Document, b: Document):
+    if b.page_content in a.page_content:
+        return a.page_content, a.metadata.get("inicio", -1)
+    if a.page_content in b.page_content:
+        return b.page_content, b.metadata.get("inicio", -1)
+
+    inicio_a, inicio_b = a.metadata.get("inicio", -1), b.metadata.get("inicio", -1)
+    if inicio_a >= 0 and inicio_b >= 0:
+        if inicio_b < inicio_a:
+            a, b, inicio_a, inicio_b = b, a, inicio_b, inicio_a
+        fin_a = inicio_a + len(a.page_content)
+        if inicio_b <= fin_a:
+            return a.page_content + b.page_content[fin_a - inicio_b:], inicio_a
+        if inicio_b - fin_a <= 2:
+            return a.page_content + "\n" + b.page_content, inicio_a
+        return None
+
+    for primero, segundo in ((a, b), (b, a)):
+        solapado = _solapamiento(primero.page_content, segundo.page_content)
+        if solapado >= SOLAPAMIENTO_MINIMO:
+            return primero.page_content + segundo.page_content[solapado:], -1
+    return None
+
+def _clave(doc: Document) -> tuple:
+    return doc.metadata.get("source"), doc.metadata.get("page")
+
+def fusionar_fragmentos(docs: list) -> list:
+    resultado = []
+    for doc in docs:
+        actual, posicion, i = doc, len(resultado), 0
+        while i < len(resultado):
+            union = _unir(resultado[i], actual) if _clave(resultado[i]) == _clave(actual) else None
+            if union is None:
+                i += 1
+                continue
+            texto, inicio = union
+            actual = Document(page_content=texto, metadata={**resultado[i].metadata, "inicio": inicio})
+            posicion = min(posicion, i)
+            resultado.pop(i)
+            i = 0
+        resultado.insert(posicion, actual)
+    return resultado
+
+def deduplicar(docs: list, umbral: float) -> list:
+    conservados, firmas = [], []
+    for doc in docs:
+        firma = firma_minhash(doc.page_content)
+        if any(similitud_minhash(firma, previa) >= umbral for previa in firmas):
+            continue
+        conservados.append(doc)
+        firmas.append(firma)
+    return conservados
+
+def ensamblar_contexto(docs: list, umbral_duplicados: float) -> list:
+    return deduplicar(fusionar_fragmentos(docs), umbral_duplicados)
+
+def recortar_contexto(contexto: str, pregunta: str, presupuesto: int) -> str:
+    if not contexto or estimar_tokens(contexto) <= presupuesto:
+        return contexto
+
+    frases = [
+        (i, j, frase.strip())
+        for i, pasaje in enumerate(contexto.split("\n\n"))
+        for j, frase in enumerate(_FRASE.split(pasaje))
+        if frase.strip()
+    ]
+    tokens = [set(tokenizar(frase)) for _, _, frase in frases]
+    frecuencias = {}
+    for conjunto in tokens:
+        for token in conjunto:
+            frecuencias[token] = frecuencias.get(token, 0) + 1
+
+    consulta = set(tokenizar(pregunta))
+    puntuaciones = [sum(math.log(1 + len(frases) / frecuencias[token]) for token in consulta & conjunto) for conjunto in tokens]
+    orden = sorted(range(len(frases)), key=lambda k: (-puntuaciones[k], frases[k][0], frases[k][1]))
+
+    seleccion = set()
+    restante = presupuesto
+    for k in orden:
+        if not puntuaciones[k] and len(tokens[k]) < 4:
+            continue
+        coste = estimar_tokens(frases[k][2]) + 1
+        if coste <= restante:
+            seleccion.add(k)
+            restante -= coste
+
+    if not seleccion:
+        return frases[orden[0]][2][:presupuesto * 4]
+
+    pasajes = {}
+    for k in sorted(seleccion):
+        pasajes.setdefault(frases[k][0], []).append(frases[k][2])
+    return "\n\n".join(" ".join(partes) for _, partes in sorted(pasajes.items()))
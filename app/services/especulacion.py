@@ -0,0 +1,102 @@
+import asyncio
+import threading
+
+class RespuestaEspeculativa:
+    def __init__(self, categoria: str, pregunta: str, contexto: str):
+        self.categoria = categoria
+        self.pregunta = pregunta
+        self.contexto = contexto
+        self._fragmentos = []
+        self._terminada = False
+        self._error = None
+        self._cancelada = threading.Event()
+        self._condicion = threading.Condition()
+        self._aviso = None
+        self._tarea = None
+
+    @classmethod
+    def iniciar(cls, categoria: str, pregunta: str, contexto: str, stream):
+        especulacion = cls(categoria, pregunta, contexto)
+        threading.Thread(target=especulacion._consumir, args=(stream,), daemon=True).start()
+        return especulacion
+
+    @classmethod
+    def ainiciar(cls, categoria: str, pregunta: str, contexto: str, stream):
+        especulacion = cls(categoria, pregunta, contexto)
+        especulacion._aviso = asyncio.Event()
+        especulacion._tarea = asyncio.create_task(especulacion._aconsumir(stream))
+        return especulacion
+
+    def coincide(self, categoria: str, pregunta: str, contexto: str) -> bool:
+        return (categoria, pregunta, contexto) == (self.categoria, self.pregunta, self.contexto)
+
+    def _consumir(self, stream):
+        try:
+            for fragmento in stream:
+                if self._cancelada.is_set():
+                    break
+                with self._condicion:
+                    self._fragmentos.append(fragmento)
+                    self._condicion.notify_all()
+        except Exception as e:
+            self._error = e
+        finally:
+            stream.close()
+            with self._condicion:
+                self._terminada = True
+                self._condicion.notify_all()
+
+    async def _aconsumir(self, stream):
+        try:
+            async for fragmento in stream:
+                self._fragmentos.append(fragmento)
+                self._aviso.set()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._terminada = True
+            self._aviso.set()
+
+    def cancelar(self):
+        self._cancelada.set()
+        if self._tarea is not None:
+            self._tarea.cancel()
+
+    def liberar(self):
+        emitidos = 0
+        try:
+            while True:
+                with self._condicion:
+                    while emitidos == len(self._fragmentos) and not self._terminada:
+                        self._condicion.wait()
+                    nuevos = self._fragmentos[emitidos:]
+                    terminada = self._terminada
+                emitidos += len(nuevos)
+                yield from nuevos
+                if terminada:
+                    break
+            if self._error is not None:
+                raise self._error
+        finally:
+            if not self._terminada:
+                self.cancelar()
+
+    async def aliberar(self):
+        emitidos = 0
+        try:
+            while True:
+                if emitidos < len(self._fragmentos):
+                    nuevos = self._fragmentos[emitidos:]
+                    emitidos += len(nuevos)
+                    for fragmento in nuevos:
+                        yield fragmento
+                    continue
+                if self._terminada:
+                    break
+                self._aviso.clear()
+                await self._aviso.wait()
+            if self._error is not None:
+                raise self._error
+        finally:
+            if not self._terminada:
+                self.cancelar()
@@ -0,0 +1,116 @@
+import datetime
+import json
+import os
+import threading
+from collections import Counter
+from services.trazas import trazador
+from utils.config import obtener_version_corpus
+from utils.texto import normalizar_texto
+
+def guardar_faq(ruta: str, entradas: list, version_corpus: str, modelo_embeddings: str):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    datos = {
+        "generado": datetime.datetime.now().isoformat(timespec="seconds"),
+        "version_corpus": version_corpus,
+        "modelo_embeddings": modelo_embeddings,
+        "entradas": entradas
+    }
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+    os.replace(ruta + ".tmp", ruta)
+
+def minar_preguntas(decisiones: list, minimo: int, maximo: int) -> list:
+    frecuencias = Counter()
+    originales, rutas, rechazadas = {}, {}, set()
+    for decision in decisiones:
+        clave = normalizar_texto(decision["pregunta"])
+        if decision.get("tarea") == "categoria":
+            rutas[clave] = decision["etiqueta"]
+        elif decision.get("tarea") == "intencion":
+            if decision.get("etiqueta") == "rechazo_amable":
+                rechazadas.add(clave)
+            frecuencias[clave] += 1
+            originales.setdefault(clave, decision["pregunta"])
+    return [
+        {"pregunta": originales[clave], "ruta": rutas.get(clave)}
+        for clave, veces in frecuencias.most_common()
+        if veces >= minimo and clave not in rechazadas
+    ][:maximo]
+
+def generar_entrada(asistente, pregunta: dict) -> dict:
+    contexto, referencias = asistente.buscar_contexto(pregunta["pregunta"])
+    ruta = pregunta.get("ruta") or asistente.clasificar_categoria(pregunta["pregunta"], "", contexto)
+    respuesta = "".join(asistente.responder_consulta(contexto, "", pregunta["pregunta"], ruta))
+    return {
+        "pregunta": pregunta["pregunta"],
+        "variantes": pregunta.get("variantes", []),
+        "ruta": ruta,
+        "respuesta": respuesta,
+        "referencias": referencias,
+        "vector": [float(valor) for valor in asistente.vector_consulta(pregunta["pregunta"])]
+    }
+
+def construir_faq(asistente, preguntas: list, ruta: str, modelo_embeddings: str) -> list:
+    version_corpus = obtener_version_corpus()
+    entradas, vistas = [], set()
+    for pregunta in preguntas:
+        clave = normalizar_texto(pregunta["pregunta"])
+        if clave in vistas:
+            continue
+        vistas.add(clave)
+        try:
+            entradas.append(generar_entrada(asistente, pregunta))
+            print(f"[{entradas[-1]['ruta']}] {pregunta['pregunta']}")
+        except Exception as e:
+            print(f"No se ha podido generar la respuesta de '{pregunta['pregunta']}': {e}")
+
+    guardar_faq(ruta, entradas, version_corpus, modelo_embeddings)
+    return entradas
+
+
+class AlmacenFAQ:
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._datos = None
+        self._avisado = False
+        self._lock = threading.Lock()
+
+    def _cargar(self) -> dict:
+        if self._datos is not None:
+            return self._datos
+
+        with self._lock:
+            if self._datos is None:
+                datos = {"version_corpus": None, "entradas": []}
+                if os.path.exists(self.ruta):
+                    with open(self.ruta, encoding="utf-8") as f:
+                        datos = json.load(f)
+                self._indexar(datos["entradas"])
+                self._datos = datos
+        return self._datos
+
+    def _indexar(self, entradas: list):
+        self._exactas = {}
+        for posicion, entrada in enumerate(entradas):
+            for texto in [entrada["pregunta"], *entrada.get("variantes", [])]:
+                self._exactas[normalizar_texto(texto)] = posicion
+
+    def vigentes(self) -> list:
+        datos = self._cargar()
+        if datos["version_corpus"] != obtener_version_corpus():
+            if datos["entradas"] and not self._avisado:
+                self._avisado = True
+                trazador.aviso(f"Preguntas frecuentes generadas para el corpus {datos['version_corpus']}, se ignoran")
+            return []
+        return datos["entradas"]
+
+    def modelo_embeddings(self) -> str:
+        return self._cargar().get("modelo_embeddings")
+
+    def buscar(self, pregunta: str):
+        entradas = self.vigentes()
+        posicion = self._exactas.get(normalizar_texto(pregunta)) if entradas else None
+        return entradas[posicion] if posicion is not None else None
+
+    def __len__(self):
+        return len(self.vigentes())
@@ -0,0 +1,72 @@
+import re
+from utils.config import settings
+from utils.texto import estimar_tokens
+
+PATRON_FUENTES = re.compile(r"\s*\*\*Fuentes consultadas\*\*.*", re.DOTALL)
+CABECERA_RESUMEN = "Resumen de la conversación anterior:"
+
+def limpiar_mensaje(contenido: str) -> str:
+    return PATRON_FUENTES.sub("", contenido or "").strip()
+
+def _formatear_mensajes(mensajes: list) -> list:
+    return [f"{msg['role']}: {limpiar_mensaje(msg['content'])}" for msg in mensajes]
+
+def _ventana_reciente(historial: list, turnos_recientes: int) -> int:
+    return max(len(historial) - (2 * turnos_recientes + 1), 0)
+
+def formatear_historial(historial: list, resumen: str = "", turnos_recientes: int = None) -> str:
+    if not historial:
+        return ""
+    
+    turnos_recientes = settings.TURNOS_HISTORIAL if turnos_recientes is None else turnos_recientes
+    bloques = _formatear_mensajes(historial[_ventana_reciente(historial, turnos_recientes):])
+    if resumen:
+        bloques.insert(0, f"{CABECERA_RESUMEN} {resumen}")
+    return "\n".join(bloques)
+
+def recortar_historial(historial_formateado: str, presupuesto: int) -> str:
+    if not historial_formateado:
+        return ""
+    if estimar_tokens(historial_formateado) <= presupuesto:
+        return historial_formateado
+    
+    lineas = historial_formateado.split("\n")
+    resumen = lineas.pop(0) if lineas[0].startswith(CABECERA_RESUMEN) else None
+    
+    bloques = [m.group(0).strip() for m in re.finditer(r"(?ms)^(?:user|assistant): .*?(?=^(?:user|assistant): |\Z)", "\n".join(lineas))]
+    seleccion = []
+    restante = presupuesto
+    for bloque in reversed(bloques):
+        coste = estimar_tokens(bloque)
+        if coste > restante:
+            if not seleccion:
+                seleccion.append(bloque[max(len(bloque) - restante * 4, 0):])
+            break
+        seleccion.insert(0, bloque)
+        restante -= coste
+    
+    if resumen and estimar_tokens(resumen) <= restante:
+        seleccion.insert(0, resumen)
+    return "\n".join(seleccion)
+
+
+class GestorHistorial:
+    def __init__(self, resumir, turnos_recientes: int = None):
+        self.resumir = resumir
+        self.turnos_recientes = settings.TURNOS_HISTORIAL if turnos_recientes is None else turnos_recientes
+
+    def actualizar_resumen(self, historial: list, resumen: str, mensajes_resumidos: int):
+        limite = _ventana_reciente(historial, self.turnos_recientes)
+        if limite <= mensajes_resumidos:
+            return resumen, mensajes_resumidos
+        
+        nuevos = "\n".join(_formatear_mensajes(historial[mensajes_resumidos:limite]))
+        resumen = self.resumir({
+            "resumen": resumen or "(sin resumen previo)",
+            "mensajes": nuevos
+        }).strip()
+        return resumen, limite
+
+    def preparar(self, historial: list, resumen: str = "", mensajes_resumidos: int = 0):
+        resumen, mensajes_resumidos = self.actualizar_resumen(historial, resumen, mensajes_resumidos)
+        return formatear_historial(historial, resumen, self.turnos_recientes), resumen, mensajes_resumidos
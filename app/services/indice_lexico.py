@@ -0,0 +1,107 @@
+import json
+import math
+import os
+import threading
+from collections import Counter, defaultdict
+from langchain_core.documents import Document
+from services.metadatos import cumple_filtro
+from utils.texto import tokenizar
+
+class IndiceBM25:
+    def __init__(self, ruta: str = None, k1: float = 1.5, b: float = 0.75):
+        self.ruta = ruta
+        self.k1 = k1
+        self.b = b
+        self._documentos = {}
+        self._lock = threading.RLock()
+        self._cargar()
+
+    def _cargar(self):
+        if not self.ruta or not os.path.exists(self.ruta):
+            self._reconstruir()
+            return
+
+        with open(self.ruta, encoding="utf-8") as f:
+            datos = json.load(f)
+
+        self._documentos = {
+            id_doc: (texto, metadatos)
+            for id_doc, texto, metadatos in zip(datos["ids"], datos["textos"], datos["metadatos"])
+        }
+        self._reconstruir()
+
+    def _reconstruir(self):
+        self._sucio = False
+        self._postings = defaultdict(dict)
+        self._longitudes = {}
+        for id_doc, (texto, _) in self._documentos.items():
+            frecuencias = Counter(tokenizar(texto))
+            self._longitudes[id_doc] = sum(frecuencias.values())
+            for token, frecuencia in frecuencias.items():
+                self._postings[token][id_doc] = frecuencia
+
+        total = len(self._longitudes)
+        self._longitud_media = (sum(self._longitudes.values()) / total) if total else 0.0
+        self._idf = {
+            token: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for token, docs in self._postings.items()
+        }
+
+    def guardar(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+            ids = list(self._documentos)
+            datos = {
+                "ids": ids,
+                "textos": [self._documentos[i][0] for i in ids],
+                "metadatos": [self._documentos[i][1] for i in ids]
+            }
+            with open(self.ruta + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(datos, f, ensure_ascii=False)
+            os.replace(self.ruta + ".tmp", self.ruta)
+
+    def agregar(self, ids: list, textos: list, metadatos: list):
+        with self._lock:
+            for id_doc, texto, meta in zip(ids, textos, metadatos):
+                self._documentos[id_doc] = (texto, meta)
+            self._sucio = True
+
+    def eliminar(self, ids: list):
+        with self._lock:
+            for id_doc in ids:
+                self._documentos.pop(id_doc, None)
+            self._sucio = True
+
+    def vaciar(self):
+        with self._lock:
+            self._documentos = {}
+            self._sucio = True
+
+    def buscar(self, consulta: str, k: int = 10, filtro: dict = None) -> list:
+        with self._lock:
+            if self._sucio:
+                self._reconstruir()
+            
+            puntuaciones = defaultdict(float)
+            for token in set(tokenizar(consulta)):
+                idf = self._idf.get(token)
+                if idf is None:
+                    continue
+                for id_doc, frecuencia in self._postings[token].items():
+                    normalizacion = 1 - self.b + self.b * self._longitudes[id_doc] / (self._longitud_media or 1.0)
+                    puntuaciones[id_doc] += idf * frecuencia * (self.k1 + 1) / (frecuencia + self.k1 * normalizacion)
+
+            if filtro:
+                puntuaciones = {
+                    id_doc: puntuacion for id_doc, puntuacion in puntuaciones.items()
+                    if cumple_filtro(self._documentos[id_doc][1], filtro)
+                }
+
+            mejores = sorted(puntuaciones.items(), key=lambda par: par[1], reverse=True)[:k]
+            return [
+                (Document(id=id_doc, page_content=self._documentos[id_doc][0], metadata=dict(self._documentos[id_doc][1])), puntuacion)
+                for id_doc, puntuacion in mejores
+            ]
+
+    def __len__(self):
+        return len(self._documentos)
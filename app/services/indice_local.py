@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+import uuid
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from services.metadatos import cumple_filtro
+
+FICHERO_VECTORES = "vectores.npy"
+FICHERO_DOCUMENTOS = "documentos.json"
+
+class IndiceLocal(VectorStore):
+    def __init__(self, embedding, ruta: str):
+        self._embedding = embedding
+        self.ruta = ruta
+        self._vectores = np.zeros((0, 0), dtype=np.float32)
+        self._ids = []
+        self._textos = []
+        self._metadatos = []
+        self._lock = threading.RLock()
+        self._cargar()
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def _cargar(self):
+        ruta_vectores = os.path.join(self.ruta, FICHERO_VECTORES)
+        ruta_documentos = os.path.join(self.ruta, FICHERO_DOCUMENTOS)
+        if not (os.path.exists(ruta_vectores) and os.path.exists(ruta_documentos)):
+            return
+        
+        with open(ruta_documentos, encoding="utf-8") as f:
+            datos = json.load(f)
+        
+        self._vectores = np.load(ruta_vectores, mmap_mode="r")
+        self._ids = datos["ids"]
+        self._textos = datos["textos"]
+        self._metadatos = datos["metadatos"]
+
+    def guardar(self):
+        with self._lock:
+            os.makedirs(self.ruta, exist_ok=True)
+            ruta_vectores = os.path.join(self.ruta, FICHERO_VECTORES)
+            ruta_documentos = os.path.join(self.ruta, FICHERO_DOCUMENTOS)
+            
+            with open(ruta_vectores + ".tmp", "wb") as f:
+                np.save(f, np.ascontiguousarray(self._vectores, dtype=np.float32))
+            with open(ruta_documentos + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"ids": self._ids, "textos": self._textos, "metadatos": self._metadatos}, f, ensure_ascii=False)
+            
+            os.replace(ruta_vectores + ".tmp", ruta_vectores)
+            os.replace(ruta_documentos + ".tmp", ruta_documentos)
+            self._vectores = np.load(ruta_vectores, mmap_mode="r")
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        textos = list(texts)
+        vectores = self._embedding.embed_documents(textos)
+        return self.agregar_vectores(textos, vectores, metadatas, ids)
+
+    def agregar_vectores(self, textos: list, vectores: list, metadatas: list = None, ids: list = None):
+        metadatas = metadatas or [{} for _ in textos]
+        ids = ids or [uuid.uuid4().hex for _ in textos]
+        
+        nuevos = np.asarray(vectores, dtype=np.float32)
+        nuevos = nuevos / np.clip(np.linalg.norm(nuevos, axis=1, keepdims=True), 1e-12, None)
+        
+        with self._lock:
+            self.delete(ids)
+            vectores_actuales = np.asarray(self._vectores, dtype=np.float32)
+            self._vectores = nuevos if vectores_actuales.size == 0 else np.vstack([vectores_actuales, nuevos])
+            self._ids.extend(ids)
+            self._textos.extend(textos)
+            self._metadatos.extend(metadatas)
+        return ids
+
+    def delete(self, ids=None, delete_all: bool = False, **kwargs):
+        if delete_all:
+            with self._lock:
+                vaciado = bool(self._ids)
+                self._vectores = np.zeros((0, 0), dtype=np.float32)
+                self._ids, self._textos, self._metadatos = [], [], []
+            return vaciado
+        if not ids:
+            return False
+        
+        with self._lock:
+            eliminar = set(ids)
+            conservar = [i for i, id_doc in enumerate(self._ids) if id_doc not in eliminar]
+            if len(conservar) == len(self._ids):
+                return False
+            
+            self._vectores = np.asarray(self._vectores, dtype=np.float32)[conservar]
+            self._ids = [self._ids[i] for i in conservar]
+            self._textos = [self._textos[i] for i in conservar]
+            self._metadatos = [self._metadatos[i] for i in conservar]
+        return True
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4, filter: dict = None, **kwargs):
+        with self._lock:
+            if len(self._ids) == 0:
+                return []
+            
+            consulta = np.asarray(embedding, dtype=np.float32)
+            consulta = consulta / (np.linalg.norm(consulta) or 1.0)
+            similitudes = np.asarray(self._vectores @ consulta)
+            
+            if filter:
+                validos = np.array([cumple_filtro(m, filter) for m in self._metadatos])
+                similitudes = np.where(validos, similitudes, -np.inf)
+            
+            k = min(k, len(self._ids))
+            candidatos = np.argpartition(-similitudes, k - 1)[:k]
+            orden = candidatos[np.argsort(-similitudes[candidatos])]
+            
+            return [
+                (Document(id=self._ids[i], page_content=self._textos[i], metadata=dict(self._metadatos[i])), float(similitudes[i]))
+                for i in orden if np.isfinite(similitudes[i])
+            ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        vector = self._embedding.embed_query(query)
+        return self.similarity_search_by_vector_with_score(vector, k=k, filter=filter)
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, filter: dict = None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict = None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def _select_relevance_score_fn(self):
+        return lambda similitud: similitud
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, ruta: str = None, **kwargs):
+        indice = cls(embedding, ruta)
+        indice.add_texts(texts, metadatas=metadatas, ids=ids)
+        indice.guardar()
+        return indice
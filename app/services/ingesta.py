@@ -0,0 +1,248 @@
+import datetime
+import hashlib
+import json
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pypdf import PdfReader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from services.metadatos import metadatos_documento
+from utils.config import settings
+
+VERSION_METADATOS = 3
+
+_INICIO_SECCION = re.compile(
+    r"^\s*(?:art[íi]culo\s+\d+|cap[íi]tulo\s+[\divxlc]+|t[íi]tulo\s+[\divxlc]+|disposici[óo]n\s|anexo\b|\d+(?:\.\d+)*\.?\s+[A-ZÁÉÍÓÚÑ])",
+    re.IGNORECASE | re.MULTILINE
+)
+
+def _hash_archivo(ruta: str) -> str:
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+def _id_fragmento(nombre: str, pagina: int, texto: str, id_padre: str = None) -> str:
+    return hashlib.sha256(f"{nombre}|{pagina}|{id_padre or ''}|{texto}".encode("utf-8")).hexdigest()[:32]
+
+def _id_padre(nombre: str, pagina: int, texto: str) -> str:
+    return hashlib.sha256(f"{nombre}|{pagina}|padre|{texto}".encode("utf-8")).hexdigest()[:32]
+
+def _secciones(texto: str, tamano_padre: int) -> list:
+    cortes = sorted({0, *(m.start() for m in _INICIO_SECCION.finditer(texto))})
+    secciones = [(inicio, texto[inicio:fin]) for inicio, fin in zip(cortes, cortes[1:] + [len(texto)])]
+
+    padres = []
+    for inicio, seccion in secciones:
+        if padres and len(padres[-1][1]) + len(seccion) <= tamano_padre:
+            padres[-1] = (padres[-1][0], padres[-1][1] + seccion)
+        elif len(seccion) <= tamano_padre:
+            padres.append((inicio, seccion))
+        else:
+            divisor = RecursiveCharacterTextSplitter(chunk_size=tamano_padre, chunk_overlap=0)
+            cursor = 0
+            for trozo in divisor.split_text(seccion):
+                posicion = seccion.find(trozo, cursor)
+                cursor = max(posicion, cursor)
+                padres.append((inicio + cursor, trozo))
+    return [(inicio, padre) for inicio, padre in padres if padre.strip()]
+
+def _procesar_paginas(tarea: tuple) -> list:
+    ruta, nombre, primera, ultima, tamano, solapamiento, tamano_padre = tarea
+    divisor = RecursiveCharacterTextSplitter(chunk_size=tamano, chunk_overlap=solapamiento)
+    lector = PdfReader(ruta)
+    metadatos = metadatos_documento(nombre)
+
+    fragmentos = []
+    for numero in range(primera, ultima):
+        texto = lector.pages[numero].extract_text() or ""
+        secciones = _secciones(texto, tamano_padre) if tamano_padre else [(0, texto)]
+        for inicio_seccion, seccion in secciones:
+            padre = None
+            if tamano_padre:
+                id_padre = _id_padre(nombre, numero + 1, seccion)
+                padre = (id_padre, seccion, {"source": nombre, "page": numero + 1, "inicio": inicio_seccion, **metadatos})
+            cursor = 0
+            for trozo in divisor.split_text(seccion):
+                id_fragmento = _id_fragmento(nombre, numero + 1, trozo, padre[0] if padre else None)
+                inicio = seccion.find(trozo, cursor)
+                if inicio >= 0:
+                    cursor = inicio + 1
+                    inicio += inicio_seccion
+                fragmentos.append((id_fragmento, trozo, {
+                    "source": nombre,
+                    "page": numero + 1,
+                    "id_fragmento": id_fragmento,
+                    "inicio": inicio,
+                    **({"id_padre": padre[0]} if padre else {}),
+                    **metadatos
+                }, padre))
+    return fragmentos
+
+def _tareas_archivo(ruta: str, nombre: str) -> list:
+    total_paginas = len(PdfReader(ruta).pages)
+    if settings.INDICE_PADRES:
+        tamanos = (settings.TAMANO_FRAGMENTO_HIJO, settings.SOLAPAMIENTO_FRAGMENTO_HIJO, settings.TAMANO_FRAGMENTO_PADRE)
+    else:
+        tamanos = (settings.TAMANO_FRAGMENTO, settings.SOLAPAMIENTO_FRAGMENTO, 0)
+    return [
+        (ruta, nombre, inicio, min(inicio + settings.PAGINAS_POR_TAREA, total_paginas), *tamanos)
+        for inicio in range(0, total_paginas, settings.PAGINAS_POR_TAREA)
+    ]
+
+def leer_manifiesto(ruta: str = None) -> dict:
+    ruta = ruta or settings.RUTA_MANIFIESTO
+    if not os.path.exists(ruta):
+        return {"version_corpus": None, "archivos": {}}
+
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+def _escribir_manifiesto(manifiesto: dict, ruta: str):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+    os.replace(ruta + ".tmp", ruta)
+
+def _calcular_version(archivos: dict) -> str:
+    ids = sorted(id_fragmento for datos in archivos.values() for id_fragmento in datos["fragmentos"])
+    return hashlib.sha256("\n".join(ids).encode("utf-8")).hexdigest()[:12]
+
+def _ejecutar_acotado(pool, funcion, tareas: list, en_vuelo: int):
+    pendientes = deque()
+    for tarea in tareas:
+        pendientes.append(pool.submit(funcion, tarea))
+        if len(pendientes) >= en_vuelo:
+            yield pendientes.popleft().result()
+    while pendientes:
+        yield pendientes.popleft().result()
+
+class _Subidor:
+    def __init__(self, vectorstore, tamano_lote: int, indice_lexico=None):
+        self.vectorstore = vectorstore
+        self.indice_lexico = indice_lexico
+        self.tamano_lote = tamano_lote
+        self.pendientes = []
+        self.total = 0
+
+    def agregar(self, fragmento: tuple):
+        self.pendientes.append(fragmento[:3])
+        if len(self.pendientes) >= self.tamano_lote:
+            self.vaciar()
+
+    def vaciar(self):
+        if not self.pendientes:
+            return
+
+        ids, textos, metadatos = zip(*self.pendientes)
+        self.vectorstore.add_texts(list(textos), metadatas=list(metadatos), ids=list(ids))
+        if self.indice_lexico is not None:
+            self.indice_lexico.agregar(list(ids), list(textos), list(metadatos))
+        self.total += len(self.pendientes)
+        self.pendientes = []
+
+def ingestar(vectorstore, ruta_pdfs: str = None, ruta_manifiesto: str = None, forzar: bool = False, procesos: int = None, indice_lexico=None, almacen_padres=None) -> dict:
+    ruta_pdfs = ruta_pdfs or settings.RUTA_PDFS
+    ruta_manifiesto = ruta_manifiesto or settings.RUTA_MANIFIESTO
+    manifiesto_anterior = leer_manifiesto(ruta_manifiesto)
+    anterior = manifiesto_anterior["archivos"]
+
+    if not anterior:
+        print("No hay manifiesto previo, se vacía el índice antes de indexar")
+        vectorstore.delete(delete_all=True)
+        if indice_lexico is not None:
+            indice_lexico.vaciar()
+
+    if anterior and manifiesto_anterior.get("version_metadatos") != VERSION_METADATOS:
+        print("Los fragmentos indexados tienen metadatos de una versión anterior, se reprocesan todos los documentos")
+        forzar = True
+    
+    if indice_lexico is not None and len(indice_lexico) == 0 and anterior:
+        print("El índice léxico está vacío, se reprocesan todos los documentos")
+        forzar = True
+
+    if anterior and manifiesto_anterior.get("indice_padres", False) != settings.INDICE_PADRES:
+        print("Ha cambiado la configuración del índice de padres, se reprocesan todos los documentos")
+        forzar = True
+    
+    if almacen_padres is not None and settings.INDICE_PADRES and len(almacen_padres) == 0 and anterior:
+        print("El almacén de padres está vacío, se reprocesan todos los documentos")
+        forzar = True
+
+    actuales = {}
+    for nombre in sorted(os.listdir(ruta_pdfs)):
+        if nombre.lower().endswith(".pdf"):
+            ruta = os.path.join(ruta_pdfs, nombre)
+            actuales[nombre] = (ruta, _hash_archivo(ruta))
+
+    archivos = {}
+    a_procesar = []
+    for nombre, (ruta, hash_archivo) in actuales.items():
+        if not forzar and anterior.get(nombre, {}).get("hash") == hash_archivo:
+            archivos[nombre] = anterior[nombre]
+        else:
+            a_procesar.append(nombre)
+
+    a_eliminar = [id_fragmento for nombre, datos in anterior.items() if nombre not in actuales for id_fragmento in datos["fragmentos"]]
+    padres_eliminar = [id_padre for nombre, datos in anterior.items() if nombre not in actuales for id_padre in datos.get("padres", [])]
+
+    tareas = [tarea for nombre in a_procesar for tarea in _tareas_archivo(actuales[nombre][0], nombre)]
+    subidor = _Subidor(vectorstore, settings.TAMANO_LOTE_EMBEDDINGS, indice_lexico)
+    nuevos = {nombre: [] for nombre in a_procesar}
+    padres = {nombre: {} for nombre in a_procesar}
+    existentes = {nombre: set(anterior.get(nombre, {}).get("fragmentos", [])) for nombre in a_procesar}
+    vistos = set()
+    procesos = procesos or settings.PROCESOS_INGESTA
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        for fragmentos in _ejecutar_acotado(pool, _procesar_paginas, tareas, procesos * 2):
+            for fragmento in fragmentos:
+                nombre = fragmento[2]["source"]
+                if fragmento[3] is not None:
+                    padres[nombre].setdefault(fragmento[3][0], fragmento[3])
+                if fragmento[0] in vistos:
+                    continue
+                vistos.add(fragmento[0])
+                nuevos[nombre].append(fragmento[0])
+                if forzar or fragmento[0] not in existentes[nombre]:
+                    subidor.agregar(fragmento)
+    subidor.vaciar()
+
+    for nombre in a_procesar:
+        vigentes = set(nuevos[nombre])
+        a_eliminar.extend(existentes[nombre] - vigentes)
+        archivos[nombre] = {"hash": actuales[nombre][1], "fragmentos": nuevos[nombre], "padres": list(padres[nombre])}
+        padres_eliminar.extend(set(anterior.get(nombre, {}).get("padres", [])) - set(padres[nombre]))
+
+    if a_eliminar:
+        vectorstore.delete(ids=a_eliminar)
+        if indice_lexico is not None:
+            indice_lexico.eliminar(a_eliminar)
+    if almacen_padres is not None:
+        almacen_padres.eliminar(padres_eliminar)
+        for nombre in a_procesar:
+            for id_padre, texto, metadatos in padres[nombre].values():
+                almacen_padres.agregar(id_padre, texto, metadatos)
+        almacen_padres.guardar()
+    if hasattr(vectorstore, "guardar"):
+        vectorstore.guardar()
+    if indice_lexico is not None:
+        indice_lexico.guardar()
+
+    manifiesto = {
+        "version_corpus": _calcular_version(archivos),
+        "version_metadatos": VERSION_METADATOS,
+        "indice_padres": settings.INDICE_PADRES,
+        "generado": datetime.datetime.now().isoformat(timespec="seconds"),
+        "archivos": archivos
+    }
+    _escribir_manifiesto(manifiesto, ruta_manifiesto)
+
+    return {
+        "version_corpus": manifiesto["version_corpus"],
+        "archivos_procesados": a_procesar,
+        "fragmentos_subidos": subidor.total,
+        "fragmentos_eliminados": len(a_eliminar)
+    }
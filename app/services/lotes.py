@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+from typing import Any
+from langchain_core.documents.compressor import BaseDocumentCompressor
+from langchain_core.embeddings import Embeddings
+
+class AgrupadorLotes:
+    def __init__(self, nombre: str, procesar_lote, ventana: float, tamano_maximo: int, tiempo_espera: float = 60.0):
+        self.nombre = nombre
+        self.procesar_lote = procesar_lote
+        self.ventana = ventana
+        self.tamano_maximo = tamano_maximo
+        self.tiempo_espera = tiempo_espera
+        self._cola = queue.Queue()
+        self._hilo = None
+        self._lock = threading.Lock()
+        self.estadisticas = {"peticiones": 0, "lotes": 0, "espera_cola": 0.0, "profundidad_maxima": 0, "errores": 0}
+        self.tamanos = Counter()
+        agrupadores[nombre] = self
+
+    def _arrancar(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name=f"lotes-{self.nombre}", daemon=True)
+                self._hilo.start()
+
+    def _recoger(self) -> list:
+        lote = [self._cola.get()]
+        limite = time.monotonic() + self.ventana
+        while len(lote) < self.tamano_maximo:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _bucle(self):
+        while True:
+            lote = [elemento for elemento in self._recoger() if elemento[2].set_running_or_notify_cancel()]
+            if not lote:
+                continue
+            inicio = time.monotonic()
+            self.estadisticas["lotes"] += 1
+            self.estadisticas["peticiones"] += len(lote)
+            self.estadisticas["espera_cola"] += sum(inicio - encolada for _, encolada, _ in lote)
+            self.tamanos[len(lote)] += 1
+            try:
+                resultados = list(self.procesar_lote([peticion for peticion, _, _ in lote]))
+                if len(resultados) != len(lote):
+                    raise RuntimeError(f"El lote de {self.nombre} devolvió {len(resultados)} resultados para {len(lote)} peticiones")
+                for (_, _, futuro), resultado in zip(lote, resultados):
+                    futuro.set_result(resultado)
+            except BaseException as e:
+                self.estadisticas["errores"] += 1
+                for _, _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                if not isinstance(e, Exception):
+                    raise
+
+    def enviar(self, peticion):
+        self._arrancar()
+        futuro = Future()
+        self._cola.put((peticion, time.monotonic(), futuro))
+        profundidad = self._cola.qsize()
+        if profundidad > self.estadisticas["profundidad_maxima"]:
+            self.estadisticas["profundidad_maxima"] = profundidad
+        try:
+            return futuro.result(timeout=self.tiempo_espera)
+        except FuturesTimeoutError:
+            futuro.cancel()
+            raise TimeoutError(f"Sin respuesta del lote de {self.nombre} tras {self.tiempo_espera:g}s")
+
+    def metricas(self) -> dict:
+        lotes = self.estadisticas["lotes"]
+        return {
+            **self.estadisticas,
+            "profundidad_cola": self._cola.qsize(),
+            "tamano_medio": self.estadisticas["peticiones"] / lotes if lotes else 0.0,
+            "espera_media": self.estadisticas["espera_cola"] / self.estadisticas["peticiones"] if self.estadisticas["peticiones"] else 0.0,
+            "tamanos": dict(sorted(self.tamanos.items()))
+        }
+
+
+agrupadores = {}
+
+def metricas_lotes() -> dict:
+    return {nombre: agrupador.metricas() for nombre, agrupador in agrupadores.items()}
+
+
+class EmbeddingsAgrupadas(Embeddings):
+    def __init__(self, base: Embeddings, ventana: float, tamano_maximo: int, tiempo_espera: float = 60.0, nombre: str = "embeddings"):
+        self.base = base
+        self.agrupador = AgrupadorLotes(nombre, base.embed_documents, ventana, tamano_maximo, tiempo_espera)
+
+    def embed_documents(self, texts: list) -> list:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list:
+        return self.agrupador.enviar(text)
+
+
+class ReordenadorAgrupado(BaseDocumentCompressor):
+    base: BaseDocumentCompressor
+    ventana: float = 0.005
+    tamano_maximo: int = 8
+    tiempo_espera: float = 60.0
+    nombre: str = "reordenador"
+    _agrupador: Any = None
+
+    def model_post_init(self, contexto):
+        self._agrupador = AgrupadorLotes(self.nombre, self.base.reordenar_lote, self.ventana, self.tamano_maximo, self.tiempo_espera)
+
+    def compress_documents(self, documents, query, callbacks=None):
+        documentos = list(documents)
+        if not documentos:
+            return []
+        return self._agrupador.enviar((query, documentos))
+
+
+def agrupar_embeddings(base: Embeddings, ventana: float, tamano_maximo: int, tiempo_espera: float = 60.0) -> Embeddings:
+    return EmbeddingsAgrupadas(base, ventana, tamano_maximo, tiempo_espera) if tamano_maximo > 1 else base
+
+def agrupar_reordenador(base: BaseDocumentCompressor, ventana: float, tamano_maximo: int, tiempo_espera: float = 60.0) -> BaseDocumentCompressor:
+    if tamano_maximo <= 1 or not hasattr(base, "reordenar_lote"):
+        return base
+    return ReordenadorAgrupado(base=base, ventana=ventana, tamano_maximo=tamano_maximo, tiempo_espera=tiempo_espera)
@@ -0,0 +1,103 @@
+import re
+from utils.texto import normalizar_texto
+
+FAMILIA_GENERAL = "general"
+
+REGLAS_FAMILIA = [
+    ("viajes", r"\b(viajes?|liquidacion)\b"),
+    ("matricula", r"\b(matricula|matrux)\b"),
+    ("reconocimiento", r"\b(reconocimiento|transferencia)\b"),
+    ("evaluacion", r"\bregul\w*"),
+    ("profesorado", r"\b(baremo|baremacin\w*|baremacion|candidato|criterios de evaluacion)\b"),
+    ("calendario", r"\bcalendario\b"),
+    ("movilidad", r"\bmovilidad\b"),
+    ("estatutos", r"\b(boja\w*|estatutos?)\b"),
+]
+
+REGLAS_TIPO_DOCUMENTO = [
+    ("calendario", r"\bcalendario\b"),
+    ("presentacion", r"\bpresentacion\b"),
+    ("normativa", r"\b(normas|normativa|baremo|boja\w*|estatutos?|criterios)\b"),
+    ("guia", r"\b(guia|miniguia|instrucciones|matrux)\b"),
+]
+
+PATRONES_CONSULTA = {
+    "viajes": [
+        r"\bviaj\w*", r"\bdietas?\b", r"\bmanutencion\b", r"\balojamiento\b", r"\bkilometraje\b", r"\bvehiculo particular\b",
+        r"\bcomision de servicios?\b", r"\bliquida\w*", r"\bindemniz\w*", r"\bdesplazamiento\w*", r"\bbilletes?\b", r"\bcongresos?\b",
+    ],
+    "matricula": [
+        r"\bmatricul\w*", r"\bautomatricula\b", r"\buvus\b", r"\bexpediente\b", r"\bprecios publicos\b", r"\bimpago\b",
+        r"\bpago fraccionado\b", r"\bestudiantes? visitantes?\b",
+    ],
+    "reconocimiento": [r"\breconoc\w*", r"\bconvalid\w*", r"\btransferencia de creditos\b"],
+    "evaluacion": [
+        r"\bexamen\w*", r"\bcalificacion\w*", r"\brevision de (la )?(nota|calificacion)\w*", r"\brecurso de apelacion\b",
+        r"\bnotas?\b", r"\bevaluacion\b",
+    ],
+    "profesorado": [
+        r"\bbaremo\w*", r"\bbaremacion\b", r"\bcontratacion\b", r"\bprofesor\w* (ayudante|asociado|sustituto|interino)\w*",
+        r"\bmeritos?\b", r"\bacreditacion\b", r"\baneca\b", r"\bcandidat\w*", r"\bcontrato\b",
+    ],
+    "calendario": [
+        r"\bcalendario\b", r"\bdias? (lectivos?|festivos?)\b", r"\b(empiezan?|comienzan?|terminan?|acaban?) (las )?clases\b",
+        r"\b(inicio|comienzo|fin) de (las )?clases\b", r"\bperiodo lectivo\b", r"\bvacaciones\b", r"\bsemana santa\b", r"\bferia\b",
+    ],
+    "movilidad": [r"\berasmus\b", r"\bmovilidad\b", r"\bintercambio\b"],
+    "estatutos": [r"\bestatutos?\b", r"\bclaustro\b", r"\brector\w*", r"\bconsejo de gobierno\b", r"\bdefensor universitario\b"],
+}
+
+PATRONES_TEMPORALES = [r"\bfechas?\b", r"\bplazos?\b", r"\bperiodos?\b", r"\bcuando\b"]
+
+FAMILIAS_POR_CATEGORIA = {
+    "baremo": ["profesorado"],
+    "calendario": ["calendario"],
+}
+
+_REGLAS_FAMILIA = [(familia, re.compile(patron)) for familia, patron in REGLAS_FAMILIA]
+_REGLAS_TIPO_DOCUMENTO = [(tipo, re.compile(patron)) for tipo, patron in REGLAS_TIPO_DOCUMENTO]
+_PATRONES_CONSULTA = {familia: [re.compile(patron) for patron in patrones] for familia, patrones in PATRONES_CONSULTA.items()}
+_PATRONES_TEMPORALES = [re.compile(patron) for patron in PATRONES_TEMPORALES]
+
+def _curso(nombre: str) -> str:
+    curso = re.search(r"\b(20\d\d)\s*[-/]\s*(20)?(\d\d)\b", nombre)
+    if curso:
+        return f"{curso.group(1)}-20{curso.group(3)}"
+    anio = re.search(r"\b20\d\d\b", nombre)
+    return anio.group(0) if anio else ""
+
+def metadatos_documento(nombre: str) -> dict:
+    texto = normalizar_texto(nombre.rsplit(".", 1)[0])
+    return {
+        "familia": next((familia for familia, patron in _REGLAS_FAMILIA if patron.search(texto)), FAMILIA_GENERAL),
+        "tipo_documento": next((tipo for tipo, patron in _REGLAS_TIPO_DOCUMENTO if patron.search(texto)), "documento"),
+        "curso": _curso(re.sub(r"[_()]", " ", nombre)),
+    }
+
+def inferir_familias(pregunta: str, categoria: str = None):
+    texto = normalizar_texto(pregunta)
+    familias = {
+        familia for familia, patrones in _PATRONES_CONSULTA.items()
+        if any(patron.search(texto) for patron in patrones)
+    }
+    familias.update(FAMILIAS_POR_CATEGORIA.get(categoria, []))
+    if familias and any(patron.search(texto) for patron in _PATRONES_TEMPORALES):
+        familias.add("calendario")
+    if not familias:
+        return [], 0.0
+    return sorted(familias), max(0.0, 1.0 - 0.2 * (len(familias) - 1))
+
+def filtro_familias(familias: list) -> dict:
+    return {"familia": {"$in": sorted(set(familias) | {FAMILIA_GENERAL})}}
+
+def cumple_filtro(metadatos: dict, filtro: dict) -> bool:
+    for clave, condicion in filtro.items():
+        valor = metadatos.get(clave)
+        if isinstance(condicion, dict):
+            if "$in" in condicion and valor not in condicion["$in"]:
+                return False
+            if "$eq" in condicion and valor != condicion["$eq"]:
+                return False
+        elif valor != condicion:
+            return False
+    return True
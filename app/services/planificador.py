@@ -0,0 +1,318 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from services.trazas import trazador
+from utils.config import settings
+
+VENTANA_SEGUNDOS = 60.0
+
+PRIORIDAD_RESPUESTA = 0
+PRIORIDAD_ENRUTAMIENTO = 1
+PRIORIDAD_SEGUNDO_PLANO = 2
+
+def prioridad_de(nombre: str) -> int:
+    if nombre.startswith("respuesta_"):
+        return PRIORIDAD_RESPUESTA
+    if nombre == "resumen_historial":
+        return PRIORIDAD_SEGUNDO_PLANO
+    return PRIORIDAD_ENRUTAMIENTO
+
+def es_limite_tasa(error: Exception) -> bool:
+    if getattr(error, "status_code", None) == 429:
+        return True
+    mensaje = str(error).lower()
+    return "429" in mensaje or "rate limit" in mensaje
+
+ERRORES_TRANSITORIOS = {"APIConnectionError", "APITimeoutError", "InternalServerError", "ConnectError", "ReadTimeout", "RemoteProtocolError"}
+
+def es_error_transitorio(error: Exception) -> bool:
+    codigo = getattr(error, "status_code", None)
+    if isinstance(codigo, int) and (codigo >= 500 or codigo in (408, 409)):
+        return True
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(clase.__name__ in ERRORES_TRANSITORIOS for clase in type(error).__mro__)
+
+def _espera_indicada(error: Exception):
+    cabeceras = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(cabeceras.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _despertar(futuro):
+    if not futuro.done():
+        futuro.set_result(None)
+
+
+class PresupuestoModelo:
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.consumos = deque()
+        self.bloqueado_hasta = 0.0
+
+    def _purgar(self, ahora: float):
+        while self.consumos and self.consumos[0][0] <= ahora - VENTANA_SEGUNDOS:
+            self.consumos.popleft()
+
+    def espera(self, tokens: int, ahora: float) -> float:
+        self._purgar(ahora)
+        espera = max(0.0, self.bloqueado_hasta - ahora)
+
+        if len(self.consumos) >= self.rpm:
+            espera = max(espera, self.consumos[len(self.consumos) - self.rpm][0] + VENTANA_SEGUNDOS - ahora)
+
+        exceso = sum(consumo[1] for consumo in self.consumos) + min(tokens, self.tpm) - self.tpm
+        for instante, consumidos in self.consumos:
+            if exceso <= 0:
+                break
+            exceso -= consumidos
+            espera = max(espera, instante + VENTANA_SEGUNDOS - ahora)
+        return espera
+
+    def reservar(self, tokens: int, ahora: float) -> list:
+        consumo = [ahora, min(tokens, self.tpm)]
+        self.consumos.append(consumo)
+        return consumo
+
+    def bloquear(self, hasta: float):
+        self.bloqueado_hasta = max(self.bloqueado_hasta, hasta)
+
+
+class _ConsumoCompartido(list):
+    def __init__(self, valores: list, presupuesto, fila: int):
+        super().__init__(valores)
+        self.presupuesto = presupuesto
+        self.fila = fila
+
+    def __setitem__(self, indice, valor):
+        super().__setitem__(indice, valor)
+        self.presupuesto._actualizar(self.fila, self[1])
+
+
+class PresupuestoCompartido(PresupuestoModelo):
+    def __init__(self, modelo: str, rpm: int, tpm: int, ruta: str):
+        super().__init__(rpm, tpm)
+        self.modelo = modelo
+        self.ruta = ruta
+        self._conexion = None
+
+    def _conectar(self):
+        if self._conexion is None:
+            os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+            self._conexion = sqlite3.connect(self.ruta, timeout=5.0, check_same_thread=False, isolation_level=None)
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute("CREATE TABLE IF NOT EXISTS consumos_llm (modelo TEXT, instante REAL, tokens INTEGER)")
+            self._conexion.execute("CREATE TABLE IF NOT EXISTS bloqueos_llm (modelo TEXT PRIMARY KEY, hasta REAL)")
+        return self._conexion
+
+    def _purgar(self, ahora: float):
+        conexion = self._conectar()
+        conexion.execute("DELETE FROM consumos_llm WHERE modelo = ? AND instante <= ?", (self.modelo, ahora - VENTANA_SEGUNDOS))
+        self.consumos = deque(
+            _ConsumoCompartido([instante, tokens], self, fila)
+            for fila, instante, tokens in conexion.execute("SELECT rowid, instante, tokens FROM consumos_llm WHERE modelo = ? ORDER BY instante", (self.modelo,))
+        )
+        fila = conexion.execute("SELECT hasta FROM bloqueos_llm WHERE modelo = ?", (self.modelo,)).fetchone()
+        self.bloqueado_hasta = max(self.bloqueado_hasta, fila[0] if fila else 0.0)
+
+    def reservar(self, tokens: int, ahora: float) -> list:
+        tokens = min(tokens, self.tpm)
+        cursor = self._conectar().execute("INSERT INTO consumos_llm VALUES (?, ?, ?)", (self.modelo, ahora, tokens))
+        consumo = _ConsumoCompartido([ahora, tokens], self, cursor.lastrowid)
+        self.consumos.append(consumo)
+        return consumo
+
+    def _actualizar(self, fila: int, tokens: int):
+        self._conectar().execute("UPDATE consumos_llm SET tokens = ? WHERE rowid = ?", (tokens, fila))
+
+    def bloquear(self, hasta: float):
+        super().bloquear(hasta)
+        self._conectar().execute(
+            "INSERT INTO bloqueos_llm VALUES (?, ?) ON CONFLICT(modelo) DO UPDATE SET hasta = MAX(hasta, excluded.hasta)",
+            (self.modelo, hasta)
+        )
+
+
+class PlanificadorLLM:
+    def __init__(self, limites: dict, concurrencia: int, reintentos: int, espera_base: float, espera_maxima: float, ruta_compartida: str = None):
+        self.presupuestos = {
+            modelo: PresupuestoCompartido(modelo, limite["rpm"], limite["tpm"], ruta_compartida) if ruta_compartida else PresupuestoModelo(limite["rpm"], limite["tpm"])
+            for modelo, limite in limites.items()
+        }
+        self.concurrencia = concurrencia
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self._condicion = threading.Condition()
+        self._en_vuelo = {}
+        self._colas = {}
+        self._secuencia = itertools.count()
+        self._esperas_asincronas = set()
+        self.estadisticas = {"peticiones": 0, "reintentos": 0, "limites_tasa": 0, "errores_transitorios": 0, "espera_cola": 0.0}
+
+    def espera_estimada(self, modelo: str, tokens: int) -> float:
+        with self._condicion:
+            presupuesto = self.presupuestos.get(modelo)
+            return presupuesto.espera(tokens, time.time()) if presupuesto else 0.0
+
+    def _intentar(self, modelo: str, ticket: tuple, tokens: int):
+        cola = self._colas.setdefault(modelo, [])
+        while cola and cola[0][2]["cancelado"]:
+            heapq.heappop(cola)
+        if not cola or cola[0] is not ticket or self._en_vuelo.get(modelo, 0) >= self.concurrencia:
+            return None
+
+        ahora = time.time()
+        presupuesto = self.presupuestos.get(modelo)
+        espera = presupuesto.espera(tokens, ahora) if presupuesto else 0.0
+        if espera > 0:
+            return espera
+
+        heapq.heappop(cola)
+        self._en_vuelo[modelo] = self._en_vuelo.get(modelo, 0) + 1
+        ticket[2]["consumo"] = presupuesto.reservar(tokens, ahora) if presupuesto else None
+        return 0.0
+
+    def _encolar(self, modelo: str, prioridad: int) -> tuple:
+        ticket = (prioridad, next(self._secuencia), {"cancelado": False, "consumo": None})
+        heapq.heappush(self._colas.setdefault(modelo, []), ticket)
+        return ticket
+
+    def _notificar(self):
+        self._condicion.notify_all()
+        for bucle, futuro in self._esperas_asincronas:
+            bucle.call_soon_threadsafe(_despertar, futuro)
+        self._esperas_asincronas.clear()
+
+    def _liberar(self, modelo: str):
+        with self._condicion:
+            self._en_vuelo[modelo] -= 1
+            self._notificar()
+
+    def _registrar_espera(self, inicio: float):
+        self.estadisticas["peticiones"] += 1
+        self.estadisticas["espera_cola"] += time.monotonic() - inicio
+
+    @contextmanager
+    def turno(self, modelo: str, tokens: int, prioridad: int = PRIORIDAD_ENRUTAMIENTO):
+        inicio = time.monotonic()
+        with self._condicion:
+            ticket = self._encolar(modelo, prioridad)
+            try:
+                while (espera := self._intentar(modelo, ticket, tokens)) != 0.0:
+                    self._condicion.wait(timeout=espera if espera is not None else 0.25)
+            except BaseException:
+                ticket[2]["cancelado"] = True
+                self._notificar()
+                raise
+            self._registrar_espera(inicio)
+            self._notificar()
+        try:
+            yield ticket[2]["consumo"]
+        finally:
+            self._liberar(modelo)
+
+    @asynccontextmanager
+    async def aturno(self, modelo: str, tokens: int, prioridad: int = PRIORIDAD_ENRUTAMIENTO):
+        inicio = time.monotonic()
+        bucle = asyncio.get_running_loop()
+        with self._condicion:
+            ticket = self._encolar(modelo, prioridad)
+        try:
+            while True:
+                with self._condicion:
+                    espera = self._intentar(modelo, ticket, tokens)
+                    if espera == 0.0:
+                        self._registrar_espera(inicio)
+                        self._notificar()
+                        break
+                    aviso = (bucle, bucle.create_future())
+                    self._esperas_asincronas.add(aviso)
+                try:
+                    await asyncio.wait_for(aviso[1], timeout=espera)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    with self._condicion:
+                        self._esperas_asincronas.discard(aviso)
+        except BaseException:
+            with self._condicion:
+                ticket[2]["cancelado"] = True
+                self._notificar()
+            raise
+        try:
+            yield ticket[2]["consumo"]
+        finally:
+            self._liberar(modelo)
+
+    def registrar_uso(self, consumo: list, tokens_reales: int):
+        if consumo is not None and tokens_reales:
+            with self._condicion:
+                consumo[1] = tokens_reales
+
+    def espera_reintento(self, modelo: str, intento: int, error: Exception):
+        if intento >= self.reintentos:
+            return None
+        
+        if not es_limite_tasa(error):
+            if not es_error_transitorio(error):
+                return None
+            espera = min(self.espera_maxima, self.espera_base * 2 ** intento) * random.uniform(0.5, 1.5)
+            with self._condicion:
+                self.estadisticas["errores_transitorios"] += 1
+                self.estadisticas["reintentos"] += 1
+            trazador.aviso(f"Error transitorio en {modelo} ({type(error).__name__}), reintento {intento + 1} en {espera:.2f}s")
+            return espera
+
+        espera = _espera_indicada(error) or min(self.espera_maxima, self.espera_base * 2 ** intento)
+        espera *= random.uniform(0.5, 1.5)
+        with self._condicion:
+            self.estadisticas["limites_tasa"] += 1
+            self.estadisticas["reintentos"] += 1
+            presupuesto = self.presupuestos.get(modelo)
+            if presupuesto is not None:
+                presupuesto.bloquear(time.time() + espera)
+        trazador.aviso(f"Límite de tasa en {modelo}, reintento {intento + 1} en {espera:.2f}s")
+        return espera
+
+    def ejecutar(self, modelo: str, tokens: int, prioridad: int, funcion):
+        for intento in itertools.count():
+            with self.turno(modelo, tokens, prioridad) as consumo:
+                try:
+                    return funcion(consumo)
+                except Exception as e:
+                    espera = self.espera_reintento(modelo, intento, e)
+                    if espera is None:
+                        raise
+            time.sleep(espera)
+
+    async def aejecutar(self, modelo: str, tokens: int, prioridad: int, funcion):
+        for intento in itertools.count():
+            async with self.aturno(modelo, tokens, prioridad) as consumo:
+                try:
+                    return await funcion(consumo)
+                except Exception as e:
+                    espera = self.espera_reintento(modelo, intento, e)
+                    if espera is None:
+                        raise
+            await asyncio.sleep(espera)
+
+
+planificador = PlanificadorLLM(
+    limites=settings.LIMITES_LLM,
+    concurrencia=settings.CONCURRENCIA_LLM,
+    reintentos=settings.REINTENTOS_LLM,
+    espera_base=settings.ESPERA_BASE_REINTENTO,
+    espera_maxima=settings.ESPERA_MAXIMA_REINTENTO,
+    ruta_compartida=settings.RUTA_ESTADO_COMPARTIDO if settings.ESTADO_COMPARTIDO else None
+)
@@ -1,96 +1,676 @@
-from langchain_huggingface import HuggingFaceEndpointEmbeddings
+import time
+_inicio_importacion = time.perf_counter()
+
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.documents import Document
 from templates.templates import *
 
-from utils.config import format_docs, config_light_llm, config_llm
-from langchain_pinecone import PineconeVectorStore
+from utils.config import format_docs, config_light_llm, config_llm, obtener_version_corpus
 from utils.config import settings
-from langchain_classic.retrievers.contextual_compression import ContextualCompressionRetriever
-from langchain_cohere import CohereRerank
-import datetime
+from services.cache import CacheSemantica, CacheVersionada, EmbeddingsCacheadas
+from services.clasificador_local import ClasificadorLocal, aplicar_reglas
+from services.calendario import AlmacenCalendario, redactar_respuesta
+from services.contexto import ensamblar_contexto, recortar_contexto
+from services.especulacion import RespuestaEspeculativa
+from services.faq import AlmacenFAQ
+from services.metadatos import filtro_familias, inferir_familias
+from services.almacen_padres import expandir_padres
+from services.recuperacion import crear_almacen_padres, crear_embeddings, crear_vectorstore, crear_recuperador
+from services.reordenador import crear_reordenador
+from services.historial import GestorHistorial, recortar_historial
+from services.trazas import trazador, ManejadorTokens, id_peticion_actual
+from services.planificador import planificador, prioridad_de
+from utils.texto import estimar_tokens, normalizar_texto
+import asyncio
+import contextvars
+import itertools
+import json
+import queue
+import threading
+from contextlib import nullcontext
+
+TIEMPO_IMPORTACION = time.perf_counter() - _inicio_importacion
+
+CATEGORIAS_VALIDAS = ["procedimental", "calendario", "normativo", "baremo"]
+
+_FIN = object()
+
+class _ComponentePerezoso:
+    def __init__(self, fabrica):
+        self.fabrica = fabrica
+
+    def __set_name__(self, propietario, nombre):
+        self.nombre = nombre
+
+    def __get__(self, instancia, propietario):
+        if instancia is None:
+            return self
+        return instancia._obtener(self.nombre, lambda: self.fabrica(instancia))
 
 class AsistenteRAG:
-    def __init__(self):
-        self.llm = config_llm()
-        self.light_llm = config_light_llm()
-        self.embeddings = HuggingFaceEndpointEmbeddings(model=settings.MODEL_EMBEDDINGS, huggingfacehub_api_token=settings.HUGGINGFACEHUB_API_KEY)
-        self.vectorstore = PineconeVectorStore(index_name="index-tfg", embedding=self.embeddings)        
-        
-        retriever_base = self.vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 12})
-        cohere_reranker = CohereRerank(model="rerank-v4.0-pro" ,top_n=5)
-        self.retriever = ContextualCompressionRetriever(
-            base_compressor=cohere_reranker,
-            base_retriever=retriever_base
-        )
-        
-        self.chain_reformulacion = self._crear_cadena(PROMPT_REFORMULACION, self.light_llm)
-        self.chain_deteccion = self._crear_cadena(PROMPT_DETECCION, self.light_llm)
-        self.chain_clasificacion = self._crear_cadena(PROMPT_CLASIFICADOR, self.light_llm)
-        self.chain_cuestiona_agente = self._crear_cadena(PROMPT_CUESTIONA_AGENTE, self.light_llm)
-        
-        self.cadenas_respuesta = {
-            "procedimental": self._crear_cadena(PROMPT_RESULTOR_PROCEDIMENTAL, self.llm),
-            "calendario": self._crear_cadena(PROMPT_RESULTOR_CALENDARIO, self.llm),
-            "normativo": self._crear_cadena(PROMPT_RESULTOR_NORMATIVO, self.llm),
-            "baremo": self._crear_cadena(PROMPT_RESULTOR_BAREMO, self.llm),
-            "consulta": self._crear_cadena(PROMPT_CONSULTA_USUARIO, self.light_llm),
-            "rechazo": self._crear_cadena(PROMPT_RECHAZO_AMABLE, self.light_llm)
-        }
+    llm = _ComponentePerezoso(lambda self: config_llm())
+    light_llm = _ComponentePerezoso(lambda self: config_light_llm())
+    cache_embeddings = _ComponentePerezoso(lambda self: CacheVersionada(
+        "embeddings",
+        settings.CAPACIDAD_CACHE_EMBEDDINGS,
+        settings.RUTA_CACHE_RECUPERACION if settings.PERSISTIR_CACHE_RECUPERACION else None
+    ))
+    cache_recuperacion = _ComponentePerezoso(lambda self: CacheVersionada(
+        "recuperacion",
+        settings.CAPACIDAD_CACHE_RECUPERACION,
+        settings.RUTA_CACHE_RECUPERACION if settings.PERSISTIR_CACHE_RECUPERACION else None
+    ) if settings.CACHE_RECUPERACION else None)
+    embeddings = _ComponentePerezoso(lambda self: EmbeddingsCacheadas(crear_embeddings(), self.cache_embeddings, self._version_embeddings))
+    vectorstore = _ComponentePerezoso(lambda self: crear_vectorstore(self.embeddings))
+    retriever = _ComponentePerezoso(lambda self: crear_recuperador(self.vectorstore, crear_reordenador()))
+    almacen_padres = _ComponentePerezoso(lambda self: crear_almacen_padres() if settings.INDICE_PADRES else None)
+    cache_semantica = _ComponentePerezoso(lambda self: CacheSemantica(
+        capacidad=settings.CAPACIDAD_CACHE_SEMANTICA,
+        ttl_segundos=settings.TTL_CACHE_SEMANTICA,
+        umbral=settings.UMBRAL_CACHE_SEMANTICA,
+        ruta=settings.RUTA_CACHE_RECUPERACION if settings.PERSISTIR_CACHE_RECUPERACION else None
+    ) if settings.CACHE_SEMANTICA else None)
+    clasificador_local = _ComponentePerezoso(lambda self: ClasificadorLocal(
+        ruta_modelo=settings.RUTA_CLASIFICADOR_LOCAL,
+        ruta_decisiones=settings.RUTA_DECISIONES_ENRUTAMIENTO,
+        modelo_embeddings=settings.MODEL_EMBEDDINGS_LOCAL if settings.BACKEND_RECUPERACION == "local" else settings.MODEL_EMBEDDINGS,
+        registrar=settings.REGISTRAR_DECISIONES
+    ))
+    calendario = _ComponentePerezoso(lambda self: AlmacenCalendario(
+        settings.RUTA_CALENDARIO,
+        umbral=settings.UMBRAL_CALENDARIO,
+        ruta_manifiesto=settings.RUTA_MANIFIESTO
+    ) if settings.CALENDARIO_ESTRUCTURADO else None)
+    faq = _ComponentePerezoso(lambda self: AlmacenFAQ(settings.RUTA_FAQ) if settings.FAQ_PRECALCULADA else None)
+    
+    chain_reformulacion = _ComponentePerezoso(lambda self: self._crear_cadena(PROMPT_REFORMULACION, self.light_llm))
+    chain_deteccion = _ComponentePerezoso(lambda self: self._crear_cadena(PROMPT_DETECCION, self.light_llm))
+    chain_clasificacion = _ComponentePerezoso(lambda self: self._crear_cadena(PROMPT_CLASIFICADOR, self.light_llm))
+    chain_cuestiona_agente = _ComponentePerezoso(lambda self: self._crear_cadena(PROMPT_CUESTIONA_AGENTE, self.light_llm))
+    chain_enrutador = _ComponentePerezoso(lambda self: self._crear_cadena(PROMPT_ENRUTADOR, self.light_llm))
+    llm_resumen = _ComponentePerezoso(lambda self: config_light_llm(max_tokens=settings.MAX_TOKENS_RESUMEN))
+    chain_resumen = _ComponentePerezoso(lambda self: self._crear_cadena(PROMPT_RESUMEN_HISTORIAL, self.llm_resumen))
+    gestor_historial = _ComponentePerezoso(lambda self: GestorHistorial(
+        lambda entradas: self._invocar("resumen_historial", self.chain_resumen, entradas)
+    ))
+    
+    cadenas_respuesta = _ComponentePerezoso(lambda self: {
+        "procedimental": self._crear_cadena(PROMPT_RESULTOR_PROCEDIMENTAL, self.llm),
+        "calendario": self._crear_cadena(PROMPT_RESULTOR_CALENDARIO, self.llm),
+        "normativo": self._crear_cadena(PROMPT_RESULTOR_NORMATIVO, self.llm),
+        "baremo": self._crear_cadena(PROMPT_RESULTOR_BAREMO, self.llm),
+        "consulta": self._crear_cadena(PROMPT_CONSULTA_USUARIO, self.light_llm),
+        "rechazo": self._crear_cadena(PROMPT_RECHAZO_AMABLE, self.light_llm)
+    })
+    llm_respaldo = _ComponentePerezoso(lambda self: config_light_llm(max_tokens=settings.MAX_TOKENS_RESPALDO))
+    cadenas_respaldo = _ComponentePerezoso(lambda self: {
+        "procedimental": self._crear_cadena(PROMPT_RESULTOR_PROCEDIMENTAL, self.llm_respaldo),
+        "calendario": self._crear_cadena(PROMPT_RESULTOR_CALENDARIO, self.llm_respaldo),
+        "normativo": self._crear_cadena(PROMPT_RESULTOR_NORMATIVO, self.llm_respaldo),
+        "baremo": self._crear_cadena(PROMPT_RESULTOR_BAREMO, self.llm_respaldo)
+    })
+
+    def __init__(self, **componentes):
+        self._componentes = dict(componentes)
+        self._lock = threading.RLock()
+        self.tiempos_inicializacion = {}
+
+    def reemplazar_componentes(self, **componentes):
+        with self._lock:
+            self._componentes = dict(componentes)
+            self.tiempos_inicializacion = {}
+
+    def _obtener(self, nombre: str, fabrica):
+        if nombre in self._componentes:
+            return self._componentes[nombre]
+        
+        with self._lock:
+            if nombre not in self._componentes:
+                inicio = time.perf_counter()
+                self._componentes[nombre] = fabrica()
+                self.tiempos_inicializacion[nombre] = time.perf_counter() - inicio
+            return self._componentes[nombre]
+
+    def precargar(self):
+        for nombre, atributo in vars(AsistenteRAG).items():
+            if isinstance(atributo, _ComponentePerezoso):
+                getattr(self, nombre)
+        return self.informe_arranque()
+
+    def informe_arranque(self):
+        informe = {"importacion": TIEMPO_IMPORTACION, **self.tiempos_inicializacion}
+        trazador.aviso("Informe de arranque:", ", ".join(f"{nombre} {segundos:.3f}s" for nombre, segundos in informe.items()))
+        return informe
 
     def _crear_cadena(self, prompt, llm_elegido):
         prompt = ChatPromptTemplate.from_template(prompt)
         return prompt | llm_elegido | StrOutputParser()
 
+    def _perfil_cadena(self, cadena, entradas: dict):
+        llm = cadena.middle[0]
+        modelo = getattr(llm, "model_name", None) or type(llm).__name__
+        tokens = estimar_tokens(cadena.first.format(**entradas)) + (getattr(llm, "max_tokens", None) or settings.TOKENS_SALIDA_ESTIMADOS)
+        return modelo, tokens
+
+    def _invocar(self, nombre: str, cadena, entradas: dict):
+        modelo, tokens = self._perfil_cadena(cadena, entradas)
+        with trazador.medir(nombre, "cadena") as registro:
+            manejador = ManejadorTokens()
+
+            def llamar(consumo):
+                resultado = cadena.invoke(entradas, config={"callbacks": [manejador]})
+                planificador.registrar_uso(consumo, sum(manejador.tokens().values()))
+                return resultado
+
+            resultado = planificador.ejecutar(modelo, tokens, prioridad_de(nombre), llamar)
+            registro.update(manejador.tokens())
+            return resultado
+
+    async def _ainvocar(self, nombre: str, cadena, entradas: dict):
+        modelo, tokens = self._perfil_cadena(cadena, entradas)
+        with trazador.medir(nombre, "cadena") as registro:
+            manejador = ManejadorTokens()
+
+            async def llamar(consumo):
+                resultado = await cadena.ainvoke(entradas, config={"callbacks": [manejador]})
+                planificador.registrar_uso(consumo, sum(manejador.tokens().values()))
+                return resultado
+
+            resultado = await planificador.aejecutar(modelo, tokens, prioridad_de(nombre), llamar)
+            registro.update(manejador.tokens())
+            return resultado
+
+    def _generar(self, nombre: str, cadena, entradas: dict, manejador, cola: queue.Queue, detenido: threading.Event):
+        modelo, tokens = self._perfil_cadena(cadena, entradas)
+        try:
+            for intento in itertools.count():
+                emitido = False
+                with planificador.turno(modelo, tokens, prioridad_de(nombre)) as consumo:
+                    try:
+                        for fragmento in cadena.stream(entradas, config={"callbacks": [manejador]}):
+                            if detenido.is_set():
+                                return
+                            emitido = True
+                            cola.put(fragmento)
+                        planificador.registrar_uso(consumo, sum(manejador.tokens().values()))
+                        return
+                    except Exception as e:
+                        espera = None if emitido else planificador.espera_reintento(modelo, intento, e)
+                        if espera is None:
+                            raise
+                time.sleep(espera)
+        except Exception as e:
+            cola.put(e)
+        finally:
+            cola.put(_FIN)
+
+    async def _agenerar(self, nombre: str, cadena, entradas: dict, manejador, cola: asyncio.Queue):
+        modelo, tokens = self._perfil_cadena(cadena, entradas)
+        try:
+            for intento in itertools.count():
+                emitido = False
+                async with planificador.aturno(modelo, tokens, prioridad_de(nombre)) as consumo:
+                    try:
+                        async for fragmento in cadena.astream(entradas, config={"callbacks": [manejador]}):
+                            emitido = True
+                            cola.put_nowait(fragmento)
+                        planificador.registrar_uso(consumo, sum(manejador.tokens().values()))
+                        return
+                    except Exception as e:
+                        espera = None if emitido else planificador.espera_reintento(modelo, intento, e)
+                        if espera is None:
+                            raise
+                await asyncio.sleep(espera)
+        except Exception as e:
+            cola.put_nowait(e)
+        finally:
+            cola.put_nowait(_FIN)
+
+    def _transmitir(self, nombre: str, cadena, entradas: dict, id_peticion: str = None):
+        with (trazador.peticion(id_peticion) if id_peticion else nullcontext()), trazador.medir(nombre, "cadena") as registro:
+            manejador = ManejadorTokens()
+            cola, detenido = queue.Queue(), threading.Event()
+            contexto = contextvars.copy_context()
+            threading.Thread(target=contexto.run, args=(self._generar, nombre, cadena, entradas, manejador, cola, detenido), daemon=True).start()
+            try:
+                while (fragmento := cola.get()) is not _FIN:
+                    if isinstance(fragmento, Exception):
+                        raise fragmento
+                    yield fragmento
+            finally:
+                detenido.set()
+            registro.update(manejador.tokens())
+
+    async def _atransmitir(self, nombre: str, cadena, entradas: dict, id_peticion: str = None):
+        with (trazador.peticion(id_peticion) if id_peticion else nullcontext()), trazador.medir(nombre, "cadena") as registro:
+            manejador = ManejadorTokens()
+            cola = asyncio.Queue()
+            tarea = asyncio.create_task(self._agenerar(nombre, cadena, entradas, manejador, cola))
+            try:
+                while (fragmento := await cola.get()) is not _FIN:
+                    if isinstance(fragmento, Exception):
+                        raise fragmento
+                    yield fragmento
+            finally:
+                tarea.cancel()
+            registro.update(manejador.tokens())
+
+    def _historial(self, tipo: str, historial_formateado: str):
+        return recortar_historial(historial_formateado, settings.PRESUPUESTOS_HISTORIAL.get(tipo, settings.PRESUPUESTOS_HISTORIAL["resultor"]))
+
+    def _contexto(self, tipo: str, pregunta: str, contexto: str):
+        if not settings.COMPRIMIR_CONTEXTO:
+            return contexto
+        return recortar_contexto(contexto, pregunta, settings.PRESUPUESTOS_CONTEXTO.get(tipo, settings.PRESUPUESTOS_CONTEXTO["resultor"]))
+
+    def _entradas(self, tipo: str, pregunta: str, historial_formateado: str, contexto: str = None):
+        entradas = {"question": pregunta, "historial": self._historial(tipo, historial_formateado)}
+        if contexto is not None:
+            entradas["context"] = self._contexto(tipo, pregunta, contexto)
+        return entradas
+
+    def preparar_historial(self, historial: list, resumen: str = "", mensajes_resumidos: int = 0):
+        return self.gestor_historial.preparar(historial, resumen, mensajes_resumidos)
+
+    async def apreparar_historial(self, historial: list, resumen: str = "", mensajes_resumidos: int = 0):
+        return await asyncio.to_thread(self.preparar_historial, historial, resumen, mensajes_resumidos)
+
     def insertar_contexto(self, pregunta: str, historial_formateado: str):
-        print("\n\nInsertando contexto...", datetime.datetime.now())        
-        if historial_formateado:
-            pregunta_busqueda = self.chain_reformulacion.invoke({
-                "historial": historial_formateado,
-                "question": pregunta
-            })
-        else:
-            pregunta_busqueda = pregunta
-        
-        print("Buscando contexto...", datetime.datetime.now())
-        contexto, referencias = self._buscar_contexto(pregunta_busqueda)
-        print("Contexto insertado exitosamente", datetime.datetime.now())
+        pregunta_busqueda = self.reformular_pregunta(pregunta, historial_formateado)
+        contexto, referencias = self.buscar_contexto(pregunta_busqueda)
+        return pregunta_busqueda, contexto, referencias
+
+    async def ainsertar_contexto(self, pregunta: str, historial_formateado: str):
+        pregunta_busqueda = await self.areformular_pregunta(pregunta, historial_formateado)
+        contexto, referencias = await self.abuscar_contexto(pregunta_busqueda)
         return pregunta_busqueda, contexto, referencias
+    
+    def reformular_pregunta(self, pregunta: str, historial_formateado: str):
+        if not historial_formateado:
+            return pregunta
+        
+        return self._invocar("reformulacion", self.chain_reformulacion, self._entradas("reformulacion", pregunta, historial_formateado))
+
+    async def areformular_pregunta(self, pregunta: str, historial_formateado: str):
+        if not historial_formateado:
+            return pregunta
         
-    def _buscar_contexto(self, pregunta_reformulada: str):    
-        docs = self.retriever.invoke(pregunta_reformulada)
+        return await self._ainvocar("reformulacion", self.chain_reformulacion, self._entradas("reformulacion", pregunta, historial_formateado))
+    
+    def _formatear_recuperados(self, docs: list):
+        if self.almacen_padres is not None and len(self.almacen_padres):
+            with trazador.medir("expansion_padres", "cadena") as registro:
+                docs = expandir_padres(docs, self.almacen_padres, settings.PRESUPUESTO_PADRES)
+                registro["padres"] = sum(1 for doc in docs if "hijos" in doc.metadata)
+        if settings.COMPRIMIR_CONTEXTO:
+            with trazador.medir("ensamblado_contexto", "cadena") as registro:
+                docs = ensamblar_contexto(docs, settings.UMBRAL_DUPLICADOS)
+                registro["documentos"] = len(docs)
         referencias = list(set([doc.metadata.get("source","Documento desconocido") for doc in docs]))
         return format_docs(docs), referencias
+
+    def _recuperados_en_cache(self, pregunta_reformulada: str):
+        if self.cache_recuperacion is None:
+            return None
+        guardados = self.cache_recuperacion.obtener(normalizar_texto(pregunta_reformulada), obtener_version_corpus())
+        if guardados is None:
+            return None
+        return [Document(page_content=doc["page_content"], metadata=dict(doc["metadata"])) for doc in guardados]
+
+    def _guardar_recuperados(self, pregunta_reformulada: str, docs: list):
+        if self.cache_recuperacion is not None:
+            self.cache_recuperacion.guardar(
+                normalizar_texto(pregunta_reformulada),
+                [{"page_content": doc.page_content, "metadata": dict(doc.metadata)} for doc in docs],
+                obtener_version_corpus()
+            )
+
+    def _filtro_recuperacion(self, pregunta_reformulada: str):
+        if not settings.FILTRO_FAMILIAS:
+            return None
+        
+        categoria, _ = aplicar_reglas("categoria", pregunta_reformulada)
+        familias, confianza = inferir_familias(pregunta_reformulada, categoria)
+        if confianza < settings.UMBRAL_FILTRO_FAMILIAS:
+            return None
+        return filtro_familias(familias)
+
+    def _filtrados_suficientes(self, docs: list, registro: dict) -> bool:
+        if len(docs) >= settings.MINIMO_RESULTADOS_FILTRADOS:
+            return True
+        
+        trazador.aviso(f"Búsqueda filtrada por familias con {len(docs)} resultados, se busca en todo el índice")
+        registro["respaldo_filtro"] = True
+        return False
+
+    def _recuperar(self, pregunta_reformulada: str, registro: dict):
+        filtro = self._filtro_recuperacion(pregunta_reformulada)
+        if filtro is not None:
+            registro["familias"] = filtro["familia"]["$in"]
+            docs = self.retriever.invoke(pregunta_reformulada, filtro=filtro, k=settings.K_DENSO_FILTRADO)
+            if self._filtrados_suficientes(docs, registro):
+                return docs
+        return self.retriever.invoke(pregunta_reformulada)
+
+    async def _arecuperar(self, pregunta_reformulada: str, registro: dict):
+        filtro = self._filtro_recuperacion(pregunta_reformulada)
+        if filtro is not None:
+            registro["familias"] = filtro["familia"]["$in"]
+            docs = await self.retriever.ainvoke(pregunta_reformulada, filtro=filtro, k=settings.K_DENSO_FILTRADO)
+            if self._filtrados_suficientes(docs, registro):
+                return docs
+        return await self.retriever.ainvoke(pregunta_reformulada)
+
+    def buscar_contexto(self, pregunta_reformulada: str):    
+        with trazador.medir("recuperacion", "cadena") as registro:
+            docs = self._recuperados_en_cache(pregunta_reformulada)
+            registro["cache"] = docs is not None
+            if docs is None:
+                docs = self._recuperar(pregunta_reformulada, registro)
+                self._guardar_recuperados(pregunta_reformulada, docs)
+            registro["documentos"] = len(docs)
+        return self._formatear_recuperados(docs)
+
+    async def abuscar_contexto(self, pregunta_reformulada: str):
+        with trazador.medir("recuperacion", "cadena") as registro:
+            docs = self._recuperados_en_cache(pregunta_reformulada)
+            registro["cache"] = docs is not None
+            if docs is None:
+                docs = await self._arecuperar(pregunta_reformulada, registro)
+                self._guardar_recuperados(pregunta_reformulada, docs)
+            registro["documentos"] = len(docs)
+        return self._formatear_recuperados(docs)
     
+    def consultar_cache(self, pregunta: str):
+        if self.cache_semantica is None:
+            return None
+        
+        with trazador.medir("cache_semantica", "cadena") as registro:
+            vector = self.vector_consulta(pregunta)
+            acierto = self.cache_semantica.buscar(vector, obtener_version_corpus())
+            registro["ruta"] = acierto["ruta"] if acierto else None
+        
+        if acierto:
+            trazador.aviso(f"Acierto en caché semántica (similitud {acierto['similitud']:.3f})")
+        return acierto
+    
+    def guardar_en_cache(self, pregunta_reformulada: str, respuesta: str, referencias: list, ruta: str):
+        if self.cache_semantica is None or ruta not in CATEGORIAS_VALIDAS:
+            return
+        
+        vector = self.vector_consulta(pregunta_reformulada)
+        self.cache_semantica.guardar(pregunta_reformulada, vector, respuesta, referencias, ruta, obtener_version_corpus())
+    
+    def _version_embeddings(self):
+        modelo = settings.MODEL_EMBEDDINGS_LOCAL if settings.BACKEND_RECUPERACION == "local" else settings.MODEL_EMBEDDINGS
+        return f"{modelo}:{obtener_version_corpus()}"
+
+    def vector_consulta(self, texto: str):
+        return self.embeddings.embed_query(texto)
+
+    def consultar_faq(self, pregunta: str):
+        if self.faq is None:
+            return None
+        
+        with trazador.medir("faq", "cadena") as registro:
+            entrada = self.faq.buscar(pregunta)
+            registro["ruta"] = entrada["ruta"] if entrada else None
+        
+        if entrada is None:
+            return None
+        trazador.aviso("Respuesta desde preguntas frecuentes")
+        return {"respuesta": entrada["respuesta"], "referencias": entrada["referencias"], "ruta": entrada["ruta"], "origen": "faq"}
+
+    def calentar_cache_faq(self):
+        if self.faq is None or self.cache_semantica is None or not self.faq.vigentes():
+            return 0
+        
+        modelo = settings.MODEL_EMBEDDINGS_LOCAL if settings.BACKEND_RECUPERACION == "local" else settings.MODEL_EMBEDDINGS
+        if self.faq.modelo_embeddings() != modelo:
+            trazador.aviso(f"Preguntas frecuentes vectorizadas con {self.faq.modelo_embeddings()}, no se precargan en la caché semántica")
+            return 0
+        
+        version = obtener_version_corpus()
+        entradas = [entrada for entrada in self.faq.vigentes() if entrada["ruta"] in CATEGORIAS_VALIDAS and entrada.get("vector")]
+        for entrada in entradas:
+            self.cache_semantica.guardar(entrada["pregunta"], entrada["vector"], entrada["respuesta"], entrada["referencias"], entrada["ruta"], version)
+        trazador.aviso(f"Caché semántica precargada con {len(entradas)} preguntas frecuentes")
+        return len(entradas)
+
+    def consultar_calendario(self, pregunta: str):
+        if self.calendario is None:
+            return None
+        
+        with trazador.medir("calendario_estructurado", "cadena") as registro:
+            eventos, confianza = self.calendario.buscar(pregunta)
+            registro["documentos"] = len(eventos)
+        
+        if not eventos:
+            return None
+        
+        trazador.aviso(f"Respuesta desde el calendario estructurado ({len(eventos)} eventos, confianza {confianza:.2f})")
+        return redactar_respuesta(eventos), sorted({evento["source"] for evento in eventos})
+
+    def atajo_calendario(self, pregunta: str):
+        if self.calendario is None:
+            return None
+        if self._decision_local("intencion", pregunta) != "recuperador" or self._decision_local("categoria", pregunta) != "calendario":
+            return None
+        return self.consultar_calendario(pregunta)
+
+    def trocear(self, texto: str):
+        for palabra in texto.split(" "):
+            yield palabra + " "
+
+    async def atrocear(self, texto: str):
+        for palabra in texto.split(" "):
+            yield palabra + " "
+
+    def _decision_local(self, tarea: str, pregunta: str):
+        if not settings.CLASIFICADOR_LOCAL:
+            return None
+        
+        with trazador.medir(f"clasificador_local_{tarea}", "cadena") as registro:
+            etiqueta, confianza, origen = self.clasificador_local.clasificar(tarea, pregunta)
+            if etiqueta is None and self.clasificador_local.tiene_modelo(tarea):
+                etiqueta, confianza, origen = self.clasificador_local.clasificar(tarea, pregunta, self.vector_consulta(pregunta))
+            
+            if etiqueta is None or confianza < settings.UMBRAL_CLASIFICADOR_LOCAL:
+                return None
+            registro["ruta"] = etiqueta
+        
+        trazador.aviso(f"Decisión local de {tarea}: {etiqueta} ({origen}, confianza {confianza:.2f})")
+        return etiqueta
+
+    async def _adecision_local(self, tarea: str, pregunta: str):
+        if not settings.CLASIFICADOR_LOCAL:
+            return None
+        return await asyncio.to_thread(self._decision_local, tarea, pregunta)
+
+    def _registrar_decision(self, tarea: str, pregunta: str, etiqueta: str, validas):
+        etiqueta = "normativo" if etiqueta == "normativa" else etiqueta
+        if etiqueta in validas:
+            self.clasificador_local.registrar_decision(tarea, pregunta, etiqueta)
+
     def decide_ruta_inicial(self, pregunta_reformulada: str, historial_formateado: str):
-        return self.chain_deteccion.invoke({
-            "question": pregunta_reformulada, 
-            "historial": historial_formateado,
-        }).strip().lower()
+        decision = self._decision_local("intencion", pregunta_reformulada)
+        if decision is not None:
+            return decision
+        
+        decision = self._invocar("deteccion", self.chain_deteccion, self._entradas("deteccion", pregunta_reformulada, historial_formateado)).strip().lower()
+        self._registrar_decision("intencion", pregunta_reformulada, decision, ("recuperador", "rechazo_amable"))
+        return decision
+
+    async def adecide_ruta_inicial(self, pregunta_reformulada: str, historial_formateado: str):
+        decision = await self._adecision_local("intencion", pregunta_reformulada)
+        if decision is not None:
+            return decision
+        
+        decision = (await self._ainvocar("deteccion", self.chain_deteccion, self._entradas("deteccion", pregunta_reformulada, historial_formateado))).strip().lower()
+        self._registrar_decision("intencion", pregunta_reformulada, decision, ("recuperador", "rechazo_amable"))
+        return decision
     
     def contiene_suficiente_informacion(self, pregunta_reformulada: str, historial_formateado: str, contexto: str):
-        return self.chain_cuestiona_agente.invoke({
-            "question": pregunta_reformulada, 
-            "historial": historial_formateado,
-            "context": contexto
-        }).strip().lower()
+        return self._invocar("suficiencia", self.chain_cuestiona_agente, self._entradas("suficiencia", pregunta_reformulada, historial_formateado, contexto)).strip().lower()
+
+    async def acontiene_suficiente_informacion(self, pregunta_reformulada: str, historial_formateado: str, contexto: str):
+        return (await self._ainvocar("suficiencia", self.chain_cuestiona_agente, self._entradas("suficiencia", pregunta_reformulada, historial_formateado, contexto))).strip().lower()
 
     def clasificar_categoria(self, pregunta_reformulada: str, historial_formateado: str, contexto: str):
-        return self.chain_clasificacion.invoke({
-            "question": pregunta_reformulada, 
-            "historial": historial_formateado,
-            "context": contexto
-        }).strip().lower()
+        decision = self._decision_local("categoria", pregunta_reformulada)
+        if decision is not None:
+            return decision
+        
+        decision = self._invocar("clasificacion", self.chain_clasificacion, self._entradas("clasificacion", pregunta_reformulada, historial_formateado, contexto)).strip().lower()
+        self._registrar_decision("categoria", pregunta_reformulada, decision, CATEGORIAS_VALIDAS)
+        return decision
+
+    async def aclasificar_categoria(self, pregunta_reformulada: str, historial_formateado: str, contexto: str):
+        decision = await self._adecision_local("categoria", pregunta_reformulada)
+        if decision is not None:
+            return decision
+        
+        decision = (await self._ainvocar("clasificacion", self.chain_clasificacion, self._entradas("clasificacion", pregunta_reformulada, historial_formateado, contexto))).strip().lower()
+        self._registrar_decision("categoria", pregunta_reformulada, decision, CATEGORIAS_VALIDAS)
+        return decision
     
-    def responder_consulta(self, contexto: str, historial_formateado: str, pregunta_reformulada: str, tipo_respuesta: str):
+    def decidir_ruta_unificada(self, pregunta_reformulada: str, historial_formateado: str, contexto: str):
+        respuesta = self._invocar("enrutador", self.chain_enrutador, self._entradas("enrutador", pregunta_reformulada, historial_formateado, contexto))
+        return self._interpretar_enrutamiento(respuesta)
+
+    async def adecidir_ruta_unificada(self, pregunta_reformulada: str, historial_formateado: str, contexto: str):
+        respuesta = await self._ainvocar("enrutador", self.chain_enrutador, self._entradas("enrutador", pregunta_reformulada, historial_formateado, contexto))
+        return self._interpretar_enrutamiento(respuesta)
+
+    def _interpretar_enrutamiento(self, respuesta: str):
+        inicio, fin = respuesta.find("{"), respuesta.rfind("}")
+        if inicio == -1 or fin <= inicio:
+            return None
+        
+        try:
+            decision = json.loads(respuesta[inicio:fin + 1])
+        except json.JSONDecodeError:
+            return None
+        
+        if not isinstance(decision, dict):
+            return None
+        
+        intencion = str(decision.get("intencion", "")).strip().lower()
+        suficiente = str(decision.get("suficiente", "")).strip().lower()
+        categoria = str(decision.get("categoria", "")).strip().lower()
+        
+        if intencion not in ("recuperador", "rechazo_amable") or suficiente not in ("resultor", "entrevistador"):
+            return None
+        if categoria not in CATEGORIAS_VALIDAS:
+            categoria = "normativo"
+        
+        return {"intencion": intencion, "suficiente": suficiente, "categoria": categoria}
+    
+    def _ruta_desde_decision(self, decision: dict):
+        if decision["intencion"] == "rechazo_amable":
+            return "rechazo_amable"
+        if decision["suficiente"] == "entrevistador":
+            return "entrevistador"
+        return decision["categoria"]
+    
+    def enrutar(self, pregunta: str, pregunta_reformulada: str, historial_formateado: str, contexto: str):
+        decision = self.decidir_ruta_unificada(pregunta_reformulada, historial_formateado, contexto)
+        
+        if decision is None:
+            trazador.aviso("Salida estructurada no válida, usando enrutamiento secuencial")
+            intencion = self.decide_ruta_inicial(pregunta, historial_formateado)
+            if intencion == "rechazo_amable":
+                return "rechazo_amable"
+            if self.contiene_suficiente_informacion(pregunta_reformulada, historial_formateado, contexto) == "entrevistador":
+                return "entrevistador"
+            categoria = self.clasificar_categoria(pregunta_reformulada, historial_formateado, contexto)
+            return categoria if categoria in CATEGORIAS_VALIDAS else "normativo"
+        
+        return self._ruta_desde_decision(decision)
+
+    async def aenrutar(self, pregunta: str, pregunta_reformulada: str, historial_formateado: str, contexto: str):
+        decision = await self.adecidir_ruta_unificada(pregunta_reformulada, historial_formateado, contexto)
+        
+        if decision is None:
+            trazador.aviso("Salida estructurada no válida, usando enrutamiento secuencial")
+            intencion = await self.adecide_ruta_inicial(pregunta, historial_formateado)
+            if intencion == "rechazo_amable":
+                return "rechazo_amable"
+            if await self.acontiene_suficiente_informacion(pregunta_reformulada, historial_formateado, contexto) == "entrevistador":
+                return "entrevistador"
+            categoria = await self.aclasificar_categoria(pregunta_reformulada, historial_formateado, contexto)
+            return categoria if categoria in CATEGORIAS_VALIDAS else "normativo"
+        
+        return self._ruta_desde_decision(decision)
+    
+    def _preparar_respuesta(self, contexto: str, historial_formateado: str, pregunta_reformulada: str, tipo_respuesta: str):
         inputs = {
-            "context": contexto,
-            "historial": historial_formateado,
+            "context": self._contexto(tipo_respuesta if tipo_respuesta in ("calendario", "consulta", "rechazo") else "resultor", pregunta_reformulada, contexto),
+            "historial": self._historial(tipo_respuesta if tipo_respuesta in ("consulta", "rechazo") else "resultor", historial_formateado),
             "question": pregunta_reformulada 
         }
         
         cadena_activa = self.cadenas_respuesta.get(tipo_respuesta, self.cadenas_respuesta["normativo"])
         
-        return cadena_activa.stream(inputs)
+        if tipo_respuesta in CATEGORIAS_VALIDAS:
+            modelo, tokens = self._perfil_cadena(cadena_activa, inputs)
+            espera = planificador.espera_estimada(modelo, tokens)
+            if espera > settings.ESPERA_MAXIMA_MODELO_PESADO:
+                trazador.aviso(f"Presupuesto de {modelo} agotado (espera {espera:.1f}s), respondiendo con el modelo ligero")
+                return f"respuesta_{tipo_respuesta}_respaldo", self.cadenas_respaldo[tipo_respuesta], inputs
+        
+        return f"respuesta_{tipo_respuesta}", cadena_activa, inputs
     
-asistente_rag = AsistenteRAG()
\ No newline at end of file
+    def _preparar_especulacion(self, contexto: str, historial_formateado: str, pregunta_reformulada: str):
+        if not settings.CLASIFICADOR_LOCAL:
+            return None
+        
+        categoria, confianza, _ = self.clasificador_local.clasificar("categoria", pregunta_reformulada)
+        if categoria is None and self.clasificador_local.tiene_modelo("categoria"):
+            categoria, confianza, _ = self.clasificador_local.clasificar("categoria", pregunta_reformulada, self.vector_consulta(pregunta_reformulada))
+        if categoria not in CATEGORIAS_VALIDAS or confianza < settings.UMBRAL_ESPECULACION:
+            return None
+        if categoria == "calendario" and self.calendario is not None and self.calendario.buscar(pregunta_reformulada)[0]:
+            return None
+        
+        nombre, cadena, entradas = self._preparar_respuesta(contexto, historial_formateado, pregunta_reformulada, categoria)
+        modelo, tokens = self._perfil_cadena(cadena, entradas)
+        if nombre.endswith("_respaldo") or planificador.espera_estimada(modelo, tokens) > 0:
+            return None
+        
+        trazador.aviso(f"Respuesta especulativa iniciada: {categoria} (confianza {confianza:.2f})")
+        return categoria, nombre, cadena, entradas
+
+    def especular_respuesta(self, contexto: str, historial_formateado: str, pregunta_reformulada: str):
+        preparada = self._preparar_especulacion(contexto, historial_formateado, pregunta_reformulada)
+        if preparada is None:
+            return None
+        categoria, nombre, cadena, entradas = preparada
+        return RespuestaEspeculativa.iniciar(categoria, pregunta_reformulada, contexto, self._transmitir(nombre, cadena, entradas, id_peticion_actual()))
+
+    def aespecular_respuesta(self, contexto: str, historial_formateado: str, pregunta_reformulada: str):
+        preparada = self._preparar_especulacion(contexto, historial_formateado, pregunta_reformulada)
+        if preparada is None:
+            return None
+        categoria, nombre, cadena, entradas = preparada
+        return RespuestaEspeculativa.ainiciar(categoria, pregunta_reformulada, contexto, self._atransmitir(nombre, cadena, entradas, id_peticion_actual()))
+
+    def responder_consulta(self, contexto: str, historial_formateado: str, pregunta_reformulada: str, tipo_respuesta: str):
+        return self._transmitir(*self._preparar_respuesta(contexto, historial_formateado, pregunta_reformulada, tipo_respuesta), id_peticion_actual())
+
+    def aresponder_consulta(self, contexto: str, historial_formateado: str, pregunta_reformulada: str, tipo_respuesta: str):
+        return self._atransmitir(*self._preparar_respuesta(contexto, historial_formateado, pregunta_reformulada, tipo_respuesta), id_peticion_actual())
+    
+_asistente_compartido = None
+_lock_asistente = threading.Lock()
+
+def obtener_asistente() -> AsistenteRAG:
+    global _asistente_compartido
+    if _asistente_compartido is None:
+        with _lock_asistente:
+            if _asistente_compartido is None:
+                _asistente_compartido = AsistenteRAG()
+    return _asistente_compartido
+
+asistente_rag = obtener_asistente()
\ No newline at end of file
@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import InMemoryVectorStore
+from langchain_classic.retrievers.contextual_compression import ContextualCompressionRetriever
+from utils.config import settings
+from services.almacen_padres import AlmacenPadres
+from services.indice_local import IndiceLocal
+from services.indice_lexico import IndiceBM25
+from services.lotes import agrupar_embeddings
+from services.metadatos import cumple_filtro
+
+def _crear_embeddings_base():
+    if settings.BACKEND_RECUPERACION == "local":
+        try:
+            from langchain_huggingface import HuggingFaceEmbeddings
+            return HuggingFaceEmbeddings(
+                model_name=settings.MODEL_EMBEDDINGS_LOCAL,
+                model_kwargs={"device": "cpu"},
+                encode_kwargs={"normalize_embeddings": True}
+            )
+        except ImportError as e:
+            raise ImportError("El backend de recuperación local necesita 'sentence-transformers' instalado") from e
+    
+    from langchain_huggingface import HuggingFaceEndpointEmbeddings
+    return HuggingFaceEndpointEmbeddings(model=settings.MODEL_EMBEDDINGS, huggingfacehub_api_token=settings.HUGGINGFACEHUB_API_KEY)
+
+def crear_embeddings():
+    return agrupar_embeddings(_crear_embeddings_base(), settings.VENTANA_MICROLOTES, settings.MICROLOTE_EMBEDDINGS, settings.TIEMPO_ESPERA_MICROLOTES)
+
+def crear_vectorstore(embeddings):
+    if settings.BACKEND_RECUPERACION == "local":
+        return IndiceLocal(embeddings, settings.RUTA_INDICE_LOCAL)
+    
+    from langchain_pinecone import PineconeVectorStore
+    return PineconeVectorStore(index_name=settings.INDICE_PINECONE, embedding=embeddings)
+
+def crear_indice_lexico():
+    return IndiceBM25(settings.RUTA_INDICE_LEXICO)
+
+def crear_almacen_padres():
+    return AlmacenPadres(settings.RUTA_ALMACEN_PADRES)
+
+def clave_documento(doc: Document) -> str:
+    return doc.metadata.get("id_fragmento") or doc.id or hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def buscar_con_puntuacion(vectorstore, consulta: str, k: int, filtro: dict = None) -> list:
+    argumentos = {}
+    if filtro:
+        argumentos["filter"] = (lambda doc: cumple_filtro(doc.metadata, filtro)) if isinstance(vectorstore, InMemoryVectorStore) else filtro
+
+    documentos = []
+    for doc, puntuacion in vectorstore.similarity_search_with_score(consulta, k=k, **argumentos):
+        doc.metadata["puntuacion_densa"] = float(puntuacion)
+        documentos.append(doc)
+    return documentos
+
+
+class RecuperadorDenso(BaseRetriever):
+    vectorstore: object
+    k: int = 12
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun, filtro: dict = None, k: int = None) -> list:
+        return buscar_con_puntuacion(self.vectorstore, query, k or self.k, filtro)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun, filtro: dict = None, k: int = None) -> list:
+        return await asyncio.to_thread(buscar_con_puntuacion, self.vectorstore, query, k or self.k, filtro)
+
+
+class RecuperadorHibrido(BaseRetriever):
+    vectorstore: object
+    indice_lexico: object
+    k_denso: int = 12
+    k_lexico: int = 12
+    k_fusion: int = 8
+    constante_rrf: int = 60
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun, filtro: dict = None, k: int = None) -> list:
+        densos = buscar_con_puntuacion(self.vectorstore, query, k or self.k_denso, filtro)
+        lexicos = [doc for doc, _ in self.indice_lexico.buscar(query, k=k or self.k_lexico, filtro=filtro)] if len(self.indice_lexico) else []
+        
+        puntuaciones = {}
+        documentos = {}
+        for resultados in (densos, lexicos):
+            for posicion, doc in enumerate(resultados):
+                clave = clave_documento(doc)
+                documentos.setdefault(clave, doc)
+                puntuaciones[clave] = puntuaciones.get(clave, 0.0) + 1.0 / (self.constante_rrf + posicion + 1)
+        
+        mejores = sorted(puntuaciones, key=puntuaciones.get, reverse=True)[:min(k or self.k_fusion, self.k_fusion)]
+        for clave in mejores:
+            documentos[clave].metadata["puntuacion_rrf"] = puntuaciones[clave]
+        return [documentos[clave] for clave in mejores]
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun, filtro: dict = None, k: int = None) -> list:
+        return await asyncio.to_thread(self._get_relevant_documents, query, run_manager=run_manager.get_sync(), filtro=filtro, k=k)
+
+
+def crear_recuperador(vectorstore, reordenador):
+    if settings.RECUPERACION_HIBRIDA:
+        retriever_base = RecuperadorHibrido(
+            vectorstore=vectorstore,
+            indice_lexico=crear_indice_lexico(),
+            k_denso=settings.K_DENSO,
+            k_lexico=settings.K_LEXICO,
+            k_fusion=settings.K_FUSION
+        )
+    else:
+        retriever_base = RecuperadorDenso(vectorstore=vectorstore, k=settings.K_DENSO)
+    
+    return ContextualCompressionRetriever(
+        base_compressor=reordenador,
+        base_retriever=retriever_base
+    )
@@ -0,0 +1,93 @@
+from typing import Any
+from langchain_core.documents.compressor import BaseDocumentCompressor
+from services.lotes import agrupar_reordenador
+from services.trazas import trazador
+from utils.config import settings
+
+class ReordenadorLocal(BaseDocumentCompressor):
+    modelo: str
+    top_n: int = 5
+    tamano_lote: int = 16
+    _cross_encoder: Any = None
+
+    def _cargar_modelo(self):
+        if self._cross_encoder is None:
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError as e:
+                raise ImportError("El reordenador local necesita 'sentence-transformers' instalado") from e
+            self._cross_encoder = CrossEncoder(self.modelo, device="cpu")
+        return self._cross_encoder
+
+    def reordenar_lote(self, peticiones: list) -> list:
+        pares = [(query, doc.page_content) for query, documentos in peticiones for doc in documentos]
+        puntuaciones = iter(self._cargar_modelo().predict(pares, batch_size=self.tamano_lote)) if pares else iter(())
+        
+        resultados = []
+        for _, documentos in peticiones:
+            ordenados = sorted(((doc, next(puntuaciones)) for doc in documentos), key=lambda par: par[1], reverse=True)[:self.top_n]
+            for doc, puntuacion in ordenados:
+                doc.metadata["relevance_score"] = float(puntuacion)
+            resultados.append([doc for doc, _ in ordenados])
+        return resultados
+
+    def compress_documents(self, documents, query, callbacks=None):
+        documentos = list(documents)
+        if not documentos:
+            return []
+        return self.reordenar_lote([(query, documentos)])[0]
+
+
+class ReordenadorNulo(BaseDocumentCompressor):
+    top_n: int = 5
+
+    def compress_documents(self, documents, query, callbacks=None):
+        return list(documents)[:self.top_n]
+
+
+class ReordenadorAdaptativo(BaseDocumentCompressor):
+    base: BaseDocumentCompressor
+    top_n: int = 5
+    margen: float = 0.05
+
+    def _margen_claro(self, documentos: list) -> bool:
+        puntuaciones = [doc.metadata.get("puntuacion_densa") for doc in documentos]
+        if any(puntuacion is None for puntuacion in puntuaciones):
+            return False
+        
+        puntuaciones = sorted(puntuaciones, reverse=True)
+        return puntuaciones[self.top_n - 1] - puntuaciones[self.top_n] >= self.margen
+
+    def _ordenar(self, documentos: list) -> list:
+        if any(doc.metadata.get("puntuacion_densa") is None for doc in documentos):
+            return documentos[:self.top_n]
+        return sorted(documentos, key=lambda doc: doc.metadata["puntuacion_densa"], reverse=True)[:self.top_n]
+
+    def compress_documents(self, documents, query, callbacks=None):
+        documentos = list(documents)
+        if len(documentos) <= self.top_n:
+            return self._ordenar(documentos)
+        if self._margen_claro(documentos):
+            trazador.aviso("Reordenación omitida: las puntuaciones densas ya separan los mejores resultados")
+            return self._ordenar(documentos)
+        
+        return self.base.compress_documents(documentos, query, callbacks=callbacks)
+
+
+def crear_reordenador():
+    if settings.REORDENADOR == "local":
+        reordenador = ReordenadorLocal(
+            modelo=settings.MODELO_REORDENADOR_LOCAL,
+            top_n=settings.TOP_N_RERANK,
+            tamano_lote=settings.TAMANO_LOTE_REORDENADOR
+        )
+        reordenador = agrupar_reordenador(reordenador, settings.VENTANA_MICROLOTES, settings.MICROLOTE_REORDENADOR, settings.TIEMPO_ESPERA_MICROLOTES)
+    elif settings.REORDENADOR == "ninguno":
+        return ReordenadorNulo(top_n=settings.TOP_N_RERANK)
+    else:
+        from langchain_cohere import CohereRerank
+        reordenador = CohereRerank(model="rerank-v4.0-pro", top_n=settings.TOP_N_RERANK)
+    
+    if settings.REORDENACION_ADAPTATIVA:
+        return ReordenadorAdaptativo(base=reordenador, top_n=settings.TOP_N_RERANK, margen=settings.MARGEN_REORDENACION)
+    return reordenador
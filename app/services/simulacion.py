@@ -0,0 +1,295 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from typing import Any
+import numpy as np
+from langchain_classic.retrievers.contextual_compression import ContextualCompressionRetriever
+from langchain_core.documents import Document
+from langchain_core.documents.compressor import BaseDocumentCompressor
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.vectorstores import InMemoryVectorStore
+from templates import templates
+from utils.config import settings
+from utils.texto import estimar_tokens, tokenizar
+from services.indice_lexico import IndiceBM25
+from services.lotes import agrupar_embeddings, agrupar_reordenador
+from services.metadatos import metadatos_documento
+from services.planificador import VENTANA_SEGUNDOS
+from services.rag import CATEGORIAS_VALIDAS
+from services.recuperacion import RecuperadorDenso, RecuperadorHibrido
+from services.trazas import id_peticion_actual
+
+PROMPTS_SIMULADOS = {
+    "deteccion": templates.PROMPT_DETECCION,
+    "suficiencia": templates.PROMPT_CUESTIONA_AGENTE,
+    "reformulacion": templates.PROMPT_REFORMULACION,
+    "consulta": templates.PROMPT_CONSULTA_USUARIO,
+    "rechazo": templates.PROMPT_RECHAZO_AMABLE,
+    "clasificacion": templates.PROMPT_CLASIFICADOR,
+    "procedimental": templates.PROMPT_RESULTOR_PROCEDIMENTAL,
+    "calendario": templates.PROMPT_RESULTOR_CALENDARIO,
+    "normativo": templates.PROMPT_RESULTOR_NORMATIVO,
+    "baremo": templates.PROMPT_RESULTOR_BAREMO,
+    "enrutador": templates.PROMPT_ENRUTADOR,
+    "resumen_historial": templates.PROMPT_RESUMEN_HISTORIAL,
+}
+
+_FIRMAS = sorted(
+    ((plantilla[:plantilla.find("{")], tipo) for tipo, plantilla in PROMPTS_SIMULADOS.items()),
+    key=lambda firma: len(firma[0]),
+    reverse=True
+)
+
+def identificar_prompt(contenido: str) -> str:
+    for prefijo, tipo in _FIRMAS:
+        if contenido.startswith(prefijo):
+            return tipo
+    return "desconocido"
+
+
+class RegistroLlamadas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.llamadas = []
+
+    def anotar(self, llamada: dict):
+        with self._lock:
+            self.llamadas.append(llamada)
+
+    def de_peticion(self, id_peticion: str) -> list:
+        with self._lock:
+            return [llamada for llamada in self.llamadas if llamada["id_peticion"] == id_peticion]
+
+    def limpiar(self):
+        with self._lock:
+            self.llamadas = []
+
+
+class GuionSimulado:
+    def __init__(self, preguntas: list):
+        self.preguntas = preguntas
+
+    def _buscar(self, prompt: str):
+        mejor, posicion_mejor = None, -1
+        for pregunta in self.preguntas:
+            for texto in (pregunta["pregunta"], pregunta.get("reformulada")):
+                posicion = prompt.rfind(texto) if texto else -1
+                if posicion > posicion_mejor:
+                    mejor, posicion_mejor = pregunta, posicion
+        return mejor
+
+    def responder(self, tipo: str, prompt: str) -> str:
+        if tipo == "resumen_historial":
+            return "El estudiante ha consultado trámites de matrícula en la Universidad de Sevilla."
+
+        pregunta = self._buscar(prompt)
+        if pregunta is None:
+            return "normativo"
+
+        grabadas = pregunta.get("respuestas", {})
+        if tipo in grabadas:
+            return grabadas[tipo]
+
+        ruta = pregunta["ruta"]
+        categoria = ruta if ruta in CATEGORIAS_VALIDAS else "normativo"
+        if tipo == "deteccion":
+            return "rechazo_amable" if ruta == "rechazo_amable" else "recuperador"
+        if tipo == "suficiencia":
+            return "entrevistador" if ruta == "entrevistador" else "resultor"
+        if tipo == "clasificacion":
+            return categoria
+        if tipo == "reformulacion":
+            return pregunta.get("reformulada", pregunta["pregunta"])
+        if tipo == "enrutador":
+            return json.dumps({
+                "intencion": "rechazo_amable" if ruta == "rechazo_amable" else "recuperador",
+                "suficiente": "entrevistador" if ruta == "entrevistador" else "resultor",
+                "categoria": categoria
+            })
+        return pregunta.get("respuesta", "Respuesta simulada para la consulta del estudiante.")
+
+
+class LimiteTasaSimulado(Exception):
+    status_code = 429
+
+
+class CuotaSimulada:
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._lock = threading.Lock()
+        self._consumos = deque()
+
+    def consumir(self, tokens: int):
+        with self._lock:
+            ahora = time.time()
+            while self._consumos and self._consumos[0][0] <= ahora - VENTANA_SEGUNDOS:
+                self._consumos.popleft()
+            if len(self._consumos) >= self.rpm or sum(consumo[1] for consumo in self._consumos) + tokens > self.tpm:
+                raise LimiteTasaSimulado(f"Error 429: rate limit simulado ({self.rpm} rpm, {self.tpm} tpm)")
+            self._consumos.append((ahora, tokens))
+
+
+class ChatSimulado(BaseChatModel):
+    guion: Any
+    registro: Any = None
+    cuota: Any = None
+    model_name: str = "simulado"
+    latencia: float = 0.3
+    tokens_por_segundo: float = 500.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "simulado"
+
+    def _preparar(self, messages) -> tuple:
+        prompt = "\n".join(str(mensaje.content) for mensaje in messages)
+        tipo = identificar_prompt(messages[-1].content)
+        respuesta = self.guion.responder(tipo, messages[-1].content)
+        uso = {
+            "input_tokens": estimar_tokens(prompt),
+            "output_tokens": estimar_tokens(respuesta),
+            "total_tokens": estimar_tokens(prompt) + estimar_tokens(respuesta)
+        }
+        if self.cuota is not None:
+            self.cuota.consumir(uso["total_tokens"])
+        if self.registro is not None:
+            self.registro.anotar({
+                "id_peticion": id_peticion_actual(),
+                "modelo": self.model_name,
+                "tipo": tipo,
+                "caracteres_prompt": len(prompt),
+                "tokens_prompt": uso["input_tokens"],
+                "tokens_respuesta": uso["output_tokens"]
+            })
+        return respuesta, uso
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        respuesta, uso = self._preparar(messages)
+        time.sleep(self.latencia + uso["output_tokens"] / self.tokens_por_segundo)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=respuesta, usage_metadata=uso))])
+
+    def _fragmentos(self, respuesta: str, uso: dict):
+        palabras = respuesta.split(" ")
+        for posicion, palabra in enumerate(palabras):
+            ultimo = posicion == len(palabras) - 1
+            texto = palabra if ultimo else palabra + " "
+            yield estimar_tokens(texto) / self.tokens_por_segundo, ChatGenerationChunk(
+                message=AIMessageChunk(content=texto, usage_metadata=uso if ultimo else None)
+            )
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        respuesta, uso = self._preparar(messages)
+        time.sleep(self.latencia)
+        for espera, fragmento in self._fragmentos(respuesta, uso):
+            time.sleep(espera)
+            if run_manager:
+                run_manager.on_llm_new_token(fragmento.text, chunk=fragmento)
+            yield fragmento
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        respuesta, uso = self._preparar(messages)
+        await asyncio.sleep(self.latencia + uso["output_tokens"] / self.tokens_por_segundo)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=respuesta, usage_metadata=uso))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        respuesta, uso = self._preparar(messages)
+        await asyncio.sleep(self.latencia)
+        for espera, fragmento in self._fragmentos(respuesta, uso):
+            await asyncio.sleep(espera)
+            if run_manager:
+                await run_manager.on_llm_new_token(fragmento.text, chunk=fragmento)
+            yield fragmento
+
+
+class EmbeddingsSimulados(Embeddings):
+    def __init__(self, dimension: int = 256, latencia: float = 0.0):
+        self.dimension = dimension
+        self.latencia = latencia
+
+    def _vector(self, texto: str) -> list:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in tokenizar(texto):
+            resumen = int(hashlib.md5(token.encode("utf-8")).hexdigest(), 16)
+            vector[resumen % self.dimension] += 1.0 if (resumen >> 64) & 1 else -1.0
+        norma = np.linalg.norm(vector)
+        return (vector / norma if norma else vector).tolist()
+
+    def embed_documents(self, texts: list) -> list:
+        time.sleep(self.latencia)
+        return [self._vector(texto) for texto in texts]
+
+    def embed_query(self, text: str) -> list:
+        time.sleep(self.latencia)
+        return self._vector(text)
+
+
+class ReordenadorSimulado(BaseDocumentCompressor):
+    top_n: int = 5
+    latencia: float = 0.0
+
+    def reordenar_lote(self, peticiones: list) -> list:
+        time.sleep(self.latencia)
+        resultados = []
+        for query, documentos in peticiones:
+            consulta = set(tokenizar(query))
+            for doc in documentos:
+                comunes = consulta & set(tokenizar(doc.page_content))
+                doc.metadata["relevance_score"] = len(comunes) / (len(consulta) or 1)
+            resultados.append(sorted(documentos, key=lambda doc: doc.metadata["relevance_score"], reverse=True)[:self.top_n])
+        return resultados
+
+    def compress_documents(self, documents, query, callbacks=None):
+        return self.reordenar_lote([(query, list(documents))])[0]
+
+
+def cargar_fixtures(ruta: str) -> dict:
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+def crear_componentes_simulados(fixtures: dict, registro: RegistroLlamadas = None, latencia_ligero: float = 0.15, latencia_pesado: float = 0.4,
+                                tokens_por_segundo_ligero: float = 750.0, tokens_por_segundo_pesado: float = 275.0,
+                                latencia_embeddings: float = 0.05, latencia_reordenador: float = 0.1, limites_proveedor: dict = None) -> dict:
+    guion = GuionSimulado(fixtures["preguntas"])
+    cuotas = {modelo: CuotaSimulada(limite["rpm"], limite["tpm"]) for modelo, limite in (limites_proveedor or {}).items()}
+    embeddings = agrupar_embeddings(EmbeddingsSimulados(latencia=latencia_embeddings), settings.VENTANA_MICROLOTES, settings.MICROLOTE_EMBEDDINGS, settings.TIEMPO_ESPERA_MICROLOTES)
+    documentos = [
+        Document(page_content=doc["texto"], metadata={
+            "source": doc["source"], "page": doc["page"], "id_fragmento": f"fixture-{posicion}", **metadatos_documento(doc["source"])
+        })
+        for posicion, doc in enumerate(fixtures["documentos"])
+    ]
+    vectorstore = InMemoryVectorStore(embeddings)
+    vectorstore.add_documents(documentos, ids=[doc.metadata["id_fragmento"] for doc in documentos])
+
+    if settings.RECUPERACION_HIBRIDA:
+        indice_lexico = IndiceBM25()
+        indice_lexico.agregar([doc.metadata["id_fragmento"] for doc in documentos], [doc.page_content for doc in documentos], [doc.metadata for doc in documentos])
+        retriever_base = RecuperadorHibrido(vectorstore=vectorstore, indice_lexico=indice_lexico, k_denso=settings.K_DENSO, k_lexico=settings.K_LEXICO, k_fusion=settings.K_FUSION)
+    else:
+        retriever_base = RecuperadorDenso(vectorstore=vectorstore, k=settings.K_DENSO)
+
+    return {
+        "llm": ChatSimulado(guion=guion, registro=registro, cuota=cuotas.get(settings.MODELO_LLM_PESADO), model_name=settings.MODELO_LLM_PESADO, latencia=latencia_pesado, tokens_por_segundo=tokens_por_segundo_pesado),
+        "light_llm": ChatSimulado(guion=guion, registro=registro, cuota=cuotas.get(settings.MODELO_LLM_LIGERO), model_name=settings.MODELO_LLM_LIGERO, latencia=latencia_ligero, tokens_por_segundo=tokens_por_segundo_ligero),
+        "llm_respaldo": ChatSimulado(guion=guion, registro=registro, cuota=cuotas.get(settings.MODELO_LLM_LIGERO), model_name=settings.MODELO_LLM_LIGERO, latencia=latencia_ligero, tokens_por_segundo=tokens_por_segundo_ligero),
+        "llm_resumen": ChatSimulado(guion=guion, registro=registro, cuota=cuotas.get(settings.MODELO_LLM_LIGERO), model_name=settings.MODELO_LLM_LIGERO, latencia=latencia_ligero, tokens_por_segundo=tokens_por_segundo_ligero),
+        "embeddings": embeddings,
+        "vectorstore": vectorstore,
+        "almacen_padres": None,
+        "retriever": ContextualCompressionRetriever(
+            base_compressor=agrupar_reordenador(
+                ReordenadorSimulado(top_n=settings.TOP_N_RERANK, latencia=latencia_reordenador),
+                settings.VENTANA_MICROLOTES,
+                settings.MICROLOTE_REORDENADOR,
+                settings.TIEMPO_ESPERA_MICROLOTES
+            ),
+            base_retriever=retriever_base
+        ),
+    }
@@ -0,0 +1,201 @@
+import contextvars
+import datetime
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableLambda
+from utils.config import settings
+
+_id_peticion = contextvars.ContextVar("id_peticion", default=None)
+
+CAMPOS = ["id_peticion", "etapa", "tipo", "inicio", "duracion", "tokens_prompt", "tokens_completion", "documentos", "ruta", "error"]
+
+
+class ManejadorTokens(BaseCallbackHandler):
+    def __init__(self):
+        self.tokens_prompt = 0
+        self.tokens_completion = 0
+
+    def on_llm_end(self, response, **kwargs):
+        uso = (response.llm_output or {}).get("token_usage") or {}
+        if uso:
+            self.tokens_prompt += uso.get("prompt_tokens", 0)
+            self.tokens_completion += uso.get("completion_tokens", 0)
+            return
+
+        for generaciones in response.generations:
+            for generacion in generaciones:
+                metadatos = getattr(getattr(generacion, "message", None), "usage_metadata", None) or {}
+                self.tokens_prompt += metadatos.get("input_tokens", 0)
+                self.tokens_completion += metadatos.get("output_tokens", 0)
+
+    def tokens(self) -> dict:
+        return {"tokens_prompt": self.tokens_prompt, "tokens_completion": self.tokens_completion}
+
+
+class Trazador:
+    def __init__(self, destino: str, ruta: str, consola: bool = False):
+        self.destino = destino
+        self.ruta = ruta
+        self.consola = consola
+        self._lock = threading.Lock()
+        self._conexion = None
+
+    def _conectar(self):
+        if self._conexion is None:
+            os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+            self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+            self._conexion.execute(
+                "CREATE TABLE IF NOT EXISTS trazas ("
+                "id_peticion TEXT, etapa TEXT, tipo TEXT, inicio TEXT, duracion REAL, "
+                "tokens_prompt INTEGER, tokens_completion INTEGER, documentos INTEGER, ruta TEXT, error TEXT)"
+            )
+        return self._conexion
+
+    def registrar(self, registro: dict):
+        if self.consola:
+            print(f"[{registro['id_peticion']}] {registro['tipo']} {registro['etapa']}: {registro['duracion']:.3f}s", datetime.datetime.now())
+        if self.destino == "ninguno":
+            return
+
+        with self._lock:
+            if self.destino == "sqlite":
+                conexion = self._conectar()
+                conexion.execute(f"INSERT INTO trazas VALUES ({', '.join('?' * len(CAMPOS))})", [registro.get(c) for c in CAMPOS])
+                conexion.commit()
+            else:
+                os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+                with open(self.ruta, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    def aviso(self, mensaje: str):
+        if self.consola:
+            id_peticion = _id_peticion.get()
+            print(f"[{id_peticion}] {mensaje}" if id_peticion else mensaje, datetime.datetime.now())
+
+    def registrar_duracion(self, etapa: str, tipo: str, duracion: float, **datos):
+        self.registrar({
+            "id_peticion": _id_peticion.get(),
+            "etapa": etapa,
+            "tipo": tipo,
+            "inicio": datetime.datetime.now().isoformat(timespec="milliseconds"),
+            "duracion": duracion,
+            **datos
+        })
+
+    def leer(self) -> list:
+        if self.destino == "sqlite":
+            if not os.path.exists(self.ruta):
+                return []
+            with self._lock:
+                filas = self._conectar().execute(f"SELECT {', '.join(CAMPOS)} FROM trazas").fetchall()
+            return [dict(zip(CAMPOS, fila)) for fila in filas]
+
+        if not os.path.exists(self.ruta):
+            return []
+        with open(self.ruta, encoding="utf-8") as f:
+            return [json.loads(linea) for linea in f if linea.strip()]
+
+    @contextmanager
+    def peticion(self, id_peticion: str = None):
+        id_peticion = id_peticion or uuid.uuid4().hex[:12]
+        token = _id_peticion.set(id_peticion)
+        try:
+            yield id_peticion
+        finally:
+            _id_peticion.reset(token)
+
+    @contextmanager
+    def medir(self, etapa: str, tipo: str):
+        registro = {
+            "id_peticion": _id_peticion.get(),
+            "etapa": etapa,
+            "tipo": tipo,
+            "inicio": datetime.datetime.now().isoformat(timespec="milliseconds")
+        }
+        comienzo = time.perf_counter()
+        try:
+            yield registro
+        except Exception as e:
+            registro["error"] = type(e).__name__
+            raise
+        finally:
+            registro["duracion"] = time.perf_counter() - comienzo
+            self.registrar(registro)
+
+    def resumen_percentiles(self) -> dict:
+        duraciones = {}
+        for registro in self.leer():
+            duraciones.setdefault((registro["tipo"], registro["etapa"]), []).append(registro["duracion"])
+
+        resumen = {}
+        for (tipo, etapa), valores in sorted(duraciones.items()):
+            p50, p95, p99 = np.percentile(valores, [50, 95, 99])
+            resumen[f"{tipo}:{etapa}"] = {"n": len(valores), "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+        return resumen
+
+
+trazador = Trazador(settings.DESTINO_TRAZAS, settings.RUTA_TRAZAS, settings.TRAZAS_CONSOLA)
+
+def id_peticion_actual() -> str:
+    return _id_peticion.get()
+
+def _con_peticion(state: dict):
+    id_peticion = state.get("id_peticion") if isinstance(state, dict) else None
+    return trazador.peticion(id_peticion) if id_peticion and id_peticion != _id_peticion.get() else _sin_cambios()
+
+@contextmanager
+def _sin_cambios():
+    yield _id_peticion.get()
+
+def _anotar_resultado(registro: dict, resultado):
+    if isinstance(resultado, dict):
+        if "referencias" in resultado:
+            registro["documentos"] = len(resultado["referencias"] or [])
+        if "ruta" in resultado:
+            registro["ruta"] = resultado["ruta"]
+
+def trazar_nodo(nombre: str, funcion, afuncion=None):
+    @functools.wraps(funcion)
+    def envoltura(state):
+        with _con_peticion(state), trazador.medir(nombre, "nodo") as registro:
+            resultado = funcion(state)
+            _anotar_resultado(registro, resultado)
+            return resultado
+    
+    if afuncion is None:
+        return envoltura
+    
+    @functools.wraps(afuncion)
+    async def aenvoltura(state):
+        with _con_peticion(state), trazador.medir(nombre, "nodo") as registro:
+            resultado = await afuncion(state)
+            _anotar_resultado(registro, resultado)
+            return resultado
+    return RunnableLambda(envoltura, afunc=aenvoltura, name=nombre)
+
+def trazar_arista(nombre: str, funcion, afuncion=None):
+    @functools.wraps(funcion)
+    def envoltura(state):
+        with _con_peticion(state), trazador.medir(nombre, "arista") as registro:
+            ruta = funcion(state)
+            registro["ruta"] = ruta
+            return ruta
+    
+    if afuncion is None:
+        return envoltura
+    
+    @functools.wraps(afuncion)
+    async def aenvoltura(state):
+        with _con_peticion(state), trazador.medir(nombre, "arista") as registro:
+            ruta = await afuncion(state)
+            registro["ruta"] = ruta
+            return ruta
+    return RunnableLambda(envoltura, afunc=aenvoltura, name=nombre)
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import uuid
+from contextlib import asynccontextmanager
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from orquestacion import apreparar_consulta, cerrar_consulta
+from services.lotes import metricas_lotes
+from services.planificador import es_limite_tasa, planificador
+from services.rag import asistente_rag
+from services.trazas import trazador
+from utils.config import obtener_version_corpus
+
+def evento_sse(evento: str, datos) -> str:
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+async def _eventos_consulta(datos: dict):
+    id_peticion = datos.get("id_peticion") or uuid.uuid4().hex[:12]
+    try:
+        with trazador.peticion(id_peticion):
+            consulta = await apreparar_consulta(
+                id_peticion,
+                datos["pregunta"],
+                datos.get("historial", []),
+                datos.get("resumen_historial", ""),
+                datos.get("mensajes_resumidos", 0)
+            )
+        yield evento_sse("consulta", {
+            "id_peticion": id_peticion,
+            "estado": consulta["estado"],
+            "ruta": consulta["ruta"],
+            "referencias": consulta["referencias"],
+            "resumen_historial": consulta["resumen_historial"],
+            "mensajes_resumidos": consulta["mensajes_resumidos"]
+        })
+
+        partes = []
+        async for fragmento in consulta["stream"]:
+            partes.append(fragmento)
+            yield evento_sse("fragmento", fragmento)
+
+        await asyncio.to_thread(cerrar_consulta, consulta, "".join(partes))
+        yield evento_sse("fin", {"id_peticion": id_peticion})
+    except Exception as e:
+        yield evento_sse("error", {"mensaje": str(e), "limite_tasa": es_limite_tasa(e)})
+
+async def consultar(request: Request):
+    datos = await request.json()
+    if not datos.get("pregunta"):
+        return JSONResponse({"error": "Falta la pregunta"}, status_code=400)
+
+    return StreamingResponse(
+        _eventos_consulta(datos),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def salud(request: Request):
+    return JSONResponse({"estado": "ok", "version_corpus": obtener_version_corpus()})
+
+async def metricas(request: Request):
+    return JSONResponse({"planificador": planificador.estadisticas, "lotes": metricas_lotes()})
+
+@asynccontextmanager
+async def ciclo_vida(app):
+    await asyncio.to_thread(asistente_rag.calentar_cache_faq)
+    yield
+
+app = Starlette(lifespan=ciclo_vida, routes=[
+    Route("/consultas", consultar, methods=["POST"]),
+    Route("/salud", salud, methods=["GET"]),
+    Route("/metricas", metricas, methods=["GET"]),
+])
@@ -202,4 +202,47 @@ PROMPT_RESULTOR_BAREMO = """
         {question}
 
         Criterios de evaluación y puntuación:
-        """
\ No newline at end of file
+        """
+
+PROMPT_ENRUTADOR = """
+        Eres un enrutador experto de la Universidad de Sevilla.
+        A partir de la pregunta del usuario, el historial y el contexto recuperado debes tomar TRES decisiones a la vez:
+
+        1. "intencion": "recuperador" si la pregunta trata sobre temas burocráticos universitarios de la Universidad de Sevilla (la us), o "rechazo_amable" si no tiene relación con ellos (eventos culturales, vida en el campus, etc.).
+        2. "suficiente": "resultor" si con la pregunta y el contexto eres capaz de resolver claramente la consulta, o "entrevistador" si falta algún dato del usuario para poder resolverla.
+        3. "categoria": una de estas cuatro palabras clave:
+           - "procedimental": trámites paso a paso, cómo hacer matrículas o justificar viajes por ejemplo.
+           - "calendario": preguntas sobre fechas, plazos, inicio y fin de clase.
+           - "normativo": dudas legales, convalidaciones de créditos o normativas de movilidad.
+           - "baremo": cálculo de puntos, evaluación de méritos, tribunales.
+
+        Responde ÚNICAMENTE con un objeto JSON válido en una sola línea, sin explicaciones ni bloques de código, con este formato exacto:
+        {{"intencion": "...", "suficiente": "...", "categoria": "..."}}
+
+        HISTORIAL DE CONVERSACIÓN:
+        {historial}
+
+        CONTEXTO RECUPERADO DE LA BASE DE DATOS:
+        {context}
+
+        PREGUNTA DEL USUARIO:
+        {question}
+
+        JSON:
+        """
+
+
+PROMPT_RESUMEN_HISTORIAL = """
+        Eres un asistente que mantiene un resumen breve de una conversación entre un estudiante y el Asistente de la Universidad de Sevilla.
+        Actualiza el resumen existente incorporando los nuevos mensajes. Conserva únicamente los datos útiles para responder a futuras preguntas
+        (trámites consultados, titulación, tipo de estudiante, fechas, decisiones tomadas). No incluyas fuentes ni saludos.
+        Responde SOLO con el resumen actualizado, en un único párrafo de como máximo cinco frases.
+
+        RESUMEN ACTUAL:
+        {resumen}
+
+        NUEVOS MENSAJES:
+        {mensajes}
+
+        RESUMEN ACTUALIZADO:
+        """
@@ -1,8 +1,12 @@
-from .config import settings, config_light_llm, config_llm, format_docs
+from .config import settings, config_light_llm, config_llm, format_docs, obtener_version_corpus
+from .texto import normalizar_texto, similitud_jaccard
 
 __all__ = [
 	"settings",
 	"config_light_llm",
 	"config_llm",
 	"format_docs",
+	"obtener_version_corpus",
+	"normalizar_texto",
+	"similitud_jaccard",
 ]
@@ -0,0 +1,40 @@
+import asyncio
+import queue
+import threading
+
+_FIN = object()
+_bucle = None
+_lock = threading.Lock()
+
+def bucle_compartido() -> asyncio.AbstractEventLoop:
+    global _bucle
+    if _bucle is None:
+        with _lock:
+            if _bucle is None:
+                bucle = asyncio.new_event_loop()
+                threading.Thread(target=bucle.run_forever, name="bucle-asincrono", daemon=True).start()
+                _bucle = bucle
+    return _bucle
+
+def ejecutar(corrutina):
+    return asyncio.run_coroutine_threadsafe(corrutina, bucle_compartido()).result()
+
+async def _volcar(generador, cola: queue.Queue):
+    try:
+        async for elemento in generador:
+            cola.put(elemento)
+    except Exception as e:
+        cola.put(e)
+    finally:
+        cola.put(_FIN)
+
+def iterar(generador):
+    cola = queue.Queue()
+    futuro = asyncio.run_coroutine_threadsafe(_volcar(generador, cola), bucle_compartido())
+    try:
+        while (elemento := cola.get()) is not _FIN:
+            if isinstance(elemento, Exception):
+                raise elemento
+            yield elemento
+    finally:
+        futuro.cancel()
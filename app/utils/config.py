@@ -1,6 +1,9 @@
 from dotenv import load_dotenv
+import json
 import os
-from langchain_groq import ChatGroq
+
+def _env_bool(nombre: str, defecto: str = "false") -> bool:
+    return os.getenv(nombre, defecto).strip().lower() in ("1", "true", "si", "sí", "yes")
 
 class Settings:
     def __init__(self):
@@ -11,30 +14,167 @@ class Settings:
         self.HUGGINGFACEHUB_LIGHT_MODEL = os.getenv("HUGGINGFACEHUB_LIGHT_MODEL")
         self.PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
         self.MODEL_EMBEDDINGS = os.getenv("MODEL_EMBEDDINGS")
-        self.RUTA_PDFS = self.BASE_DIR + os.getenv("RUTA_PDFS")
+        self.RUTA_PDFS = self.BASE_DIR + os.getenv("RUTA_PDFS", "/Documentos_US")
         self.COHERE_API_KEY = os.getenv("COHERE_API_KEY")
         self.GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+        self.RUTA_DATOS = os.getenv("RUTA_DATOS", os.path.join(self.BASE_DIR, "datos"))
+        self.BACKEND_RECUPERACION = os.getenv("BACKEND_RECUPERACION", "remoto")
+        self.INDICE_PINECONE = os.getenv("INDICE_PINECONE", "index-tfg")
+        self.MODEL_EMBEDDINGS_LOCAL = os.getenv("MODEL_EMBEDDINGS_LOCAL", self.MODEL_EMBEDDINGS)
+        self.RUTA_INDICE_LOCAL = os.getenv("RUTA_INDICE_LOCAL", os.path.join(self.RUTA_DATOS, "indice_local"))
+        self.RUTA_INDICE_LEXICO = os.getenv("RUTA_INDICE_LEXICO", os.path.join(self.RUTA_DATOS, "indice_lexico.json"))
+        self.RECUPERACION_HIBRIDA = _env_bool("RECUPERACION_HIBRIDA", "false")
+        self.K_DENSO = int(os.getenv("K_DENSO", "12"))
+        self.K_LEXICO = int(os.getenv("K_LEXICO", "12"))
+        self.K_FUSION = int(os.getenv("K_FUSION", "8"))
+        self.FILTRO_FAMILIAS = _env_bool("FILTRO_FAMILIAS", "true")
+        self.UMBRAL_FILTRO_FAMILIAS = float(os.getenv("UMBRAL_FILTRO_FAMILIAS", "0.7"))
+        self.K_DENSO_FILTRADO = int(os.getenv("K_DENSO_FILTRADO", "8"))
+        self.MINIMO_RESULTADOS_FILTRADOS = int(os.getenv("MINIMO_RESULTADOS_FILTRADOS", "3"))
+        self.TOP_N_RERANK = int(os.getenv("TOP_N_RERANK", "5"))
+        self.REORDENADOR = os.getenv("REORDENADOR", "cohere")
+        self.MODELO_REORDENADOR_LOCAL = os.getenv("MODELO_REORDENADOR_LOCAL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+        self.TAMANO_LOTE_REORDENADOR = int(os.getenv("TAMANO_LOTE_REORDENADOR", "16"))
+        self.REORDENACION_ADAPTATIVA = _env_bool("REORDENACION_ADAPTATIVA", "false")
+        self.MARGEN_REORDENACION = float(os.getenv("MARGEN_REORDENACION", "0.05"))
+        self.VENTANA_MICROLOTES = float(os.getenv("VENTANA_MICROLOTES", "0.005"))
+        self.MICROLOTE_EMBEDDINGS = int(os.getenv("MICROLOTE_EMBEDDINGS", "16"))
+        self.MICROLOTE_REORDENADOR = int(os.getenv("MICROLOTE_REORDENADOR", "8"))
+        self.TIEMPO_ESPERA_MICROLOTES = float(os.getenv("TIEMPO_ESPERA_MICROLOTES", "60"))
+        self.RUTA_MANIFIESTO = os.getenv("RUTA_MANIFIESTO", os.path.join(self.RUTA_DATOS, "manifiesto.json"))
+        self.TAMANO_FRAGMENTO = int(os.getenv("TAMANO_FRAGMENTO", "1000"))
+        self.SOLAPAMIENTO_FRAGMENTO = int(os.getenv("SOLAPAMIENTO_FRAGMENTO", "150"))
+        self.INDICE_PADRES = _env_bool("INDICE_PADRES", "true")
+        self.TAMANO_FRAGMENTO_HIJO = int(os.getenv("TAMANO_FRAGMENTO_HIJO", "400"))
+        self.SOLAPAMIENTO_FRAGMENTO_HIJO = int(os.getenv("SOLAPAMIENTO_FRAGMENTO_HIJO", "60"))
+        self.TAMANO_FRAGMENTO_PADRE = int(os.getenv("TAMANO_FRAGMENTO_PADRE", "2400"))
+        self.RUTA_ALMACEN_PADRES = os.getenv("RUTA_ALMACEN_PADRES", os.path.join(self.RUTA_DATOS, "padres"))
+        self.TAMANO_LOTE_EMBEDDINGS = int(os.getenv("TAMANO_LOTE_EMBEDDINGS", "64"))
+        self.PAGINAS_POR_TAREA = int(os.getenv("PAGINAS_POR_TAREA", "20"))
+        self.PROCESOS_INGESTA = int(os.getenv("PROCESOS_INGESTA", str(os.cpu_count() or 1)))
+        self.TURNOS_HISTORIAL = int(os.getenv("TURNOS_HISTORIAL", "3"))
+        self.MAX_TOKENS_RESUMEN = int(os.getenv("MAX_TOKENS_RESUMEN", "400"))
+        self.PRESUPUESTOS_HISTORIAL = {
+            "deteccion": 300,
+            "reformulacion": 400,
+            "suficiencia": 300,
+            "clasificacion": 200,
+            "enrutador": 400,
+            "resultor": 1200,
+            "consulta": 800,
+            "rechazo": 300,
+            **json.loads(os.getenv("PRESUPUESTOS_HISTORIAL", "{}"))
+        }
+        self.COMPRIMIR_CONTEXTO = _env_bool("COMPRIMIR_CONTEXTO", "true")
+        self.UMBRAL_DUPLICADOS = float(os.getenv("UMBRAL_DUPLICADOS", "0.8"))
+        self.PRESUPUESTOS_CONTEXTO = {
+            "suficiencia": 900,
+            "clasificacion": 500,
+            "enrutador": 900,
+            "resultor": 1200,
+            "calendario": 900,
+            "consulta": 800,
+            "rechazo": 300,
+            **json.loads(os.getenv("PRESUPUESTOS_CONTEXTO", "{}"))
+        }
+        self.PRESUPUESTO_PADRES = int(os.getenv("PRESUPUESTO_PADRES", str(self.PRESUPUESTOS_CONTEXTO["resultor"])))
+        self.RITMO_STREAMING = os.getenv("RITMO_STREAMING", "fotogramas")
+        self.FPS_STREAMING = float(os.getenv("FPS_STREAMING", "20"))
+        self.PRECARGAR_CLIENTES = _env_bool("PRECARGAR_CLIENTES", "true")
+        self.DESTINO_TRAZAS = os.getenv("DESTINO_TRAZAS", "jsonl")
+        self.RUTA_TRAZAS = os.getenv("RUTA_TRAZAS", os.path.join(self.RUTA_DATOS, "trazas.sqlite" if self.DESTINO_TRAZAS == "sqlite" else "trazas.jsonl"))
+        self.TRAZAS_CONSOLA = _env_bool("TRAZAS_CONSOLA", "true")
+        self.MODO_ENRUTAMIENTO = os.getenv("MODO_ENRUTAMIENTO", "secuencial")
+        self.UMBRAL_REFORMULACION = float(os.getenv("UMBRAL_REFORMULACION", "0.8"))
+        self.VERSION_CORPUS = os.getenv("VERSION_CORPUS", "1")
+        self.CACHE_SEMANTICA = _env_bool("CACHE_SEMANTICA", "true")
+        self.UMBRAL_CACHE_SEMANTICA = float(os.getenv("UMBRAL_CACHE_SEMANTICA", "0.92"))
+        self.TTL_CACHE_SEMANTICA = float(os.getenv("TTL_CACHE_SEMANTICA", "86400"))
+        self.CAPACIDAD_CACHE_SEMANTICA = int(os.getenv("CAPACIDAD_CACHE_SEMANTICA", "500"))
+        self.CACHE_RECUPERACION = _env_bool("CACHE_RECUPERACION", "true")
+        self.CAPACIDAD_CACHE_RECUPERACION = int(os.getenv("CAPACIDAD_CACHE_RECUPERACION", "1000"))
+        self.CAPACIDAD_CACHE_EMBEDDINGS = int(os.getenv("CAPACIDAD_CACHE_EMBEDDINGS", "2000"))
+        self.ESTADO_COMPARTIDO = _env_bool("ESTADO_COMPARTIDO", "false")
+        self.RUTA_ESTADO_COMPARTIDO = os.getenv("RUTA_ESTADO_COMPARTIDO", os.path.join(self.RUTA_DATOS, "estado_compartido.sqlite"))
+        self.PERSISTIR_CACHE_RECUPERACION = _env_bool("PERSISTIR_CACHE_RECUPERACION", "true" if self.ESTADO_COMPARTIDO else "false")
+        self.RUTA_CACHE_RECUPERACION = os.getenv("RUTA_CACHE_RECUPERACION", os.path.join(self.RUTA_DATOS, "cache_recuperacion.sqlite"))
+        self.MODO_ASINCRONO = _env_bool("MODO_ASINCRONO", "false")
+        self.URL_BACKEND = os.getenv("URL_BACKEND", "").rstrip("/")
+        self.TIEMPO_ESPERA_BACKEND = float(os.getenv("TIEMPO_ESPERA_BACKEND", "120"))
+        self.MODELO_LLM_LIGERO = os.getenv("MODELO_LLM_LIGERO", "llama-3.1-8b-instant")
+        self.MODELO_LLM_PESADO = os.getenv("MODELO_LLM_PESADO", "llama-3.3-70b-versatile")
+        self.LIMITES_LLM = {
+            self.MODELO_LLM_LIGERO: {"rpm": 30, "tpm": 6000},
+            self.MODELO_LLM_PESADO: {"rpm": 30, "tpm": 12000},
+            **json.loads(os.getenv("LIMITES_LLM", "{}"))
+        }
+        self.CONCURRENCIA_LLM = int(os.getenv("CONCURRENCIA_LLM", "8"))
+        self.REINTENTOS_LLM = int(os.getenv("REINTENTOS_LLM", "4"))
+        self.ESPERA_BASE_REINTENTO = float(os.getenv("ESPERA_BASE_REINTENTO", "1.0"))
+        self.ESPERA_MAXIMA_REINTENTO = float(os.getenv("ESPERA_MAXIMA_REINTENTO", "20.0"))
+        self.TOKENS_SALIDA_ESTIMADOS = int(os.getenv("TOKENS_SALIDA_ESTIMADOS", "700"))
+        self.ESPERA_MAXIMA_MODELO_PESADO = float(os.getenv("ESPERA_MAXIMA_MODELO_PESADO", "3.0"))
+        self.MAX_TOKENS_RESPALDO = int(os.getenv("MAX_TOKENS_RESPALDO", "1024"))
+        self.CLASIFICADOR_LOCAL = _env_bool("CLASIFICADOR_LOCAL", "true")
+        self.UMBRAL_CLASIFICADOR_LOCAL = float(os.getenv("UMBRAL_CLASIFICADOR_LOCAL", "0.85"))
+        self.RESPUESTA_ESPECULATIVA = _env_bool("RESPUESTA_ESPECULATIVA", "false")
+        self.UMBRAL_ESPECULACION = float(os.getenv("UMBRAL_ESPECULACION", "0.6"))
+        self.RUTA_CLASIFICADOR_LOCAL = os.getenv("RUTA_CLASIFICADOR_LOCAL", os.path.join(self.RUTA_DATOS, "clasificador_local.npz"))
+        self.REGISTRAR_DECISIONES = _env_bool("REGISTRAR_DECISIONES", "true")
+        self.RUTA_DECISIONES_ENRUTAMIENTO = os.getenv("RUTA_DECISIONES_ENRUTAMIENTO", os.path.join(self.RUTA_DATOS, "decisiones_enrutamiento.jsonl"))
+        self.CALENDARIO_ESTRUCTURADO = _env_bool("CALENDARIO_ESTRUCTURADO", "true")
+        self.RUTA_CALENDARIO = os.getenv("RUTA_CALENDARIO", os.path.join(self.RUTA_DATOS, "calendario.json"))
+        self.UMBRAL_CALENDARIO = float(os.getenv("UMBRAL_CALENDARIO", "0.75"))
+        self.FAQ_PRECALCULADA = _env_bool("FAQ_PRECALCULADA", "true")
+        self.RUTA_FAQ = os.getenv("RUTA_FAQ", os.path.join(self.RUTA_DATOS, "faq.json"))
+        self.CURSO_ACADEMICO = os.getenv("CURSO_ACADEMICO", "2025-2026")
+        self.ARCHIVOS_CALENDARIO = [nombre.strip() for nombre in os.getenv(
+            "ARCHIVOS_CALENDARIO",
+            "calendario-academico-2025-2026-cg.pdf,R.R. NORMAS DE MATRICULA GRADO Y MASTER UNIVERSITARIO 2025-2026.pdf"
+        ).split(",") if nombre.strip()]
 
 
 settings = Settings()
 
-def config_light_llm():
+def config_light_llm(max_tokens: int = 150):
+    from langchain_groq import ChatGroq
     llm = ChatGroq(
         temperature=0.1, 
-        model_name="llama-3.1-8b-instant", 
+        model_name=settings.MODELO_LLM_LIGERO, 
         api_key=settings.GROQ_API_KEY,
-        max_tokens=150 
+        max_tokens=max_tokens,
+        max_retries=0
     )
     return llm
 
 def config_llm():
+    from langchain_groq import ChatGroq
     llm = ChatGroq(
         temperature=0.1, 
-        model_name="llama-3.3-70b-versatile",
-        api_key=settings.GROQ_API_KEY
+        model_name=settings.MODELO_LLM_PESADO,
+        api_key=settings.GROQ_API_KEY,
+        max_retries=0
     )
     return llm
 
+_manifiesto_leido = {"mtime": None, "version": None}
+
+def obtener_version_corpus():
+    try:
+        mtime = os.path.getmtime(settings.RUTA_MANIFIESTO)
+    except OSError:
+        return settings.VERSION_CORPUS
+    
+    if _manifiesto_leido["mtime"] != mtime:
+        try:
+            with open(settings.RUTA_MANIFIESTO, encoding="utf-8") as f:
+                version = json.load(f).get("version_corpus")
+        except (OSError, ValueError):
+            version = None
+        _manifiesto_leido.update(mtime=mtime, version=version)
+    
+    return _manifiesto_leido["version"] or settings.VERSION_CORPUS
+
 def format_docs(docs):
     return "\n\n".join([d.page_content for d in docs])
 
@@ -0,0 +1,95 @@
+import datetime
+import queue
+import threading
+import time
+from utils.config import settings
+
+_FIN = object()
+
+def _consumir(stream_original, cola: queue.Queue, detenido: threading.Event):
+    try:
+        for chunk in stream_original:
+            if detenido.is_set():
+                break
+            cola.put(chunk)
+    except Exception as e:
+        cola.put(e)
+    finally:
+        cola.put(_FIN)
+
+def generador_por_fotogramas(stream_original, fotogramas_por_segundo: float, metricas: dict = None, inicio: float = None):
+    """
+    Agrupa los fragmentos del stream en fotogramas a ritmo fijo. El primer fragmento
+    se muestra en cuanto llega y nunca se retiene texto más de un fotograma.
+    """
+    metricas = {} if metricas is None else metricas
+    comienzo_render = time.perf_counter()
+    inicio = comienzo_render if inicio is None else inicio
+    intervalo = 1.0 / fotogramas_por_segundo if fotogramas_por_segundo > 0 else 0.0
+    
+    cola = queue.Queue()
+    detenido = threading.Event()
+    threading.Thread(target=_consumir, args=(stream_original, cola, detenido), daemon=True).start()
+    
+    ultimo_envio = None
+    terminado = False
+    metricas.update(fragmentos=0, fotogramas=0)
+    try:
+        while not terminado:
+            bloque = [cola.get()]
+            limite = (ultimo_envio + intervalo) if ultimo_envio is not None else 0.0
+            while bloque[-1] is not _FIN and not isinstance(bloque[-1], Exception):
+                espera = limite - time.perf_counter()
+                try:
+                    bloque.append(cola.get(timeout=espera) if espera > 0 else cola.get_nowait())
+                except queue.Empty:
+                    break
+            
+            if bloque[-1] is _FIN:
+                bloque.pop()
+                terminado = True
+            elif isinstance(bloque[-1], Exception):
+                raise bloque[-1]
+            
+            if bloque:
+                metricas["fragmentos"] += len(bloque)
+                metricas["fotogramas"] += 1
+                if "tiempo_primer_token" not in metricas:
+                    metricas["tiempo_primer_token"] = time.perf_counter() - inicio
+                ultimo_envio = time.perf_counter()
+                yield "".join(bloque)
+    finally:
+        detenido.set()
+        metricas["tiempo_total"] = time.perf_counter() - inicio
+        metricas["tiempo_render"] = time.perf_counter() - comienzo_render
+        print(
+            f"Renderizado: primer token {metricas.get('tiempo_primer_token', 0.0):.3f}s, "
+            f"render {metricas['tiempo_render']:.3f}s, total {metricas['tiempo_total']:.3f}s, {metricas['fragmentos']} fragmentos en {metricas['fotogramas']} fotogramas",
+            datetime.datetime.now()
+        )
+
+def generador_directo(stream_original, metricas: dict = None, inicio: float = None):
+    metricas = {} if metricas is None else metricas
+    comienzo_render = time.perf_counter()
+    inicio = comienzo_render if inicio is None else inicio
+    metricas.update(fragmentos=0, fotogramas=0)
+    try:
+        for chunk in stream_original:
+            if "tiempo_primer_token" not in metricas:
+                metricas["tiempo_primer_token"] = time.perf_counter() - inicio
+            metricas["fragmentos"] += 1
+            metricas["fotogramas"] += 1
+            yield chunk
+    finally:
+        metricas["tiempo_total"] = time.perf_counter() - inicio
+        metricas["tiempo_render"] = time.perf_counter() - comienzo_render
+        print(
+            f"Renderizado: primer token {metricas.get('tiempo_primer_token', 0.0):.3f}s, "
+            f"render {metricas['tiempo_render']:.3f}s, total {metricas['tiempo_total']:.3f}s, {metricas['fragmentos']} fragmentos",
+            datetime.datetime.now()
+        )
+
+def pautar_stream(stream_original, metricas: dict = None, inicio: float = None):
+    if settings.RITMO_STREAMING == "desactivado" or settings.FPS_STREAMING <= 0:
+        return generador_directo(stream_original, metricas, inicio)
+    return generador_por_fotogramas(stream_original, settings.FPS_STREAMING, metricas, inicio)
@@ -0,0 +1,38 @@
+import re
+import unicodedata
+
+def normalizar_texto(texto: str) -> str:
+    texto = unicodedata.normalize("NFKD", texto or "").lower()
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", texto).strip()
+
+def similitud_jaccard(texto_a: str, texto_b: str) -> float:
+    tokens_a = set(normalizar_texto(texto_a).split())
+    tokens_b = set(normalizar_texto(texto_b).split())
+    if not tokens_a and not tokens_b:
+        return 1.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+STOPWORDS_ES = {
+    "a", "al", "algo", "ante", "antes", "como", "con", "contra", "cual", "cuando", "de", "del", "desde", "donde",
+    "durante", "e", "el", "ella", "ellos", "en", "entre", "era", "es", "esa", "ese", "eso", "esta", "este", "esto",
+    "fue", "ha", "han", "hasta", "hay", "la", "las", "le", "les", "lo", "los", "mas", "me", "mi", "mis", "muy",
+    "ni", "no", "nos", "o", "os", "otra", "otro", "para", "pero", "por", "puede", "que", "quien", "se", "sea",
+    "segun", "ser", "si", "sin", "sobre", "son", "su", "sus", "tambien", "te", "tiene", "tu", "un", "una", "uno",
+    "unos", "unas", "y", "ya", "yo"
+}
+
+def _reducir_plural(token: str) -> str:
+    if len(token) > 3 and token.endswith("s"):
+        token = token[:-1]
+    if len(token) > 4 and token.endswith("e"):
+        token = token[:-1]
+    return token
+
+def tokenizar(texto: str) -> list:
+    texto = re.sub(r"\b(?:[A-Za-zÁÉÍÓÚáéíóúÑñ]\.){2,}", lambda m: m.group(0).replace(".", ""), texto or "")
+    texto = re.sub(r"\d+(?:[./-]\d+)+", lambda m: " ".join([re.sub(r"\D", "", m.group(0))] + re.split(r"\D", m.group(0))), texto)
+    return [_reducir_plural(token) for token in normalizar_texto(texto).split() if token not in STOPWORDS_ES]
+
+def estimar_tokens(texto: str) -> int:
+    return (len(texto or "") + 3) // 4
@@ -0,0 +1,155 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+os.environ.setdefault("DESTINO_TRAZAS", "ninguno")
+os.environ.setdefault("TRAZAS_CONSOLA", "false")
+os.environ.setdefault("CACHE_SEMANTICA", "false")
+os.environ.setdefault("REGISTRAR_DECISIONES", "false")
+os.environ.setdefault("CALENDARIO_ESTRUCTURADO", "false")
+os.environ.setdefault("CACHE_RECUPERACION", "false")
+
+import numpy as np
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from agente.router import CONSTRUCTORES_GRAFO
+from services.rag import asistente_rag
+from services.simulacion import RegistroLlamadas, cargar_fixtures, crear_componentes_simulados
+from services.planificador import planificador
+from services.trazas import trazador
+from utils.asincrono import ejecutar, iterar
+
+RUTA_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "benchmark.json")
+
+def ejecutar_pregunta(grafo, pregunta: dict, registro: RegistroLlamadas, asincrono: bool = False) -> dict:
+    historial = pregunta.get("historial", []) + [{"role": "user", "content": pregunta["pregunta"]}]
+    id_peticion = uuid.uuid4().hex[:12]
+
+    with trazador.peticion(id_peticion):
+        inicio = time.perf_counter()
+        estado_inicial = {
+            "id_peticion": id_peticion,
+            "pregunta": pregunta["pregunta"],
+            "historial": historial,
+            "resumen_historial": "",
+            "mensajes_resumidos": 0,
+            "contexto": "",
+            "stream": None,
+            "referencias": []
+        }
+        estado = ejecutar(grafo.ainvoke(estado_inicial)) if asincrono else grafo.invoke(estado_inicial)
+        tiempo_grafo = time.perf_counter() - inicio
+
+        tiempo_primer_token = None
+        respuesta = []
+        for fragmento in (iterar(estado["stream"]) if asincrono else estado["stream"]):
+            if tiempo_primer_token is None:
+                tiempo_primer_token = time.perf_counter() - inicio
+            respuesta.append(fragmento)
+        tiempo_total = time.perf_counter() - inicio
+
+    llamadas = registro.de_peticion(id_peticion)
+    return {
+        "pregunta": pregunta["pregunta"],
+        "ruta_esperada": pregunta["ruta"],
+        "ruta": estado.get("ruta"),
+        "tiempo_grafo": tiempo_grafo,
+        "tiempo_primer_token": tiempo_primer_token or tiempo_total,
+        "tiempo_total": tiempo_total,
+        "llamadas_llm": len(llamadas),
+        "llamadas_por_tipo": dict(Counter(llamada["tipo"] for llamada in llamadas)),
+        "tokens_prompt": sum(llamada["tokens_prompt"] for llamada in llamadas),
+        "tokens_prompt_por_tipo": {llamada["tipo"]: llamada["tokens_prompt"] for llamada in llamadas},
+        "caracteres_respuesta": len("".join(respuesta))
+    }
+
+def ejecutar_modo(modo: str, fixtures: dict, repeticiones: int, parametros: dict, asincrono: bool = False) -> list:
+    registro = RegistroLlamadas()
+    asistente_rag.reemplazar_componentes(**crear_componentes_simulados(fixtures, registro, **parametros))
+    with contextlib.redirect_stdout(io.StringIO()):
+        grafo = CONSTRUCTORES_GRAFO[modo]()
+
+    resultados = []
+    for repeticion in range(repeticiones):
+        for pregunta in fixtures["preguntas"]:
+            with contextlib.redirect_stdout(io.StringIO()):
+                resultado = ejecutar_pregunta(grafo, pregunta, registro, asincrono)
+            resultados.append({"modo": modo, "repeticion": repeticion, **resultado})
+    return resultados
+
+def _percentiles(valores: list) -> str:
+    p50, p95 = np.percentile(valores, [50, 95])
+    return f"media {np.mean(valores):.3f}s  p50 {p50:.3f}s  p95 {p95:.3f}s"
+
+def imprimir_informe(modo: str, resultados: list):
+    print(f"\n=== Modo {modo} ({len(resultados)} ejecuciones) ===")
+    print(f"{'pregunta':55} {'ruta':15} {'grafo':>8} {'1er tok':>8} {'total':>8} {'llm':>4} {'tok prompt':>10}")
+    for r in resultados:
+        marca = "" if r["ruta"] == r["ruta_esperada"] else " (!)"
+        print(f"{r['pregunta'][:55]:55} {(r['ruta'] or '-') + marca:15} {r['tiempo_grafo']:>7.3f}s {r['tiempo_primer_token']:>7.3f}s "
+              f"{r['tiempo_total']:>7.3f}s {r['llamadas_llm']:>4} {r['tokens_prompt']:>10}")
+
+    print("\nLatencia hasta el grafo:      ", _percentiles([r["tiempo_grafo"] for r in resultados]))
+    print("Latencia hasta primer token:  ", _percentiles([r["tiempo_primer_token"] for r in resultados]))
+    print("Latencia total:               ", _percentiles([r["tiempo_total"] for r in resultados]))
+    aciertos = sum(r["ruta"] == r["ruta_esperada"] for r in resultados)
+    print(f"Rutas correctas: {aciertos}/{len(resultados)}")
+
+    por_ruta = defaultdict(list)
+    for r in resultados:
+        por_ruta[r["ruta"]].append(r["llamadas_llm"])
+    print("Llamadas LLM por ruta:        ", {ruta: round(float(np.mean(valores)), 2) for ruta, valores in sorted(por_ruta.items(), key=lambda par: str(par[0]))})
+
+    tokens_por_tipo = defaultdict(list)
+    for r in resultados:
+        for tipo, tokens in r["tokens_prompt_por_tipo"].items():
+            tokens_por_tipo[tipo].append(tokens)
+    print("Tokens de prompt por llamada: ", {tipo: int(np.mean(valores)) for tipo, valores in sorted(tokens_por_tipo.items())})
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline del grafo del agente con modelos, embeddings y reordenador simulados.")
+    parser.add_argument("--fixtures", default=RUTA_FIXTURES)
+    parser.add_argument("--modos", default="secuencial,unificado,concurrente", help="Modos de enrutamiento separados por comas")
+    parser.add_argument("--repeticiones", type=int, default=1)
+    parser.add_argument("--latencia-ligero", type=float, default=0.15)
+    parser.add_argument("--latencia-pesado", type=float, default=0.4)
+    parser.add_argument("--tokens-segundo-ligero", type=float, default=750.0)
+    parser.add_argument("--tokens-segundo-pesado", type=float, default=275.0)
+    parser.add_argument("--latencia-embeddings", type=float, default=0.05)
+    parser.add_argument("--latencia-reordenador", type=float, default=0.1)
+    parser.add_argument("--con-limites", action="store_true", help="Respeta los límites de RPM/TPM del planificador")
+    parser.add_argument("--asincrono", action="store_true", help="Recorre el grafo con ainvoke y astream")
+    parser.add_argument("--salida", help="Ruta de un JSON donde guardar los resultados por pregunta")
+    args = parser.parse_args()
+
+    fixtures = cargar_fixtures(args.fixtures)
+    if not args.con_limites:
+        planificador.presupuestos.clear()
+    parametros = {
+        "latencia_ligero": args.latencia_ligero,
+        "latencia_pesado": args.latencia_pesado,
+        "tokens_por_segundo_ligero": args.tokens_segundo_ligero,
+        "tokens_por_segundo_pesado": args.tokens_segundo_pesado,
+        "latencia_embeddings": args.latencia_embeddings,
+        "latencia_reordenador": args.latencia_reordenador
+    }
+
+    todos = []
+    for modo in [modo.strip() for modo in args.modos.split(",") if modo.strip()]:
+        resultados = ejecutar_modo(modo, fixtures, args.repeticiones, parametros, args.asincrono)
+        imprimir_informe(modo, resultados)
+        todos.extend(resultados)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"parametros": parametros, "resultados": todos}, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
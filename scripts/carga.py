@@ -0,0 +1,241 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+os.environ.setdefault("DESTINO_TRAZAS", "ninguno")
+os.environ.setdefault("TRAZAS_CONSOLA", "false")
+os.environ.setdefault("CACHE_SEMANTICA", "false")
+os.environ.setdefault("CACHE_RECUPERACION", "false")
+os.environ.setdefault("REGISTRAR_DECISIONES", "false")
+
+import numpy as np
+from services.lotes import agrupadores
+from services.planificador import es_limite_tasa, planificador
+from services.simulacion import cargar_fixtures
+from services.trazas import trazador
+from utils.config import settings
+
+RUTA_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "benchmark.json")
+
+def _pesos_mezcla(preguntas: list, mezcla: str) -> list:
+    pesos = {}
+    for parte in mezcla.split(","):
+        if "=" in parte:
+            ruta, peso = parte.split("=", 1)
+            pesos[ruta.strip()] = float(peso)
+    por_ruta = Counter(pregunta["ruta"] for pregunta in preguntas)
+    return [pesos.get(pregunta["ruta"], 0.0 if pesos else 1.0) / por_ruta[pregunta["ruta"]] for pregunta in preguntas]
+
+def crear_cliente(args, fixtures: dict):
+    if args.url_backend:
+        from services.cliente_backend import ClienteBackend
+        return lambda: (ClienteBackend(args.url_backend, settings.TIEMPO_ESPERA_BACKEND).consultar, None)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from orquestacion import cerrar_consulta, preparar_consulta
+    if args.componentes == "simulados":
+        from services.rag import asistente_rag
+        from services.simulacion import crear_componentes_simulados
+        asistente_rag.reemplazar_componentes(**crear_componentes_simulados(
+            fixtures,
+            latencia_ligero=args.latencia_ligero,
+            latencia_pesado=args.latencia_pesado,
+            latencia_embeddings=args.latencia_embeddings,
+            latencia_reordenador=args.latencia_reordenador,
+            limites_proveedor=settings.LIMITES_LLM if args.cuota_proveedor else None
+        ))
+    return lambda: (preparar_consulta, cerrar_consulta)
+
+
+class Sesiones:
+    def __init__(self, crear, preguntas: list, pesos: list, turnos: int, tiempo_pensar: float, semilla: int):
+        self.crear = crear
+        self.preguntas = preguntas
+        self.pesos = pesos
+        self.turnos = turnos
+        self.tiempo_pensar = tiempo_pensar
+        self.semilla = semilla
+        self.resultados = []
+        self._lock = threading.Lock()
+
+    def _turno(self, consultar, cerrar, pregunta: dict, sesion: dict) -> dict:
+        id_peticion = uuid.uuid4().hex[:12]
+        sesion["mensajes"].append({"role": "user", "content": pregunta["pregunta"]})
+        resultado = {"pregunta": pregunta["pregunta"], "ruta_esperada": pregunta["ruta"], "inicio": time.time(), "error": None, "limite_tasa": False}
+
+        inicio = time.perf_counter()
+        partes = []
+        try:
+            with trazador.peticion(id_peticion):
+                consulta = consultar(id_peticion, pregunta["pregunta"], sesion["mensajes"], sesion["resumen"], sesion["resumidos"])
+                resultado["tiempo_preparacion"] = time.perf_counter() - inicio
+                for fragmento in consulta["stream"]:
+                    if not partes:
+                        resultado["tiempo_primer_token"] = time.perf_counter() - inicio
+                    partes.append(fragmento)
+                if cerrar is not None:
+                    cerrar(consulta, "".join(partes))
+            resultado["ruta"] = consulta["ruta"]
+            sesion["resumen"], sesion["resumidos"] = consulta["resumen_historial"], consulta["mensajes_resumidos"]
+        except Exception as e:
+            resultado["error"] = str(e)[:200]
+            resultado["limite_tasa"] = es_limite_tasa(e) or getattr(e, "limite_tasa", False)
+
+        resultado["tiempo_total"] = time.perf_counter() - inicio
+        sesion["mensajes"].append({"role": "assistant", "content": "".join(partes) or "No he podido responder."})
+        return resultado
+
+    def _usuario(self, indice: int, fin: float):
+        generador = random.Random(self.semilla * 1000 + indice)
+        consultar, cerrar = self.crear()
+        time.sleep(generador.uniform(0, self.tiempo_pensar))
+        while time.time() < fin:
+            sesion = {"mensajes": [], "resumen": "", "resumidos": 0}
+            for _ in range(self.turnos):
+                if time.time() >= fin:
+                    return
+                pregunta = generador.choices(self.preguntas, weights=self.pesos)[0]
+                resultado = self._turno(consultar, cerrar, pregunta, sesion)
+                with self._lock:
+                    self.resultados.append({"usuario": indice, **resultado})
+                if self.tiempo_pensar > 0:
+                    time.sleep(generador.expovariate(1.0 / self.tiempo_pensar))
+
+    def ejecutar(self, concurrencia: int, duracion: float) -> tuple:
+        self.resultados = []
+        fin = time.time() + duracion
+        hilos = [threading.Thread(target=self._usuario, args=(indice, fin), daemon=True) for indice in range(concurrencia)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return list(self.resultados), time.perf_counter() - inicio
+
+
+def _percentiles(valores: list) -> tuple:
+    if not valores:
+        return 0.0, 0.0
+    p50, p95 = np.percentile(valores, [50, 95])
+    return float(p50), float(p95)
+
+def _estadisticas_lotes() -> dict:
+    return {nombre: dict(agrupador.estadisticas) for nombre, agrupador in agrupadores.items()}
+
+def resumir_lotes(antes: dict, despues: dict) -> dict:
+    resumen = {}
+    for nombre, actual in despues.items():
+        previo = antes.get(nombre, {"peticiones": 0, "lotes": 0, "espera_cola": 0.0})
+        peticiones, lotes = actual["peticiones"] - previo["peticiones"], actual["lotes"] - previo["lotes"]
+        if lotes:
+            resumen[nombre] = {
+                "peticiones": peticiones,
+                "lotes": lotes,
+                "tamano_medio": peticiones / lotes,
+                "espera_media": (actual["espera_cola"] - previo["espera_cola"]) / peticiones,
+                "profundidad_maxima": actual["profundidad_maxima"]
+            }
+    return resumen
+
+def resumir_etapa(concurrencia: int, resultados: list, duracion: float, antes: dict, despues: dict) -> dict:
+    correctas = [r for r in resultados if r["error"] is None]
+    llamadas = despues["peticiones"] - antes["peticiones"]
+    return {
+        "concurrencia": concurrencia,
+        "peticiones": len(resultados),
+        "completadas": len(correctas),
+        "duracion": duracion,
+        "rendimiento_minuto": 60.0 * len(correctas) / duracion if duracion else 0.0,
+        "primer_token": _percentiles([r.get("tiempo_primer_token", r["tiempo_total"]) for r in correctas]),
+        "total": _percentiles([r["tiempo_total"] for r in correctas]),
+        "llamadas_llm": llamadas,
+        "espera_cola_media": (despues["espera_cola"] - antes["espera_cola"]) / llamadas if llamadas else 0.0,
+        "limites_tasa_absorbidos": despues["limites_tasa"] - antes["limites_tasa"],
+        "tasa_429": sum(r["limite_tasa"] for r in resultados) / len(resultados) if resultados else 0.0,
+        "errores": sum(r["error"] is not None and not r["limite_tasa"] for r in resultados),
+        "rutas": dict(Counter(r.get("ruta") for r in correctas))
+    }
+
+def imprimir_informe(etapas: list, en_proceso: bool):
+    print(f"\n{'sesiones':>8} {'pet.':>5} {'ok':>5} {'ok/min':>7} {'1er tok p50':>11} {'p95':>7} {'total p50':>10} {'p95':>7} "
+          f"{'cola/llm':>9} {'429 abs.':>8} {'429 %':>6} {'err':>4}")
+    for e in etapas:
+        cola = f"{e['espera_cola_media']:>8.2f}s" if en_proceso else f"{'-':>9}"
+        absorbidos = f"{e['limites_tasa_absorbidos']:>8}" if en_proceso else f"{'-':>8}"
+        print(f"{e['concurrencia']:>8} {e['peticiones']:>5} {e['completadas']:>5} {e['rendimiento_minuto']:>7.1f} "
+              f"{e['primer_token'][0]:>10.2f}s {e['primer_token'][1]:>6.2f}s {e['total'][0]:>9.2f}s {e['total'][1]:>6.2f}s "
+              f"{cola} {absorbidos} {100 * e['tasa_429']:>5.1f}% {e['errores']:>4}")
+
+    if any(e.get("lotes") for e in etapas):
+        print(f"\n{'sesiones':>8} {'microlote':>12} {'llamadas':>8} {'lotes':>6} {'tamaño medio':>12} {'espera':>8} {'cola máx.':>9}")
+        for e in etapas:
+            for nombre, lote in e.get("lotes", {}).items():
+                print(f"{e['concurrencia']:>8} {nombre:>12} {lote['peticiones']:>8} {lote['lotes']:>6} {lote['tamano_medio']:>12.2f} "
+                      f"{1000 * lote['espera_media']:>6.1f}ms {lote['profundidad_maxima']:>9}")
+
+    for anterior, actual in zip(etapas, etapas[1:]):
+        crecimiento = actual["rendimiento_minuto"] / anterior["rendimiento_minuto"] if anterior["rendimiento_minuto"] else 0.0
+        if crecimiento < 1.1 or actual["tasa_429"] > 0:
+            print(f"\nSaturación a partir de {actual['concurrencia']} sesiones: el rendimiento crece x{crecimiento:.2f}, "
+                  f"la espera en cola por llamada pasa de {anterior['espera_cola_media']:.2f}s a {actual['espera_cola_media']:.2f}s "
+                  f"y el {100 * actual['tasa_429']:.0f}% de las peticiones acaba en 429")
+            return
+    print("\nNo se observa saturación en el rango de concurrencia probado")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de carga: sesiones de chat concurrentes contra el grafo del agente o un backend SSE.")
+    parser.add_argument("--fixtures", default=RUTA_FIXTURES)
+    parser.add_argument("--componentes", choices=["simulados", "reales"], default="simulados")
+    parser.add_argument("--url-backend", help="Lanza la carga contra un backend SSE (app/servidor.py) en lugar de en proceso")
+    parser.add_argument("--concurrencias", default="1,2,4,8,16", help="Sesiones simultáneas de cada etapa, separadas por comas")
+    parser.add_argument("--duracion", type=float, default=30.0, help="Segundos por etapa")
+    parser.add_argument("--turnos", type=int, default=3, help="Preguntas por sesión antes de abrir una nueva conversación")
+    parser.add_argument("--tiempo-pensar", type=float, default=2.0, help="Media en segundos de la pausa entre preguntas de una sesión")
+    parser.add_argument("--mezcla", default="", help="Pesos por ruta, p. ej. procedimental=3,calendario=2,normativo=1; por defecto uniforme")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--latencia-ligero", type=float, default=0.15)
+    parser.add_argument("--latencia-pesado", type=float, default=0.4)
+    parser.add_argument("--latencia-embeddings", type=float, default=0.05)
+    parser.add_argument("--latencia-reordenador", type=float, default=0.1)
+    parser.add_argument("--cuota-proveedor", action="store_true", help="Los modelos simulados devuelven 429 al superar LIMITES_LLM")
+    parser.add_argument("--sin-limites", action="store_true", help="El planificador no aplica los límites de RPM/TPM")
+    parser.add_argument("--salida", help="Ruta de un JSON donde guardar las etapas y las peticiones")
+    args = parser.parse_args()
+
+    fixtures = cargar_fixtures(args.fixtures)
+    if args.sin_limites:
+        planificador.presupuestos.clear()
+    preguntas = fixtures["preguntas"]
+    sesiones = Sesiones(crear_cliente(args, fixtures), preguntas, _pesos_mezcla(preguntas, args.mezcla), args.turnos, args.tiempo_pensar, args.semilla)
+
+    etapas, peticiones = [], []
+    for concurrencia in [int(valor) for valor in args.concurrencias.split(",") if valor.strip()]:
+        antes = dict(planificador.estadisticas)
+        for agrupador in agrupadores.values():
+            agrupador.estadisticas["profundidad_maxima"] = 0
+        antes_lotes = _estadisticas_lotes()
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultados, duracion = sesiones.ejecutar(concurrencia, args.duracion)
+        etapa = resumir_etapa(concurrencia, resultados, duracion, antes, dict(planificador.estadisticas))
+        etapa["lotes"] = resumir_lotes(antes_lotes, _estadisticas_lotes())
+        etapas.append(etapa)
+        peticiones.extend({"concurrencia": concurrencia, **resultado} for resultado in resultados)
+        print(f"{concurrencia} sesiones: {etapa['completadas']}/{etapa['peticiones']} peticiones en {duracion:.1f}s")
+
+    imprimir_informe(etapas, not args.url_backend)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"parametros": vars(args), "etapas": etapas, "peticiones": peticiones}, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
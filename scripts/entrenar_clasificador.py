@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import numpy as np
+from services.clasificador_local import entrenar_softmax, predecir_softmax, guardar_modelos, leer_decisiones
+from utils.config import settings
+from utils.texto import normalizar_texto
+
+CATEGORIAS = ["procedimental", "calendario", "normativo", "baremo"]
+
+def ejemplos_de_fixtures(ruta: str) -> list:
+    with open(ruta, encoding="utf-8") as f:
+        preguntas = json.load(f)["preguntas"]
+
+    ejemplos = []
+    for pregunta in preguntas:
+        ejemplos.append({"tarea": "intencion", "pregunta": pregunta["pregunta"], "etiqueta": "rechazo_amable" if pregunta["ruta"] == "rechazo_amable" else "recuperador"})
+        if pregunta["ruta"] in CATEGORIAS:
+            ejemplos.append({"tarea": "categoria", "pregunta": pregunta.get("reformulada", pregunta["pregunta"]), "etiqueta": pregunta["ruta"]})
+    return ejemplos
+
+def deduplicar(ejemplos: list) -> dict:
+    por_tarea = {}
+    for ejemplo in ejemplos:
+        por_tarea.setdefault(ejemplo["tarea"], {})[normalizar_texto(ejemplo["pregunta"])] = ejemplo
+    return {tarea: list(vistos.values()) for tarea, vistos in por_tarea.items()}
+
+def evaluar(modelo: dict, vectores: np.ndarray, etiquetas: list, umbral: float) -> dict:
+    probabilidades = predecir_softmax(modelo, vectores)
+    predichas = modelo["clases"][probabilidades.argmax(axis=1)]
+    confianzas = probabilidades.max(axis=1)
+    aciertos = predichas == np.array(etiquetas)
+    cubiertas = confianzas >= umbral
+    return {
+        "exactitud": float(aciertos.mean()),
+        "cobertura_umbral": float(cubiertas.mean()),
+        "exactitud_sobre_umbral": float(aciertos[cubiertas].mean()) if cubiertas.any() else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrena el clasificador local de enrutamiento a partir de las decisiones registradas del LLM.")
+    parser.add_argument("--decisiones", default=settings.RUTA_DECISIONES_ENRUTAMIENTO)
+    parser.add_argument("--fixtures", help="JSON de preguntas etiquetadas con el formato de scripts/fixtures/benchmark.json")
+    parser.add_argument("--salida", default=settings.RUTA_CLASIFICADOR_LOCAL)
+    parser.add_argument("--minimo", type=int, default=20, help="Ejemplos mínimos por tarea para entrenarla")
+    parser.add_argument("--validacion", type=float, default=0.2)
+    parser.add_argument("--umbral", type=float, default=settings.UMBRAL_CLASIFICADOR_LOCAL)
+    args = parser.parse_args()
+
+    ejemplos = leer_decisiones(args.decisiones)
+    if args.fixtures:
+        ejemplos += ejemplos_de_fixtures(args.fixtures)
+
+    from services.recuperacion import crear_embeddings
+    embeddings = crear_embeddings()
+    modelo_embeddings = settings.MODEL_EMBEDDINGS_LOCAL if settings.BACKEND_RECUPERACION == "local" else settings.MODEL_EMBEDDINGS
+
+    generador = np.random.default_rng(0)
+    modelos = {}
+    for tarea, ejemplos_tarea in sorted(deduplicar(ejemplos).items()):
+        etiquetas = [ejemplo["etiqueta"] for ejemplo in ejemplos_tarea]
+        if len(ejemplos_tarea) < args.minimo or len(set(etiquetas)) < 2:
+            print(f"{tarea}: {len(ejemplos_tarea)} ejemplos y {len(set(etiquetas))} clases, no se entrena")
+            continue
+
+        vectores = np.asarray(embeddings.embed_documents([ejemplo["pregunta"] for ejemplo in ejemplos_tarea]), dtype=np.float64)
+        orden = generador.permutation(len(vectores))
+        corte = int(len(orden) * (1 - args.validacion))
+        entrenamiento, validacion = orden[:corte], orden[corte:]
+
+        if len(validacion):
+            modelo = entrenar_softmax(vectores[entrenamiento], [etiquetas[i] for i in entrenamiento])
+            metricas = evaluar(modelo, vectores[validacion], [etiquetas[i] for i in validacion], args.umbral)
+            print(f"{tarea}: {len(ejemplos_tarea)} ejemplos, validación {metricas}")
+
+        modelos[tarea] = entrenar_softmax(vectores, etiquetas)
+        print(f"{tarea}: clases {list(modelos[tarea]['clases'])}")
+
+    if not modelos:
+        print("No hay datos suficientes para entrenar ninguna tarea")
+        return
+
+    guardar_modelos(args.salida, modelos, modelo_embeddings)
+    print(f"Clasificador guardado en {args.salida}")
+
+if __name__ == "__main__":
+    main()
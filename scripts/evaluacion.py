@@ -0,0 +1,280 @@
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+os.environ.setdefault("DESTINO_TRAZAS", "ninguno")
+os.environ.setdefault("TRAZAS_CONSOLA", "false")
+os.environ.setdefault("CACHE_SEMANTICA", "false")
+os.environ.setdefault("REGISTRAR_DECISIONES", "false")
+os.environ.setdefault("CALENDARIO_ESTRUCTURADO", "false")
+os.environ.setdefault("CACHE_RECUPERACION", "false")
+
+import numpy as np
+from langchain_core.vectorstores import InMemoryVectorStore
+from langchain_classic.retrievers.contextual_compression import ContextualCompressionRetriever
+from services.clasificador_local import ClasificadorLocal
+from services.contexto import ensamblar_contexto
+from services.indice_lexico import IndiceBM25
+from services.ingesta import _procesar_paginas, _tareas_archivo
+from services.recuperacion import RecuperadorDenso, RecuperadorHibrido
+from services.rag import AsistenteRAG, asistente_rag
+from services.simulacion import EmbeddingsSimulados, ReordenadorSimulado, cargar_fixtures
+from utils.config import format_docs, settings
+from utils.texto import estimar_tokens
+
+RUTA_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "evaluacion.json")
+CORTES_RECALL = (1, 3, 5)
+CATEGORIAS = ["procedimental", "calendario", "normativo", "baremo"]
+
+def _lista(valor: str, tipo=int) -> list:
+    return [tipo(parte.strip()) for parte in valor.split(",") if parte.strip()]
+
+def _booleanos(valor: str) -> list:
+    return [parte.strip().lower() in ("1", "true", "si", "yes") for parte in valor.split(",") if parte.strip()]
+
+def fragmentar_corpus(ruta_pdfs: str, tamano: int, solapamiento: int) -> list:
+    tareas = []
+    for nombre in sorted(os.listdir(ruta_pdfs)):
+        if nombre.lower().endswith(".pdf"):
+            tareas += [(*tarea[:4], tamano, solapamiento, 0) for tarea in _tareas_archivo(os.path.join(ruta_pdfs, nombre), nombre)]
+
+    with ProcessPoolExecutor(max_workers=settings.PROCESOS_INGESTA) as pool:
+        return [fragmento for fragmentos in pool.map(_procesar_paginas, tareas) for fragmento in fragmentos]
+
+class Indices:
+    def __init__(self, fragmentos: list, embeddings):
+        ids = [fragmento[0] for fragmento in fragmentos]
+        textos = [fragmento[1] for fragmento in fragmentos]
+        metadatos = [fragmento[2] for fragmento in fragmentos]
+
+        inicio = time.perf_counter()
+        self.vectorstore = InMemoryVectorStore(embeddings)
+        self.vectorstore.add_texts(textos, metadatas=metadatos, ids=ids)
+        self.indice_lexico = IndiceBM25()
+        self.indice_lexico.agregar(ids, textos, metadatos)
+        self.tiempo_indexado = time.perf_counter() - inicio
+        self.fragmentos = len(fragmentos)
+
+    def recuperador(self, k_denso: int, hibrida: bool, reordenador):
+        if hibrida:
+            base = RecuperadorHibrido(vectorstore=self.vectorstore, indice_lexico=self.indice_lexico, k_denso=k_denso, k_lexico=k_denso, k_fusion=k_denso)
+        else:
+            base = RecuperadorDenso(vectorstore=self.vectorstore, k=k_denso)
+        return ContextualCompressionRetriever(base_compressor=reordenador, base_retriever=base)
+
+def crear_reordenador_evaluacion(componentes: str, top_n: int, latencia: float):
+    if componentes == "simulados":
+        return ReordenadorSimulado(top_n=top_n, latencia=latencia)
+
+    from services.reordenador import crear_reordenador
+    settings.TOP_N_RERANK = top_n
+    return crear_reordenador()
+
+def _es_acierto(doc, fuentes: list) -> bool:
+    for fuente in fuentes:
+        if doc.metadata.get("source") == fuente["source"] and (not fuente["pages"] or doc.metadata.get("page") in fuente["pages"]):
+            return True
+    return False
+
+def evaluar_recuperacion(recuperador, preguntas: list, k_filtrado: int = None) -> dict:
+    settings.FILTRO_FAMILIAS = k_filtrado is not None
+    settings.K_DENSO_FILTRADO = k_filtrado or settings.K_DENSO_FILTRADO
+    asistente = AsistenteRAG(retriever=recuperador)
+
+    rangos, latencias, tokens, respaldos = [], [], [], 0
+    for pregunta in preguntas:
+        registro = {}
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            docs = asistente._recuperar(pregunta["pregunta"], registro)
+        latencias.append(time.perf_counter() - inicio)
+        respaldos += bool(registro.get("respaldo_filtro"))
+
+        rango = next((posicion + 1 for posicion, doc in enumerate(docs) if _es_acierto(doc, pregunta["fuentes"])), None)
+        rangos.append(rango)
+        if settings.COMPRIMIR_CONTEXTO:
+            docs = ensamblar_contexto(docs, settings.UMBRAL_DUPLICADOS)
+        tokens.append(estimar_tokens(format_docs(docs)))
+
+    p50, p95 = np.percentile(latencias, [50, 95])
+    return {
+        **{f"recall@{corte}": float(np.mean([rango is not None and rango <= corte for rango in rangos])) for corte in CORTES_RECALL},
+        "mrr": float(np.mean([1.0 / rango if rango else 0.0 for rango in rangos])),
+        "latencia_p50": float(p50),
+        "latencia_p95": float(p95),
+        "tokens_contexto": float(np.mean(tokens)),
+        "respaldos_filtro": respaldos,
+        "fallos": [pregunta["pregunta"] for pregunta, rango in zip(preguntas, rangos) if rango is None]
+    }
+
+def _metricas_enrutamiento(esperadas: list, obtenidas: list, latencias: list) -> dict:
+    cubiertas = [(esperada, obtenida) for esperada, obtenida in zip(esperadas, obtenidas) if obtenida is not None]
+    return {
+        "preguntas": len(esperadas),
+        "cobertura": len(cubiertas) / len(esperadas) if esperadas else 0.0,
+        "exactitud": float(np.mean([esperada == obtenida for esperada, obtenida in cubiertas])) if cubiertas else None,
+        "latencia_p50": float(np.percentile(latencias, 50)) if latencias else 0.0
+    }
+
+def _esperadas(preguntas: list) -> tuple:
+    intencion = ["rechazo_amable" if pregunta["ruta"] == "rechazo_amable" else "recuperador" for pregunta in preguntas]
+    categorias = [pregunta for pregunta in preguntas if pregunta["ruta"] in CATEGORIAS]
+    return intencion, categorias
+
+def evaluar_enrutamiento_local(preguntas: list, embeddings, modelo_embeddings: str) -> dict:
+    clasificador = ClasificadorLocal(settings.RUTA_CLASIFICADOR_LOCAL, settings.RUTA_DECISIONES_ENRUTAMIENTO, modelo_embeddings, registrar=False)
+    intencion, categorias = _esperadas(preguntas)
+
+    def decidir(tarea: str, pregunta: str):
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            etiqueta, confianza, _ = clasificador.clasificar(tarea, pregunta)
+            if etiqueta is None and clasificador.tiene_modelo(tarea):
+                etiqueta, confianza, _ = clasificador.clasificar(tarea, pregunta, embeddings.embed_query(pregunta))
+        return (etiqueta if confianza >= settings.UMBRAL_CLASIFICADOR_LOCAL else None), time.perf_counter() - inicio
+
+    resultados = {}
+    for tarea, lote, esperadas in (
+        ("intencion", preguntas, intencion),
+        ("categoria", categorias, [pregunta["ruta"] for pregunta in categorias])
+    ):
+        decisiones = [decidir(tarea, pregunta["pregunta"]) for pregunta in lote]
+        resultados[tarea] = _metricas_enrutamiento(esperadas, [d[0] for d in decisiones], [d[1] for d in decisiones])
+    return resultados
+
+def evaluar_enrutamiento_llm(preguntas: list, modelo_ligero: str, con_clasificador_local: bool) -> dict:
+    conservados = {nombre: getattr(asistente_rag, nombre) for nombre in ("embeddings", "vectorstore", "retriever")}
+    settings.MODELO_LLM_LIGERO = modelo_ligero
+    settings.CLASIFICADOR_LOCAL = con_clasificador_local
+    asistente_rag.reemplazar_componentes(**conservados)
+    intencion, categorias = _esperadas(preguntas)
+
+    def medir(funcion, *argumentos):
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            decision = funcion(*argumentos)
+        return decision, time.perf_counter() - inicio
+
+    deteccion = [medir(asistente_rag.decide_ruta_inicial, pregunta["pregunta"], "") for pregunta in preguntas]
+    clasificacion = []
+    for pregunta in categorias:
+        contexto, _ = asistente_rag.buscar_contexto(pregunta["pregunta"])
+        clasificacion.append(medir(asistente_rag.clasificar_categoria, pregunta["pregunta"], "", contexto))
+
+    return {
+        "intencion": _metricas_enrutamiento(intencion, [d[0] for d in deteccion], [d[1] for d in deteccion]),
+        "categoria": _metricas_enrutamiento([pregunta["ruta"] for pregunta in categorias], [d[0] for d in clasificacion], [d[1] for d in clasificacion])
+    }
+
+def seleccionar(resultados: list, recall_minimo: float, mrr_minimo: float, corte: int):
+    validos = [r for r in resultados if r[f"recall@{corte}"] >= recall_minimo and r["mrr"] >= mrr_minimo]
+    return min(validos, key=lambda r: (r["latencia_p50"], r["tokens_contexto"])) if validos else None
+
+def _describir(r: dict) -> str:
+    filtro = f"  familias k {r['k_filtrado']}" if r["k_filtrado"] else ""
+    return f"fragmento {r['tamano_fragmento']}/{r['solapamiento']}  k {r['k_denso']}  top_n {r['top_n']}  {'híbrida' if r['hibrida'] else 'densa'}{filtro}"
+
+def imprimir_recuperacion(resultados: list):
+    print(f"\n{'configuración':66} {'r@1':>5} {'r@3':>5} {'r@5':>5} {'mrr':>5} {'p50':>8} {'p95':>8} {'tokens':>7}")
+    for r in resultados:
+        print(f"{_describir(r):66} {r['recall@1']:>5.2f} {r['recall@3']:>5.2f} {r['recall@5']:>5.2f} {r['mrr']:>5.2f} "
+              f"{r['latencia_p50']:>7.3f}s {r['latencia_p95']:>7.3f}s {r['tokens_contexto']:>7.0f}")
+
+def imprimir_enrutamiento(nombre: str, metricas: dict):
+    for tarea, valores in metricas.items():
+        exactitud = "-" if valores["exactitud"] is None else f"{valores['exactitud']:.2f}"
+        print(f"{nombre:28} {tarea:10} cobertura {valores['cobertura']:.2f}  exactitud {exactitud}  p50 {valores['latencia_p50']:.3f}s  ({valores['preguntas']} preguntas)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Evalúa recall@k, MRR, enrutamiento y latencia de cada configuración sobre un conjunto de preguntas de referencia.")
+    parser.add_argument("--fixtures", default=RUTA_FIXTURES)
+    parser.add_argument("--ruta-pdfs", default=settings.RUTA_PDFS)
+    parser.add_argument("--componentes", choices=["simulados", "reales"], default="simulados",
+                        help="simulados: embeddings y reordenador sin red; reales: los configurados en el entorno y las cadenas LLM")
+    parser.add_argument("--tamanos-fragmento", default=str(settings.TAMANO_FRAGMENTO))
+    parser.add_argument("--solapamientos", default=str(settings.SOLAPAMIENTO_FRAGMENTO))
+    parser.add_argument("--k-densos", default=str(settings.K_DENSO))
+    parser.add_argument("--top-ns", default=str(settings.TOP_N_RERANK))
+    parser.add_argument("--hibrida", default=str(settings.RECUPERACION_HIBRIDA).lower(), help="Valores separados por comas, p. ej. false,true")
+    parser.add_argument("--filtro-familias", default=str(settings.FILTRO_FAMILIAS).lower(), help="Valores separados por comas, p. ej. false,true")
+    parser.add_argument("--k-filtrados", default=str(settings.K_DENSO_FILTRADO), help="Candidatos densos cuando la búsqueda se restringe por familias")
+    parser.add_argument("--latencia-embeddings", type=float, default=0.0, help="Solo con componentes simulados")
+    parser.add_argument("--latencia-reordenador", type=float, default=0.0, help="Solo con componentes simulados")
+    parser.add_argument("--recall-minimo", type=float, default=0.8)
+    parser.add_argument("--mrr-minimo", type=float, default=0.0)
+    parser.add_argument("--corte-recall", type=int, choices=CORTES_RECALL, default=5, help="recall@k al que se aplica --recall-minimo")
+    parser.add_argument("--sin-enrutamiento", action="store_true")
+    parser.add_argument("--modelos-ligeros", default=settings.MODELO_LLM_LIGERO, help="Modelos ligeros a comparar en detección y clasificación (solo con componentes reales)")
+    parser.add_argument("--con-clasificador-local", action="store_true", help="Con componentes reales, deja que el clasificador local decida antes que el LLM")
+    parser.add_argument("--salida", help="Ruta de un JSON donde guardar los resultados")
+    args = parser.parse_args()
+
+    preguntas = cargar_fixtures(args.fixtures)["preguntas"]
+    con_fuentes = [pregunta for pregunta in preguntas if pregunta["fuentes"]]
+
+    if args.componentes == "simulados":
+        embeddings, modelo_embeddings = EmbeddingsSimulados(latencia=args.latencia_embeddings), "simulados"
+    else:
+        from services.recuperacion import crear_embeddings
+        embeddings = crear_embeddings()
+        modelo_embeddings = settings.MODEL_EMBEDDINGS_LOCAL if settings.BACKEND_RECUPERACION == "local" else settings.MODEL_EMBEDDINGS
+
+    resultados = []
+    for tamano, solapamiento in itertools.product(_lista(args.tamanos_fragmento), _lista(args.solapamientos)):
+        if solapamiento >= tamano:
+            continue
+        indices = Indices(fragmentar_corpus(args.ruta_pdfs, tamano, solapamiento), embeddings)
+        print(f"Fragmentos {tamano}/{solapamiento}: {indices.fragmentos} indexados en {indices.tiempo_indexado:.1f}s")
+
+        k_filtrados = [k for filtrar in _booleanos(args.filtro_familias) for k in (_lista(args.k_filtrados) if filtrar else [None])]
+        for k_denso, top_n, hibrida, k_filtrado in itertools.product(_lista(args.k_densos), _lista(args.top_ns), _booleanos(args.hibrida), k_filtrados):
+            reordenador = crear_reordenador_evaluacion(args.componentes, top_n, args.latencia_reordenador)
+            metricas = evaluar_recuperacion(indices.recuperador(k_denso, hibrida, reordenador), con_fuentes, k_filtrado)
+            resultados.append({
+                "tamano_fragmento": tamano,
+                "solapamiento": solapamiento,
+                "k_denso": k_denso,
+                "top_n": top_n,
+                "hibrida": hibrida,
+                "k_filtrado": k_filtrado,
+                "fragmentos": indices.fragmentos,
+                **metricas
+            })
+
+    print(f"\n=== Recuperación ({len(con_fuentes)} preguntas con fuentes, componentes {args.componentes}) ===")
+    imprimir_recuperacion(resultados)
+
+    enrutamiento = {}
+    if not args.sin_enrutamiento:
+        print(f"\n=== Enrutamiento ({len(preguntas)} preguntas) ===")
+        if args.componentes == "simulados":
+            enrutamiento["clasificador_local"] = evaluar_enrutamiento_local(preguntas, embeddings, modelo_embeddings)
+            imprimir_enrutamiento("clasificador_local", enrutamiento["clasificador_local"])
+        else:
+            for modelo in _lista(args.modelos_ligeros, str):
+                enrutamiento[modelo] = evaluar_enrutamiento_llm(preguntas, modelo, args.con_clasificador_local)
+                imprimir_enrutamiento(modelo, enrutamiento[modelo])
+
+    elegida = seleccionar(resultados, args.recall_minimo, args.mrr_minimo, args.corte_recall)
+    if elegida is None:
+        print(f"\nNinguna configuración alcanza recall@{args.corte_recall} >= {args.recall_minimo} y MRR >= {args.mrr_minimo}")
+    else:
+        print(f"\nConfiguración más rápida que cumple el mínimo de calidad: {_describir(elegida)} "
+              f"(recall@{args.corte_recall} {elegida[f'recall@{args.corte_recall}']:.2f}, MRR {elegida['mrr']:.2f}, p50 {elegida['latencia_p50']:.3f}s)")
+        for fallo in elegida["fallos"]:
+            print(f"  sin fuente esperada: {fallo}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"componentes": args.componentes, "recuperacion": resultados, "enrutamiento": enrutamiento, "elegida": elegida},
+                      f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.calendario import extraer_eventos_pdf, guardar_calendario
+from services.ingesta import _hash_archivo
+from utils.config import settings
+
+def main():
+    parser = argparse.ArgumentParser(description="Extrae los eventos con fecha del calendario académico y las normas de matrícula a un almacén estructurado.")
+    parser.add_argument("--ruta-pdfs", default=settings.RUTA_PDFS)
+    parser.add_argument("--archivos", nargs="*", default=settings.ARCHIVOS_CALENDARIO, help="PDFs de los que extraer eventos")
+    parser.add_argument("--curso", default=settings.CURSO_ACADEMICO, help="Curso académico (p. ej. 2025-2026); se descartan fechas de otros años")
+    parser.add_argument("--salida", default=settings.RUTA_CALENDARIO)
+    parser.add_argument("--mostrar", action="store_true", help="Lista los eventos extraídos para revisarlos")
+    args = parser.parse_args()
+
+    anios = {int(anio) for anio in args.curso.replace("/", "-").split("-") if anio.strip().isdigit()}
+    eventos, archivos = [], {}
+    for nombre in args.archivos:
+        ruta = os.path.join(args.ruta_pdfs, nombre)
+        if not os.path.exists(ruta):
+            print(f"No existe {ruta}, se omite")
+            continue
+
+        extraidos = extraer_eventos_pdf(ruta, anios)
+        archivos[nombre] = _hash_archivo(ruta)
+        eventos.extend(extraidos)
+        print(f"{nombre}: {len(extraidos)} eventos")
+
+    if not archivos:
+        print("No se ha procesado ningún archivo")
+        return
+
+    guardar_calendario(args.salida, eventos, archivos)
+    print(f"Eventos por programa: {dict(Counter(evento['programa'] for evento in eventos))}")
+    print(f"Calendario guardado en {args.salida}")
+
+    if args.mostrar:
+        for evento in eventos:
+            print(f"[{evento['source']} p.{evento['page']}] {evento['programa']:<9} {evento['fecha']:<45} {evento['seccion']} | {evento['descripcion']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+os.environ.setdefault("DESTINO_TRAZAS", "ninguno")
+os.environ.setdefault("CACHE_SEMANTICA", "false")
+os.environ.setdefault("REGISTRAR_DECISIONES", "false")
+os.environ.setdefault("FAQ_PRECALCULADA", "false")
+
+from services.clasificador_local import leer_decisiones
+from services.faq import construir_faq, minar_preguntas
+from utils.config import settings
+
+RUTA_PREGUNTAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "faq.json")
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera las respuestas precalculadas de las preguntas frecuentes para la versión actual del corpus.")
+    parser.add_argument("--preguntas", default=RUTA_PREGUNTAS, help="JSON con la lista curada de preguntas")
+    parser.add_argument("--minar", action="store_true", help="Añade las preguntas más repetidas del registro de decisiones de enrutamiento")
+    parser.add_argument("--decisiones", default=settings.RUTA_DECISIONES_ENRUTAMIENTO)
+    parser.add_argument("--minimo", type=int, default=3, help="Apariciones mínimas de una pregunta minada")
+    parser.add_argument("--maximo", type=int, default=50, help="Preguntas minadas como máximo")
+    parser.add_argument("--salida", default=settings.RUTA_FAQ)
+    args = parser.parse_args()
+
+    with open(args.preguntas, encoding="utf-8") as f:
+        preguntas = json.load(f)["preguntas"]
+    if args.minar:
+        preguntas += minar_preguntas(leer_decisiones(args.decisiones), args.minimo, args.maximo)
+
+    settings.ESPERA_MAXIMA_MODELO_PESADO = float("inf")
+    from services.rag import asistente_rag
+    modelo_embeddings = settings.MODEL_EMBEDDINGS_LOCAL if settings.BACKEND_RECUPERACION == "local" else settings.MODEL_EMBEDDINGS
+    entradas = construir_faq(asistente_rag, preguntas, args.salida, modelo_embeddings)
+    print(f"{len(entradas)} preguntas frecuentes guardadas en {args.salida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.faq import construir_faq
+from services.ingesta import ingestar
+from services.recuperacion import crear_almacen_padres, crear_embeddings, crear_vectorstore, crear_indice_lexico
+from utils.config import settings
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexa de forma incremental los PDFs de Documentos_US.")
+    parser.add_argument("--ruta-pdfs", default=None, help="Carpeta con los PDFs (por defecto RUTA_PDFS)")
+    parser.add_argument("--forzar", action="store_true", help="Reprocesa todos los documentos aunque no hayan cambiado")
+    parser.add_argument("--procesos", type=int, default=None, help="Número de procesos para extraer el texto")
+    parser.add_argument("--generar-faq", metavar="PREGUNTAS", help="Regenera las preguntas frecuentes con la lista curada indicada si el corpus ha cambiado")
+    args = parser.parse_args()
+
+    vectorstore = crear_vectorstore(crear_embeddings())
+    resumen = ingestar(
+        vectorstore,
+        ruta_pdfs=args.ruta_pdfs,
+        forzar=args.forzar,
+        procesos=args.procesos,
+        indice_lexico=crear_indice_lexico(),
+        almacen_padres=crear_almacen_padres() if settings.INDICE_PADRES else None
+    )
+
+    print(f"Versión del corpus: {resumen['version_corpus']}")
+    print(f"Archivos procesados: {len(resumen['archivos_procesados'])}")
+    for nombre in resumen["archivos_procesados"]:
+        print(f"  - {nombre}")
+    print(f"Fragmentos subidos: {resumen['fragmentos_subidos']}")
+    print(f"Fragmentos eliminados: {resumen['fragmentos_eliminados']}")
+
+    if args.generar_faq:
+        generar_faq(args.generar_faq, resumen["version_corpus"])
+
+def generar_faq(ruta_preguntas: str, version_corpus: str):
+    if os.path.exists(settings.RUTA_FAQ):
+        with open(settings.RUTA_FAQ, encoding="utf-8") as f:
+            if json.load(f).get("version_corpus") == version_corpus:
+                print("Preguntas frecuentes al día")
+                return
+
+    with open(ruta_preguntas, encoding="utf-8") as f:
+        preguntas = json.load(f)["preguntas"]
+    settings.ESPERA_MAXIMA_MODELO_PESADO = float("inf")
+    from services.rag import asistente_rag
+    modelo_embeddings = settings.MODEL_EMBEDDINGS_LOCAL if settings.BACKEND_RECUPERACION == "local" else settings.MODEL_EMBEDDINGS
+    entradas = construir_faq(asistente_rag, preguntas, settings.RUTA_FAQ, modelo_embeddings)
+    print(f"Preguntas frecuentes generadas: {len(entradas)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import argparse
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.trazas import Trazador
+from utils.config import settings
+
+def main():
+    parser = argparse.ArgumentParser(description="Resume las trazas del agente con percentiles por etapa.")
+    parser.add_argument("--destino", default=settings.DESTINO_TRAZAS, choices=["jsonl", "sqlite"])
+    parser.add_argument("--ruta", default=settings.RUTA_TRAZAS)
+    args = parser.parse_args()
+
+    trazador = Trazador(args.destino, args.ruta)
+    registros = trazador.leer()
+    if not registros:
+        print("No hay trazas registradas")
+        return
+
+    print(f"{'etapa':45} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for etapa, datos in trazador.resumen_percentiles().items():
+        print(f"{etapa:45} {datos['n']:>6} {datos['p50']:>8.3f}s {datos['p95']:>8.3f}s {datos['p99']:>8.3f}s")
+
+    rutas = Counter(r["ruta"] for r in registros if r["tipo"] == "nodo" and r.get("ruta"))
+    print("\nRutas tomadas:", dict(rutas))
+    print("Peticiones:", len({r["id_peticion"] for r in registros if r.get("id_peticion")}))
+    print("Tokens prompt/completion:", sum(r.get("tokens_prompt") or 0 for r in registros), "/", sum(r.get("tokens_completion") or 0 for r in registros))
+
+if __name__ == "__main__":
+    main()
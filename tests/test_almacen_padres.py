@@ -0,0 +1,59 @@
+import pytest
+from langchain_core.documents import Document
+from services.almacen_padres import AlmacenPadres, expandir_padres
+from utils.texto import estimar_tokens
+
+PADRE = "Artículo 7. Anulación de matrícula. " + "El estudiante podrá anular su matrícula antes del 31 de octubre. " * 4
+OTRO = "Artículo 9. Ampliación de matrícula. Se podrá ampliar la matrícula en febrero."
+
+def _hijo(texto: str, id_padre: str = None, puntuacion: float = 0.5) -> Document:
+    metadatos = {"source": "normas.pdf", "page": 2, "relevance_score": puntuacion, "puntuacion_densa": puntuacion}
+    if id_padre:
+        metadatos["id_padre"] = id_padre
+    return Document(page_content=texto, metadata=metadatos)
+
+@pytest.fixture
+def almacen(tmp_path):
+    almacen = AlmacenPadres(str(tmp_path))
+    almacen.agregar("p1", PADRE, {"source": "normas.pdf", "page": 2})
+    almacen.agregar("p2", OTRO, {"source": "normas.pdf", "page": 3})
+    almacen.guardar()
+    return almacen
+
+def test_almacen_persiste_y_lee_por_id(almacen, tmp_path):
+    releido = AlmacenPadres(str(tmp_path))
+    assert len(releido) == 2 and "p1" in releido
+    padre = releido.obtener("p1")
+    assert (padre.id, padre.page_content, padre.metadata["page"]) == ("p1", PADRE, 2)
+    assert releido.obtener("desconocido") is None
+
+def test_almacen_aplica_cambios_pendientes_al_guardar(almacen, tmp_path):
+    almacen.eliminar(["p2"])
+    almacen.agregar("p3", "Texto nuevo con tildes: áéíóú", {"page": 4})
+    assert "p2" not in almacen and almacen.obtener("p3").page_content == "Texto nuevo con tildes: áéíóú"
+    almacen.guardar()
+    releido = AlmacenPadres(str(tmp_path))
+    assert sorted(id_padre for id_padre in ("p1", "p2", "p3") if id_padre in releido) == ["p1", "p3"]
+    assert releido.obtener("p3").page_content == "Texto nuevo con tildes: áéíóú"
+
+def test_expandir_agrupa_hermanos_en_su_padre(almacen):
+    hijos = [_hijo(PADRE[:60], "p1", 0.9), _hijo(OTRO[:40], "p2", 0.7), _hijo(PADRE[60:120], "p1", 0.4)]
+    expandidos = expandir_padres(hijos, almacen, presupuesto=1_000)
+    assert [doc.id for doc in expandidos] == ["p1", "p2"]
+    assert expandidos[0].metadata["hijos"] == 2
+    assert expandidos[0].metadata["relevance_score"] == 0.9
+    assert expandidos[1].metadata["puntuacion_densa"] == 0.7
+
+def test_expandir_respeta_el_presupuesto(almacen):
+    hijos = [_hijo(PADRE[:60], "p1"), _hijo(OTRO[:40], "p2")]
+    presupuesto = estimar_tokens(PADRE) + estimar_tokens(OTRO[:40])
+    expandidos = expandir_padres(hijos, almacen, presupuesto=presupuesto)
+    assert [doc.page_content for doc in expandidos] == [PADRE, OTRO[:40]]
+
+def test_expandir_usa_el_padre_si_no_cuesta_mas_que_los_hijos(almacen):
+    hijos = [_hijo(OTRO[:40], "p2"), _hijo(OTRO[40:], "p2")]
+    assert [doc.id for doc in expandir_padres(hijos, almacen, presupuesto=0)] == ["p2"]
+
+def test_expandir_conserva_hijos_sin_padre(almacen):
+    sueltos = [_hijo("Fragmento sin padre"), _hijo("Padre desaparecido", "p9")]
+    assert expandir_padres(sueltos, almacen, presupuesto=1_000) == sueltos
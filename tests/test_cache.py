@@ -0,0 +1,87 @@
+import time
+import pytest
+from services.cache import CacheLRU, CacheSemantica, CacheVersionada, EmbeddingsCacheadas
+
+class EmbeddingsContadas:
+    def __init__(self):
+        self.llamadas = 0
+
+    def embed_query(self, texto: str) -> list:
+        self.llamadas += 1
+        return [float(len(texto)), 1.0]
+
+    def embed_documents(self, textos: list) -> list:
+        return [self.embed_query(texto) for texto in textos]
+
+@pytest.fixture(params=["memoria", "sqlite"])
+def ruta(request, tmp_path):
+    return str(tmp_path / "cache.sqlite") if request.param == "sqlite" else None
+
+def test_lru_expulsa_la_menos_usada():
+    cache = CacheLRU(2)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    cache.obtener("a")
+    cache.guardar("c", 3)
+    assert [clave for clave, _ in cache.elementos()] == ["a", "c"]
+
+def test_lru_caduca_por_ttl():
+    cache = CacheLRU(2, ttl_segundos=0.05)
+    cache.guardar("a", 1)
+    time.sleep(0.1)
+    assert cache.obtener("a") is None
+    assert len(cache) == 0
+
+def test_versionada_se_invalida_al_cambiar_la_version(ruta):
+    cache = CacheVersionada("prueba", 10, ruta)
+    cache.guardar("clave", {"valor": 1}, "v1")
+    assert cache.obtener("clave", "v1") == {"valor": 1}
+    assert cache.obtener("clave", "v2") is None
+    assert cache.obtener("clave", "v1") is None
+
+def test_versionada_comparte_entradas_entre_instancias(tmp_path):
+    ruta = str(tmp_path / "cache.sqlite")
+    CacheVersionada("prueba", 10, ruta).guardar("clave", {"valor": 1}, "v1")
+    otra = CacheVersionada("prueba", 10, ruta)
+    assert otra.obtener("clave", "v1") == {"valor": 1}
+    assert [clave for clave, _ in otra.elementos("v1")] == ["clave"]
+    assert otra.obtener("clave", "v2") is None
+    assert CacheVersionada("prueba", 10, ruta).obtener("clave", "v1") is None
+
+def test_versionada_respeta_la_capacidad_en_disco(tmp_path):
+    ruta = str(tmp_path / "cache.sqlite")
+    cache = CacheVersionada("prueba", 2, ruta)
+    for clave in ("a", "b", "c"):
+        cache.guardar(clave, clave, "v1")
+        time.sleep(0.01)
+    assert sorted(clave for clave, _ in CacheVersionada("prueba", 2, ruta).elementos("v1")) == ["b", "c"]
+
+@pytest.mark.parametrize("vector, acierta", [
+    ([1.0, 0.0, 0.0], True),
+    ([0.99, 0.05, 0.0], True),
+    ([0.0, 1.0, 0.0], False),
+])
+def test_semantica_acierta_por_similitud(ruta, vector, acierta):
+    cache = CacheSemantica(10, None, 0.95, ruta)
+    cache.guardar("¿Cuándo empiezan las clases?", [2.0, 0.0, 0.0], "El 15 de septiembre.", ["calendario.pdf"], "calendario", "v1")
+    acierto = cache.buscar(vector, "v1")
+    assert (acierto is not None) == acierta
+    if acierta:
+        assert acierto["respuesta"] == "El 15 de septiembre."
+        assert acierto["referencias"] == ["calendario.pdf"]
+        assert acierto["similitud"] >= 0.95
+
+def test_semantica_se_invalida_con_una_nueva_version_del_corpus(ruta):
+    cache = CacheSemantica(10, None, 0.95, ruta)
+    cache.guardar("¿Cuándo empiezan las clases?", [1.0, 0.0], "El 15 de septiembre.", [], "calendario", "v1")
+    assert cache.buscar([1.0, 0.0], "v2") is None
+    assert cache.buscar([1.0, 0.0], "v1") is None
+
+def test_embeddings_cacheadas_por_texto_normalizado_y_version():
+    base, version = EmbeddingsContadas(), ["v1"]
+    embeddings = EmbeddingsCacheadas(base, CacheVersionada("embeddings", 10), lambda: version[0])
+    assert embeddings.embed_query("¿Cuándo empiezan?") == embeddings.embed_query("¿cuando EMPIEZAN?")
+    assert base.llamadas == 1
+    version[0] = "v2"
+    embeddings.embed_query("¿Cuándo empiezan?")
+    assert base.llamadas == 2
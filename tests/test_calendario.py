@@ -0,0 +1,83 @@
+import os
+import pytest
+from services.calendario import AlmacenCalendario, _buscar_fechas, _interpretar, extraer_eventos_pdf, guardar_calendario
+
+RUTA_PDF = os.path.join(os.path.dirname(__file__), "..", "Documentos_US", "calendario-academico-2025-2026-cg.pdf")
+
+@pytest.fixture(scope="module")
+def eventos():
+    return extraer_eventos_pdf(RUTA_PDF, {2025, 2026})
+
+@pytest.fixture(scope="module")
+def almacen(eventos, tmp_path_factory):
+    ruta = str(tmp_path_factory.mktemp("calendario") / "calendario.json")
+    guardar_calendario(ruta, eventos, {})
+    return AlmacenCalendario(ruta)
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("El plazo de matrícula será del 14 al 25 de julio de 2025.", [("rango", "2025-07-14", "2025-07-25")]),
+    ("del 22 de diciembre de 2025 al 7 de enero de 2026", [("rango", "2025-12-22", "2026-01-07")]),
+    ("entre el 3 de noviembre y el 7 de noviembre de 2025", [("rango", "2025-11-03", "2025-11-07")]),
+    ("Solicitudes hasta el 30 de septiembre de 2025", [("limite", None, "2025-09-30")]),
+    ("antes del 5 de mayo de 2026", [("limite", None, "2026-05-05")]),
+    ("antes de las 14:00 h del 5 de mayo de 2026", [("limite", None, "2026-05-05")]),
+    ("con anterioridad al 2 de junio de 2026", [("limite", None, "2026-06-02")]),
+    ("A partir del 1 (L) de octubre de 2025 se abre el plazo", [("inicio", "2025-10-01", None)]),
+    ("desde el 3 de marzo de 2026", [("inicio", "2026-03-03", None)]),
+    ("Inicio de las clases: 15 (L) de septiembre de 2025", [("dia", "2025-09-15", "2025-09-15")]),
+    ("Fin del periodo: 20 de febrero de 202 6", [("dia", "2026-02-20", "2026-02-20")]),
+    ("según la Ley 4/2007, de 12 de abril de 2007", []),
+    ("el 30 de febrero de 2026", [("dia", None, None)]),
+    ("Sin fechas en este texto", []),
+])
+def test_buscar_fechas(texto, esperado):
+    encontradas = [(tipo, *_interpretar(tipo, grupos)[:2]) for _, _, tipo, grupos in _buscar_fechas(texto)]
+    assert encontradas == esperado
+
+def test_buscar_fechas_no_solapa_coincidencias():
+    texto = "Matrícula del 1 al 10 de julio de 2025 y reclamaciones hasta el 15 de julio de 2025"
+    encontradas = _buscar_fechas(texto)
+    assert [tipo for _, _, tipo, _ in encontradas] == ["rango", "limite"]
+    assert all(fin <= inicio for (_, fin, _, _), (inicio, _, _, _) in zip(encontradas, encontradas[1:]))
+
+@pytest.mark.parametrize("tipo, grupos, esperado", [
+    ("rango", ("14", None, None, "25", "julio", "2025"), ("2025-07-14", "2025-07-25", "2025")),
+    ("rango", ("22", "diciembre", "2025", "7", "enero", "2026"), ("2025-12-22", "2026-01-07", "2025")),
+    ("rango", ("22", "diciembre", None, "7", "enero", "2026"), ("2025-12-22", "2026-01-07", "2026")),
+    ("rango", ("29", None, None, "11", "julio", "2026"), ("2026-07-29", "2026-07-11", "2026")),
+    ("limite", ("30", "septiembre", "2025"), (None, "2025-09-30", "2025")),
+    ("inicio", ("1", "octubre", "2025"), ("2025-10-01", None, "2025")),
+    ("dia", ("15", "Septiembre", "202 5"), ("2025-09-15", "2025-09-15", "202 5")),
+    ("dia", ("15", "septiembre", None), (None, None, None)),
+])
+def test_interpretar(tipo, grupos, esperado):
+    assert _interpretar(tipo, grupos) == esperado
+
+def test_extraccion_separa_cabeceras_y_filas(eventos):
+    clases = {(evento["inicio"], evento["fin"]): evento["descripcion"] for evento in eventos if evento["seccion"] == "Periodos de clases"}
+    assert clases[("2025-09-08", "2025-12-19")] == "TÍTULOS DE GRADO, Primer cuatrimestre"
+    assert clases[("2026-01-26", "2026-05-22")] == "TÍTULOS DE GRADO, Segundo cuatrimestre, Caso general"
+    assert clases[("2026-02-12", "2026-06-10")] == "TÍTULOS DE MÁSTER, Segundo cuatrimestre"
+    examenes = [evento for evento in eventos if evento["seccion"] == "Períodos de realización de exámenes finales" and evento["page"] == 5]
+    assert examenes[0]["descripcion"] == "TERCERA Todas las asignaturas"
+    assert [evento["descripcion"] for evento in examenes[1:4]] == ["PRIMERA Asignaturas anuales"] * 3
+    assert all(evento["inicio"] <= evento["fin"] for evento in eventos if evento["inicio"] and evento["fin"])
+
+@pytest.mark.parametrize("pregunta, esperados", [
+    ("¿Cuándo termina el segundo cuatrimestre?", {("2026-01-26", "2026-05-22"), ("2026-01-19", "2026-05-15"), ("2026-02-12", "2026-06-10")}),
+    ("¿Cuándo empieza el primer cuatrimestre en el grado?", {("2025-09-08", "2025-12-19")}),
+    ("¿Cuándo empiezan las clases del 2º cuatrimestre en el máster?", {("2026-02-12", "2026-06-10")}),
+    ("¿Cuándo es la Semana Santa?", {("2026-03-29", "2026-04-05")}),
+    ("¿Cuándo es la segunda convocatoria de las asignaturas del primer cuatrimestre en el máster?", {(None, "2026-07-31")}),
+])
+def test_buscar_responde_preguntas_reales(almacen, pregunta, esperados):
+    candidatos, confianza = almacen.buscar(pregunta)
+    assert {(evento["inicio"], evento["fin"]) for evento in candidatos} == esperados
+    assert confianza >= almacen.umbral
+
+@pytest.mark.parametrize("pregunta", [
+    "¿Cuándo me liquidan el viaje?",
+    "¿Cuándo son los exámenes del primer cuatrimestre?",
+])
+def test_buscar_se_abstiene_sin_respuesta_clara(almacen, pregunta):
+    assert almacen.buscar(pregunta)[0] == []
@@ -0,0 +1,69 @@
+import pytest
+from langchain_core.documents import Document
+from services.contexto import deduplicar, fusionar_fragmentos, recortar_contexto
+from utils.texto import estimar_tokens
+
+PAGINA = (
+    "Artículo 12. Anulación de matrícula. El estudiante podrá solicitar la anulación de su matrícula "
+    "hasta el 31 de octubre. La anulación conlleva la devolución de los precios públicos abonados. "
+    "Artículo 13. Modificación de matrícula. Se podrá ampliar la matrícula en el mes de febrero."
+)
+
+def _fragmento(inicio: int, fin: int, source: str = "normas.pdf", page: int = 3, con_inicio: bool = True) -> Document:
+    return Document(page_content=PAGINA[inicio:fin], metadata={"source": source, "page": page, "inicio": inicio if con_inicio else -1})
+
+@pytest.mark.parametrize("fragmentos, esperados", [
+    ([(0, 120), (90, 200)], [PAGINA[0:200]]),
+    ([(90, 200), (0, 120)], [PAGINA[0:200]]),
+    ([(0, 100), (101, 200)], [PAGINA[0:100] + "\n" + PAGINA[101:200]]),
+    ([(0, 100), (150, 200)], [PAGINA[0:100], PAGINA[150:200]]),
+    ([(0, 200), (50, 120)], [PAGINA[0:200]]),
+    ([(0, 120), (150, 260), (100, 170)], [PAGINA[0:260]]),
+])
+def test_fusionar_por_posicion(fragmentos, esperados):
+    docs = fusionar_fragmentos([_fragmento(inicio, fin) for inicio, fin in fragmentos])
+    assert [doc.page_content for doc in docs] == esperados
+
+def test_fusionar_por_texto_solapado_sin_posicion():
+    docs = fusionar_fragmentos([_fragmento(0, 120, con_inicio=False), _fragmento(80, 200, con_inicio=False)])
+    assert [doc.page_content for doc in docs] == [PAGINA[0:200]]
+
+def test_no_fusiona_solapamientos_cortos_sin_posicion():
+    docs = fusionar_fragmentos([_fragmento(0, 100, con_inicio=False), _fragmento(90, 200, con_inicio=False)])
+    assert len(docs) == 2
+
+@pytest.mark.parametrize("otro", [
+    {"page": 4},
+    {"source": "otro.pdf"},
+])
+def test_no_fusiona_otras_paginas_o_documentos(otro):
+    docs = fusionar_fragmentos([_fragmento(0, 120), _fragmento(90, 200, **otro)])
+    assert len(docs) == 2
+
+def test_fusion_conserva_el_orden_del_primero():
+    docs = fusionar_fragmentos([_fragmento(0, 50, page=1), _fragmento(0, 120), _fragmento(90, 200)])
+    assert [doc.metadata["page"] for doc in docs] == [1, 3]
+    assert docs[1].metadata["inicio"] == 0
+
+def test_deduplicar_casi_identicos():
+    original = Document(page_content=PAGINA)
+    casi_igual = Document(page_content=PAGINA.replace("febrero", "marzo"))
+    distinto = Document(page_content="Las dietas por alojamiento se abonan según el grupo del personal desplazado.")
+    assert deduplicar([original, casi_igual, distinto], 0.8) == [original, distinto]
+
+def test_recortar_no_toca_contexto_dentro_del_presupuesto():
+    assert recortar_contexto(PAGINA, "anulación", estimar_tokens(PAGINA)) == PAGINA
+    assert recortar_contexto("", "anulación", 10) == ""
+
+@pytest.mark.parametrize("presupuesto", [20, 40, 60])
+def test_recortar_respeta_presupuesto(presupuesto):
+    contexto = "\n\n".join([PAGINA, "Las dietas por alojamiento se abonan según el grupo. El kilometraje se liquida aparte."])
+    recortado = recortar_contexto(contexto, "¿Cuándo puedo solicitar la anulación de matrícula?", presupuesto)
+    assert estimar_tokens(recortado) <= presupuesto + 2
+    assert "anulación" in recortado.lower()
+
+def test_recortar_mantiene_el_orden_original():
+    contexto = "Primera frase sobre dietas y alojamiento. Segunda frase sobre la anulación de matrícula. Tercera frase sobre la anulación parcial."
+    recortado = recortar_contexto(contexto, "anulación de matrícula", 25)
+    assert recortado.index("Segunda") < recortado.index("Tercera")
+    assert "dietas" not in recortado
@@ -0,0 +1,81 @@
+import pytest
+from services.historial import CABECERA_RESUMEN, GestorHistorial, formatear_historial, limpiar_mensaje, recortar_historial
+from utils.texto import estimar_tokens
+
+def _conversacion(turnos: int) -> list:
+    mensajes = []
+    for turno in range(turnos):
+        mensajes.append({"role": "user", "content": f"Pregunta {turno}"})
+        mensajes.append({"role": "assistant", "content": f"Respuesta {turno}\n\n**Fuentes consultadas**\n- normas.pdf"})
+    return mensajes + [{"role": "user", "content": f"Pregunta {turnos}"}]
+
+class Resumidor:
+    def __init__(self):
+        self.llamadas = []
+
+    def __call__(self, entradas: dict) -> str:
+        self.llamadas.append(entradas)
+        return f" resumen de {entradas['mensajes'].count('user:')} preguntas "
+
+def test_limpiar_mensaje_quita_las_fuentes():
+    assert limpiar_mensaje("Respuesta\n\n**Fuentes consultadas**\n- a.pdf") == "Respuesta"
+    assert limpiar_mensaje(None) == ""
+
+def test_formatear_conserva_solo_los_turnos_recientes():
+    formateado = formatear_historial(_conversacion(5), turnos_recientes=2)
+    assert formateado.split("\n") == [
+        "user: Pregunta 3", "assistant: Respuesta 3", "user: Pregunta 4", "assistant: Respuesta 4", "user: Pregunta 5"
+    ]
+
+def test_formatear_antepone_el_resumen():
+    formateado = formatear_historial(_conversacion(1), "habló de becas", turnos_recientes=2)
+    assert formateado.split("\n")[0] == f"{CABECERA_RESUMEN} habló de becas"
+    assert formatear_historial([], "habló de becas") == ""
+
+def test_recortar_no_toca_historial_dentro_del_presupuesto():
+    formateado = formatear_historial(_conversacion(2), turnos_recientes=3)
+    assert recortar_historial(formateado, estimar_tokens(formateado)) == formateado
+    assert recortar_historial("", 10) == ""
+
+@pytest.mark.parametrize("presupuesto", [5, 12, 20, 40])
+def test_recortar_prioriza_los_mensajes_mas_recientes(presupuesto):
+    formateado = formatear_historial(_conversacion(4), "el estudiante cursa el máster", turnos_recientes=4)
+    recortado = recortar_historial(formateado, presupuesto)
+    assert estimar_tokens(recortado) <= presupuesto
+    assert recortado.endswith("Pregunta 4")
+    assert formateado.endswith(recortado) or recortado.startswith(CABECERA_RESUMEN)
+
+def test_recortar_conserva_el_resumen_si_queda_sitio():
+    formateado = f"{CABECERA_RESUMEN} máster\nuser: {'¿Qué plazos hay? ' * 20}\nassistant: Hasta octubre.\nuser: ¿Y para anular?"
+    assert recortar_historial(formateado, 30) == f"{CABECERA_RESUMEN} máster\nassistant: Hasta octubre.\nuser: ¿Y para anular?"
+    assert not recortar_historial(formateado, 12).startswith(CABECERA_RESUMEN)
+
+def test_recortar_conserva_mensajes_multilinea_completos():
+    formateado = "user: Pregunta larga\ncon dos líneas\nassistant: Respuesta\nuser: ¿Y la otra?"
+    assert recortar_historial(formateado, 10) == "assistant: Respuesta\nuser: ¿Y la otra?"
+
+def test_gestor_no_resume_conversaciones_cortas():
+    resumidor = Resumidor()
+    formateado, resumen, resumidos = GestorHistorial(resumidor, turnos_recientes=3).preparar(_conversacion(2))
+    assert resumidor.llamadas == []
+    assert (resumen, resumidos) == ("", 0)
+    assert formateado == formatear_historial(_conversacion(2), turnos_recientes=3)
+
+def test_gestor_resume_solo_los_mensajes_nuevos():
+    resumidor = Resumidor()
+    gestor = GestorHistorial(resumidor, turnos_recientes=1)
+
+    formateado, resumen, resumidos = gestor.preparar(_conversacion(3))
+    assert resumidos == 4
+    assert resumen == "resumen de 2 preguntas"
+    assert resumidor.llamadas[0]["resumen"] == "(sin resumen previo)"
+    assert "Fuentes consultadas" not in resumidor.llamadas[0]["mensajes"]
+    assert formateado.startswith(f"{CABECERA_RESUMEN} resumen de 2 preguntas")
+
+    assert gestor.preparar(_conversacion(3), resumen, resumidos)[1:] == (resumen, resumidos)
+    assert len(resumidor.llamadas) == 1
+
+    _, _, resumidos = gestor.preparar(_conversacion(4), resumen, resumidos)
+    assert resumidos == 6
+    assert resumidor.llamadas[1]["resumen"] == "resumen de 2 preguntas"
+    assert resumidor.llamadas[1]["mensajes"] == "user: Pregunta 2\nassistant: Respuesta 2"
@@ -0,0 +1,109 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from services.almacen_padres import AlmacenPadres
+from services.indice_lexico import IndiceBM25
+from services.indice_local import IndiceLocal
+from services.ingesta import _id_fragmento, ingestar, leer_manifiesto
+from utils.config import settings
+
+DOCUMENTOS = os.path.join(os.path.dirname(__file__), "..", "Documentos_US")
+GUIA = "guia-breve-liquidacion.pdf"
+NORMATIVA = "NORMATIVA REGUL.pdf"
+
+class EmbeddingsDeterministas:
+    def embed_documents(self, textos: list) -> list:
+        return [self.embed_query(texto) for texto in textos]
+
+    def embed_query(self, texto: str) -> list:
+        return np.random.default_rng(len(texto)).random(8).tolist()
+
+@pytest.fixture
+def entorno(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INDICE_PADRES", False)
+    monkeypatch.setattr(settings, "PAGINAS_POR_TAREA", 2)
+    pdfs = tmp_path / "pdfs"
+    pdfs.mkdir()
+    for nombre in (GUIA, NORMATIVA):
+        shutil.copy(os.path.join(DOCUMENTOS, nombre), pdfs / nombre)
+
+    def ingestar_en(**opciones):
+        vectorstore = IndiceLocal(EmbeddingsDeterministas(), str(tmp_path / "indice"))
+        lexico = IndiceBM25(str(tmp_path / "lexico.json"))
+        padres = AlmacenPadres(str(tmp_path / "padres"))
+        resumen = ingestar(vectorstore, str(pdfs), str(tmp_path / "manifiesto.json"), procesos=1, indice_lexico=lexico, almacen_padres=padres, **opciones)
+        return resumen, IndiceLocal(EmbeddingsDeterministas(), str(tmp_path / "indice")), IndiceBM25(str(tmp_path / "lexico.json")), AlmacenPadres(str(tmp_path / "padres"))
+
+    return pdfs, tmp_path / "manifiesto.json", ingestar_en
+
+def test_primera_ingesta_vacia_el_indice_heredado(entorno, tmp_path):
+    _, ruta_manifiesto, ingestar_en = entorno
+    heredado = IndiceLocal(EmbeddingsDeterministas(), str(tmp_path / "indice"))
+    heredado.add_texts(["fragmento antiguo sin metadatos"])
+    heredado.guardar()
+
+    resumen, vectorstore, lexico, _ = ingestar_en()
+    manifiesto = leer_manifiesto(str(ruta_manifiesto))
+    ids = [id_fragmento for datos in manifiesto["archivos"].values() for id_fragmento in datos["fragmentos"]]
+    assert sorted(resumen["archivos_procesados"]) == sorted([GUIA, NORMATIVA])
+    assert resumen["fragmentos_subidos"] == len(ids) == len(set(ids))
+    assert sorted(vectorstore._ids) == sorted(ids)
+    assert len(lexico) == len(ids)
+    assert "fragmento antiguo sin metadatos" not in vectorstore._textos
+
+def test_los_ids_dependen_del_contenido(entorno):
+    _, _, ingestar_en = entorno
+    _, vectorstore, _, _ = ingestar_en()
+    for id_doc, texto, metadatos in zip(vectorstore._ids, vectorstore._textos, vectorstore._metadatos):
+        assert id_doc == metadatos["id_fragmento"] == _id_fragmento(metadatos["source"], metadatos["page"], texto)
+        assert {"familia", "tipo_documento", "curso"} <= set(metadatos)
+
+def test_reingesta_sin_cambios_no_sube_nada(entorno):
+    _, _, ingestar_en = entorno
+    primera, _, _, _ = ingestar_en()
+    segunda, vectorstore, _, _ = ingestar_en()
+    assert segunda["archivos_procesados"] == []
+    assert segunda["fragmentos_subidos"] == segunda["fragmentos_eliminados"] == 0
+    assert segunda["version_corpus"] == primera["version_corpus"]
+    assert len(vectorstore._ids) == primera["fragmentos_subidos"]
+
+def test_eliminar_un_pdf_borra_sus_fragmentos(entorno):
+    pdfs, ruta_manifiesto, ingestar_en = entorno
+    primera, _, _, _ = ingestar_en()
+    eliminados = leer_manifiesto(str(ruta_manifiesto))["archivos"][GUIA]["fragmentos"]
+    os.remove(pdfs / GUIA)
+
+    segunda, vectorstore, lexico, _ = ingestar_en()
+    assert segunda["fragmentos_eliminados"] == len(eliminados)
+    assert segunda["version_corpus"] != primera["version_corpus"]
+    assert not set(eliminados) & set(vectorstore._ids)
+    assert {metadatos["source"] for metadatos in vectorstore._metadatos} == {NORMATIVA}
+    assert len(lexico) == len(vectorstore._ids)
+
+def test_modificar_un_pdf_solo_reprocesa_ese_archivo(entorno):
+    pdfs, ruta_manifiesto, ingestar_en = entorno
+    ingestar_en()
+    anteriores = set(leer_manifiesto(str(ruta_manifiesto))["archivos"][GUIA]["fragmentos"])
+    shutil.copy(os.path.join(DOCUMENTOS, "Miniguía viajes personal externo US.pdf"), pdfs / GUIA)
+
+    resumen, vectorstore, _, _ = ingestar_en()
+    nuevos = set(leer_manifiesto(str(ruta_manifiesto))["archivos"][GUIA]["fragmentos"])
+    assert resumen["archivos_procesados"] == [GUIA]
+    assert resumen["fragmentos_subidos"] == len(nuevos - anteriores)
+    assert resumen["fragmentos_eliminados"] == len(anteriores - nuevos)
+    assert nuevos <= set(vectorstore._ids)
+
+def test_indice_de_padres_enlaza_cada_fragmento_con_su_padre(entorno, monkeypatch):
+    _, ruta_manifiesto, ingestar_en = entorno
+    ingestar_en()
+    monkeypatch.setattr(settings, "INDICE_PADRES", True)
+
+    resumen, vectorstore, _, padres = ingestar_en()
+    assert sorted(resumen["archivos_procesados"]) == sorted([GUIA, NORMATIVA])
+    assert leer_manifiesto(str(ruta_manifiesto))["indice_padres"] is True
+    for id_doc, texto, metadatos in zip(vectorstore._ids, vectorstore._textos, vectorstore._metadatos):
+        padre = padres.obtener(metadatos["id_padre"])
+        assert padre is not None and texto in padre.page_content
+        assert id_doc == _id_fragmento(metadatos["source"], metadatos["page"], texto, metadatos["id_padre"])
+    assert len(padres) == len({metadatos["id_padre"] for metadatos in vectorstore._metadatos})
@@ -0,0 +1,124 @@
+import threading
+import time
+import pytest
+from langchain_core.documents import Document
+from langchain_core.documents.compressor import BaseDocumentCompressor
+from services.lotes import AgrupadorLotes, EmbeddingsAgrupadas, ReordenadorAgrupado, agrupar_embeddings, agrupar_reordenador, metricas_lotes
+
+class EmbeddingsRegistradas:
+    def __init__(self):
+        self.lotes = []
+
+    def embed_documents(self, textos: list) -> list:
+        self.lotes.append(list(textos))
+        return [[float(len(texto))] for texto in textos]
+
+    def embed_query(self, texto: str) -> list:
+        return self.embed_documents([texto])[0]
+
+
+class ReordenadorInverso(BaseDocumentCompressor):
+    lotes: list = []
+
+    def reordenar_lote(self, peticiones: list) -> list:
+        self.lotes.append(len(peticiones))
+        return [list(reversed(documentos)) for _, documentos in peticiones]
+
+    def compress_documents(self, documents, query, callbacks=None):
+        return self.reordenar_lote([(query, list(documents))])[0]
+
+
+def _en_paralelo(funcion, argumentos: list) -> list:
+    resultados = [None] * len(argumentos)
+
+    def llamar(indice, argumento):
+        resultados[indice] = funcion(argumento)
+
+    hilos = [threading.Thread(target=llamar, args=(indice, argumento)) for indice, argumento in enumerate(argumentos)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
+
+def test_agrupa_peticiones_concurrentes_en_un_lote():
+    lotes = []
+    agrupador = AgrupadorLotes("prueba_ventana", lambda peticiones: lotes.append(peticiones) or [p * 2 for p in peticiones], 0.1, 8)
+    assert _en_paralelo(agrupador.enviar, [1, 2, 3, 4]) == [2, 4, 6, 8]
+    assert len(lotes) == 1
+    assert sorted(lotes[0]) == [1, 2, 3, 4]
+    assert agrupador.metricas()["tamanos"] == {4: 1}
+
+def test_respeta_el_tamano_maximo():
+    agrupador = AgrupadorLotes("prueba_maximo", lambda peticiones: peticiones, 0.1, 2)
+    assert sorted(_en_paralelo(agrupador.enviar, list(range(5)))) == list(range(5))
+    metricas = agrupador.metricas()
+    assert max(metricas["tamanos"]) <= 2
+    assert metricas["peticiones"] == 5
+    assert metricas["lotes"] >= 3
+
+def test_sin_concurrencia_no_espera_mas_que_la_ventana():
+    agrupador = AgrupadorLotes("prueba_sola", lambda peticiones: peticiones, 0.02, 8)
+    inicio = time.monotonic()
+    assert agrupador.enviar("a") == "a"
+    assert time.monotonic() - inicio < 0.5
+    assert agrupador.metricas()["tamano_medio"] == 1.0
+
+def test_propaga_los_errores_a_todo_el_lote():
+    def fallar(peticiones):
+        raise ValueError("proveedor caído")
+
+    agrupador = AgrupadorLotes("prueba_error", fallar, 0.05, 8)
+    errores = _en_paralelo(lambda peticion: pytest.raises(ValueError, agrupador.enviar, peticion), [1, 2])
+    assert all(error.match("proveedor caído") for error in errores)
+    assert agrupador.metricas()["errores"] >= 1
+
+def test_detecta_resultados_incompletos():
+    agrupador = AgrupadorLotes("prueba_incompleto", lambda peticiones: peticiones[:-1], 0.0, 8)
+    with pytest.raises(RuntimeError, match="devolvió 0 resultados para 1"):
+        agrupador.enviar("a")
+
+def test_expira_y_no_procesa_la_peticion_cancelada():
+    procesadas, liberar = [], threading.Event()
+
+    def lento(peticiones):
+        liberar.wait(1.0)
+        procesadas.extend(peticiones)
+        return peticiones
+
+    agrupador = AgrupadorLotes("prueba_espera", lento, 0.0, 1, tiempo_espera=0.05)
+    primera = threading.Thread(target=lambda: pytest.raises(TimeoutError, agrupador.enviar, "primera"))
+    primera.start()
+    time.sleep(0.01)
+    with pytest.raises(TimeoutError, match="Sin respuesta del lote de prueba_espera tras 0.05s"):
+        agrupador.enviar("segunda")
+    liberar.set()
+    primera.join()
+    time.sleep(0.05)
+    assert procesadas == ["primera"]
+
+def test_embeddings_agrupadas_solo_agrupan_consultas():
+    base = EmbeddingsRegistradas()
+    embeddings = EmbeddingsAgrupadas(base, 0.1, 8, nombre="prueba_embeddings")
+    assert embeddings.embed_documents(["uno", "dos"]) == [[3.0], [3.0]]
+    assert _en_paralelo(embeddings.embed_query, ["a", "bb", "ccc"]) == [[1.0], [2.0], [3.0]]
+    assert [sorted(lote) for lote in base.lotes] == [["dos", "uno"], ["a", "bb", "ccc"]]
+    assert "prueba_embeddings" in metricas_lotes()
+
+def test_reordenador_agrupado_devuelve_cada_resultado_a_su_consulta():
+    base = ReordenadorInverso(lotes=[])
+    reordenador = ReordenadorAgrupado(base=base, ventana=0.1, tamano_maximo=8, nombre="prueba_reordenador")
+    consultas = {consulta: [Document(page_content=f"{consulta}-{i}") for i in range(3)] for consulta in ("a", "b")}
+    resultados = _en_paralelo(lambda consulta: reordenador.compress_documents(consultas[consulta], consulta), ["a", "b"])
+    assert [[doc.page_content for doc in docs] for docs in resultados] == [["a-2", "a-1", "a-0"], ["b-2", "b-1", "b-0"]]
+    assert base.lotes == [2]
+    assert reordenador.compress_documents([], "a") == []
+
+def test_agrupar_solo_envuelve_cuando_hay_lotes():
+    base = EmbeddingsRegistradas()
+    assert agrupar_embeddings(base, 0.01, 1) is base
+    assert isinstance(agrupar_embeddings(base, 0.01, 4), EmbeddingsAgrupadas)
+
+    reordenador = ReordenadorInverso(lotes=[])
+    assert agrupar_reordenador(reordenador, 0.01, 1) is reordenador
+    assert isinstance(agrupar_reordenador(reordenador, 0.01, 4), ReordenadorAgrupado)
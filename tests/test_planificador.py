@@ -0,0 +1,194 @@
+import asyncio
+import threading
+import time
+import pytest
+from services.planificador import (
+    PRIORIDAD_RESPUESTA, PRIORIDAD_SEGUNDO_PLANO, VENTANA_SEGUNDOS, PlanificadorLLM, PresupuestoCompartido, PresupuestoModelo,
+    es_error_transitorio, es_limite_tasa, prioridad_de,
+)
+
+class ErrorProveedor(Exception):
+    def __init__(self, mensaje: str, status_code: int = None, cabeceras: dict = None):
+        super().__init__(mensaje)
+        self.status_code = status_code
+        self.response = type("Respuesta", (), {"headers": cabeceras or {}})()
+
+def _planificador(rpm: int = 100, tpm: int = 100_000, concurrencia: int = 2, reintentos: int = 3) -> PlanificadorLLM:
+    return PlanificadorLLM({"modelo": {"rpm": rpm, "tpm": tpm}}, concurrencia, reintentos, espera_base=0.01, espera_maxima=0.05)
+
+@pytest.mark.parametrize("nombre, prioridad", [
+    ("respuesta_normativo", PRIORIDAD_RESPUESTA),
+    ("resumen_historial", PRIORIDAD_SEGUNDO_PLANO),
+    ("deteccion", 1),
+])
+def test_prioridad_de(nombre, prioridad):
+    assert prioridad_de(nombre) == prioridad
+
+@pytest.mark.parametrize("error, limite, transitorio", [
+    (ErrorProveedor("Too many requests", 429), True, False),
+    (ErrorProveedor("Rate limit reached for model"), True, False),
+    (ErrorProveedor("Bad gateway", 502), False, True),
+    (TimeoutError(), False, True),
+    (ErrorProveedor("Invalid API key", 401), False, False),
+    (ValueError("formato"), False, False),
+])
+def test_clasificacion_de_errores(error, limite, transitorio):
+    assert es_limite_tasa(error) == limite
+    assert es_error_transitorio(error) == transitorio
+
+def test_presupuesto_limita_peticiones_por_minuto():
+    presupuesto = PresupuestoModelo(rpm=2, tpm=10_000)
+    presupuesto.reservar(10, 100.0)
+    presupuesto.reservar(10, 110.0)
+    assert presupuesto.espera(10, 120.0) == pytest.approx(100.0 + VENTANA_SEGUNDOS - 120.0)
+    assert presupuesto.espera(10, 100.0 + VENTANA_SEGUNDOS) == 0.0
+
+def test_presupuesto_limita_tokens_por_minuto():
+    presupuesto = PresupuestoModelo(rpm=100, tpm=1_000)
+    presupuesto.reservar(600, 100.0)
+    presupuesto.reservar(300, 110.0)
+    assert presupuesto.espera(100, 120.0) == 0.0
+    assert presupuesto.espera(200, 120.0) == pytest.approx(100.0 + VENTANA_SEGUNDOS - 120.0)
+    assert presupuesto.espera(800, 120.0) == pytest.approx(110.0 + VENTANA_SEGUNDOS - 120.0)
+
+def test_presupuesto_respeta_el_bloqueo():
+    presupuesto = PresupuestoModelo(rpm=100, tpm=1_000)
+    presupuesto.bloquear(130.0)
+    assert presupuesto.espera(10, 120.0) == pytest.approx(10.0)
+
+def test_presupuesto_compartido_entre_procesos(tmp_path):
+    ruta = str(tmp_path / "estado.sqlite")
+    ahora = time.time()
+    PresupuestoCompartido("modelo", 1, 10_000, ruta).reservar(10, ahora)
+    otro = PresupuestoCompartido("modelo", 1, 10_000, ruta)
+    assert otro.espera(10, ahora + 1) == pytest.approx(VENTANA_SEGUNDOS - 1)
+    otro.bloquear(ahora + 120)
+    assert PresupuestoCompartido("modelo", 100, 10_000, ruta).espera(10, ahora + 1) == pytest.approx(119)
+
+def test_turno_limita_la_concurrencia():
+    planificador = _planificador(concurrencia=2)
+    activos, maximo, lock = [0], [0], threading.Lock()
+
+    def llamar():
+        with planificador.turno("modelo", 10):
+            with lock:
+                activos[0] += 1
+                maximo[0] = max(maximo[0], activos[0])
+            time.sleep(0.05)
+            with lock:
+                activos[0] -= 1
+
+    hilos = [threading.Thread(target=llamar) for _ in range(6)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert maximo[0] == 2
+    assert planificador.estadisticas["peticiones"] == 6
+
+def test_turno_atiende_primero_la_prioridad_mas_alta():
+    planificador = _planificador(concurrencia=1)
+    orden = []
+
+    def llamar(prioridad: int):
+        with planificador.turno("modelo", 10, prioridad):
+            orden.append(prioridad)
+
+    with planificador.turno("modelo", 10):
+        hilos = [threading.Thread(target=llamar, args=(prioridad,)) for prioridad in (2, 1, 0)]
+        for hilo in hilos:
+            hilo.start()
+            time.sleep(0.02)
+    for hilo in hilos:
+        hilo.join()
+    assert orden == [0, 1, 2]
+
+def test_aturno_despierta_al_liberar_el_turno():
+    planificador = _planificador(concurrencia=1)
+    liberado = []
+
+    def ocupar():
+        with planificador.turno("modelo", 10):
+            time.sleep(0.1)
+            liberado.append(time.monotonic())
+
+    async def esperar():
+        await asyncio.sleep(0.02)
+        async with planificador.aturno("modelo", 10):
+            return time.monotonic()
+
+    hilo = threading.Thread(target=ocupar)
+    hilo.start()
+    obtenido = asyncio.run(esperar())
+    hilo.join()
+    assert 0 <= obtenido - liberado[0] < 0.02
+    assert not planificador._esperas_asincronas
+
+def test_aturno_cancelado_no_bloquea_la_cola():
+    planificador = _planificador(concurrencia=1)
+
+    async def escenario():
+        async with planificador.aturno("modelo", 10):
+            espera = asyncio.create_task(planificador.aturno("modelo", 10).__aenter__())
+            await asyncio.sleep(0.01)
+            espera.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await espera
+        async with planificador.aturno("modelo", 10):
+            return True
+
+    assert asyncio.run(asyncio.wait_for(escenario(), 1.0))
+
+def test_ejecutar_reintenta_limites_de_tasa_con_retry_after():
+    planificador = _planificador()
+    intentos = []
+
+    def llamar(consumo):
+        intentos.append(time.monotonic())
+        if len(intentos) < 3:
+            raise ErrorProveedor("Too many requests", 429, {"retry-after": "0.02"})
+        return "ok"
+
+    assert planificador.ejecutar("modelo", 10, PRIORIDAD_RESPUESTA, llamar) == "ok"
+    assert planificador.estadisticas["limites_tasa"] == 2
+    assert planificador.estadisticas["reintentos"] == 2
+    assert intentos[1] - intentos[0] >= 0.01
+    assert planificador.presupuestos["modelo"].bloqueado_hasta > 0
+
+def test_ejecutar_agota_los_reintentos():
+    planificador = _planificador(reintentos=2)
+    llamadas = []
+
+    def llamar(consumo):
+        llamadas.append(consumo)
+        raise ErrorProveedor("Bad gateway", 502)
+
+    with pytest.raises(ErrorProveedor):
+        planificador.ejecutar("modelo", 10, PRIORIDAD_RESPUESTA, llamar)
+    assert len(llamadas) == 3
+    assert planificador.estadisticas["errores_transitorios"] == 2
+
+def test_ejecutar_no_reintenta_errores_permanentes():
+    planificador = _planificador()
+
+    def llamar(consumo):
+        raise ErrorProveedor("Invalid API key", 401)
+
+    with pytest.raises(ErrorProveedor):
+        planificador.ejecutar("modelo", 10, PRIORIDAD_RESPUESTA, llamar)
+    assert planificador.estadisticas["reintentos"] == 0
+
+def test_aejecutar_reintenta_y_registra_el_uso_real():
+    planificador = _planificador()
+    intentos = []
+
+    async def llamar(consumo):
+        intentos.append(consumo)
+        if len(intentos) == 1:
+            raise ErrorProveedor("Rate limit reached", 429)
+        planificador.registrar_uso(consumo, 42)
+        return "ok"
+
+    assert asyncio.run(planificador.aejecutar("modelo", 500, PRIORIDAD_RESPUESTA, llamar)) == "ok"
+    assert planificador.estadisticas["limites_tasa"] == 1
+    assert intentos[-1][1] == 42
@@ -0,0 +1,78 @@
+import pytest
+from langchain_core.documents import Document
+from services.indice_lexico import IndiceBM25
+from services.recuperacion import RecuperadorHibrido, clave_documento
+from utils.texto import tokenizar
+
+DOCUMENTOS = {
+    "anulacion": ("Anulación de matrícula: el plazo termina el 31 de octubre.", {"familia": "matricula"}),
+    "ampliacion": ("La ampliación de matrícula se solicita en febrero.", {"familia": "matricula"}),
+    "dietas": ("Las dietas de manutención se liquidan tras el viaje.", {"familia": "viajes"}),
+    "creditos": ("El reconocimiento de créditos por experiencia laboral.", {"familia": "reconocimiento"}),
+}
+
+class VectorstoreFijo:
+    def __init__(self, ids: list):
+        self.ids = ids
+
+    def similarity_search_with_score(self, consulta: str, k: int, filter: dict = None):
+        return [
+            (Document(id=id_doc, page_content=DOCUMENTOS[id_doc][0], metadata={"id_fragmento": id_doc, **DOCUMENTOS[id_doc][1]}), 0.9 - 0.1 * posicion)
+            for posicion, id_doc in enumerate(self.ids[:k])
+        ]
+
+def _indice(ruta: str = None) -> IndiceBM25:
+    indice = IndiceBM25(ruta)
+    ids = list(DOCUMENTOS)
+    indice.agregar(ids, [DOCUMENTOS[i][0] for i in ids], [{"id_fragmento": i, **DOCUMENTOS[i][1]} for i in ids])
+    return indice
+
+@pytest.mark.parametrize("texto, tokens", [
+    ("¿Cuándo son los exámenes?", ["examen"]),
+    ("examen", ["examen"]),
+    ("Créditos y crédito", ["credito", "credito"]),
+    ("Solicitudes de anulación", ["solicitud", "anulacion"]),
+    ("Presentar el D.N.I.", ["presentar", "dni"]),
+    ("Plazo hasta el 15/09/2025", ["plazo", "15092025", "15", "09", "2025"]),
+])
+def test_tokenizar(texto, tokens):
+    assert tokenizar(texto) == tokens
+
+@pytest.mark.parametrize("consulta, primero", [
+    ("anulación de la matrícula", "anulacion"),
+    ("ampliaciones de matrícula en febrero", "ampliacion"),
+    ("¿cómo se liquidan las dietas?", "dietas"),
+    ("reconocer crédito por experiencia", "creditos"),
+])
+def test_bm25_ordena_por_relevancia(consulta, primero):
+    resultados = _indice().buscar(consulta, k=2)
+    assert resultados[0][0].id == primero
+    assert resultados[0][1] > (resultados[1][1] if len(resultados) > 1 else 0.0)
+
+def test_bm25_filtra_y_elimina():
+    indice = _indice()
+    assert [doc.id for doc, _ in indice.buscar("matrícula", filtro={"familia": {"$in": ["viajes"]}})] == []
+    indice.eliminar(["anulacion"])
+    assert "anulacion" not in [doc.id for doc, _ in indice.buscar("matrícula")]
+    indice.vaciar()
+    assert len(indice) == 0 and indice.buscar("matrícula") == []
+
+def test_bm25_persiste(tmp_path):
+    ruta = str(tmp_path / "lexico.json")
+    _indice(ruta).guardar()
+    assert [doc.id for doc, _ in IndiceBM25(ruta).buscar("dietas", k=1)] == ["dietas"]
+
+def test_rrf_suma_ambas_listas_y_prefiere_coincidencias():
+    recuperador = RecuperadorHibrido(vectorstore=VectorstoreFijo(["dietas", "anulacion", "ampliacion"]), indice_lexico=_indice(), k_fusion=3)
+    docs = recuperador.invoke("anulación de matrícula")
+    ids = [clave_documento(doc) for doc in docs]
+    assert ids[0] == "anulacion"
+    assert set(ids) <= {"anulacion", "ampliacion", "dietas", "creditos"}
+    assert [doc.metadata["puntuacion_rrf"] for doc in docs] == sorted((doc.metadata["puntuacion_rrf"] for doc in docs), reverse=True)
+    assert docs[0].metadata["puntuacion_rrf"] == pytest.approx(1 / 61 + 1 / 62)
+
+def test_rrf_sin_indice_lexico_conserva_el_orden_denso():
+    recuperador = RecuperadorHibrido(vectorstore=VectorstoreFijo(["dietas", "anulacion"]), indice_lexico=IndiceBM25(), k_fusion=5)
+    docs = recuperador.invoke("anulación")
+    assert [clave_documento(doc) for doc in docs] == ["dietas", "anulacion"]
+    assert docs[0].metadata["puntuacion_densa"] == pytest.approx(0.9)
@@ -0,0 +1,80 @@
+import json
+import os
+import pytest
+from starlette.testclient import TestClient
+from services.rag import asistente_rag
+from services.simulacion import cargar_fixtures, crear_componentes_simulados
+from services.trazas import trazador
+from utils.config import settings
+
+RUTA_FIXTURES = os.path.join(os.path.dirname(__file__), "..", "scripts", "fixtures", "benchmark.json")
+
+def _eventos(texto: str) -> list:
+    eventos = []
+    for bloque in texto.strip().split("\n\n"):
+        lineas = dict(linea.split(": ", 1) for linea in bloque.split("\n"))
+        eventos.append((lineas["event"], json.loads(lineas["data"])))
+    return eventos
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(trazador, "destino", "ninguno")
+    monkeypatch.setattr(trazador, "consola", False)
+    monkeypatch.setattr(settings, "REGISTRAR_DECISIONES", False)
+    componentes = crear_componentes_simulados(
+        cargar_fixtures(RUTA_FIXTURES),
+        latencia_ligero=0.0,
+        latencia_pesado=0.0,
+        latencia_embeddings=0.0,
+        latencia_reordenador=0.0
+    )
+    asistente_rag.reemplazar_componentes(**componentes, faq=None, cache_semantica=None, cache_recuperacion=None, calendario=None)
+    from servidor import app
+    with TestClient(app) as cliente:
+        yield cliente
+    asistente_rag.reemplazar_componentes()
+
+def _consultar(cliente, pregunta: str) -> list:
+    respuesta = cliente.post("/consultas", json={"pregunta": pregunta, "historial": [{"role": "user", "content": pregunta}]})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"].startswith("text/event-stream")
+    return _eventos(respuesta.text)
+
+@pytest.mark.parametrize("pregunta, ruta", [
+    ("¿Cómo anulo la matrícula?", "procedimental"),
+    ("¿Cuántos créditos me pueden reconocer por experiencia laboral?", "normativo"),
+    ("¿Dónde puedo aparcar la moto en el campus?", "rechazo_amable"),
+])
+def test_consulta_emite_eventos_en_orden(cliente, pregunta, ruta):
+    eventos = _consultar(cliente, pregunta)
+    nombres = [nombre for nombre, _ in eventos]
+    assert nombres[0] == "consulta" and nombres[-1] == "fin"
+    assert set(nombres[1:-1]) == {"fragmento"}
+    consulta = eventos[0][1]
+    assert consulta["ruta"] == ruta
+    assert eventos[-1][1]["id_peticion"] == consulta["id_peticion"]
+    assert "".join(datos for nombre, datos in eventos if nombre == "fragmento").strip()
+
+def test_consulta_respeta_el_id_de_peticion(cliente):
+    respuesta = cliente.post("/consultas", json={"pregunta": "¿Cómo anulo la matrícula?", "id_peticion": "prueba-sse"})
+    eventos = _eventos(respuesta.text)
+    assert eventos[0][1]["id_peticion"] == eventos[-1][1]["id_peticion"] == "prueba-sse"
+
+def test_consulta_sin_pregunta_devuelve_400(cliente):
+    respuesta = cliente.post("/consultas", json={"historial": []})
+    assert respuesta.status_code == 400
+    assert respuesta.json() == {"error": "Falta la pregunta"}
+
+def test_errores_se_emiten_como_evento(cliente, monkeypatch):
+    async def fallar(*args, **kwargs):
+        raise RuntimeError("proveedor caído")
+
+    monkeypatch.setattr("servidor.apreparar_consulta", fallar)
+    eventos = _consultar(cliente, "¿Cómo anulo la matrícula?")
+    assert eventos == [("error", {"mensaje": "proveedor caído", "limite_tasa": False})]
+
+def test_salud_y_metricas(cliente):
+    assert cliente.get("/salud").json()["estado"] == "ok"
+    metricas = cliente.get("/metricas").json()
+    assert {"peticiones", "reintentos", "limites_tasa", "errores_transitorios", "espera_cola"} <= set(metricas["planificador"])
+    assert "lotes" in metricas
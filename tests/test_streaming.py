@@ -0,0 +1,73 @@
+import time
+import pytest
+from utils.streaming import generador_directo, generador_por_fotogramas, pautar_stream
+from utils.config import settings
+
+def _stream(fragmentos: list, pausa: float = 0.0, error: Exception = None):
+    for fragmento in fragmentos:
+        if pausa:
+            time.sleep(pausa)
+        yield fragmento
+    if error is not None:
+        raise error
+
+def test_fotogramas_agrupan_fragmentos_rapidos():
+    metricas = {}
+    fotogramas = list(generador_por_fotogramas(_stream([f"{i} " for i in range(50)], pausa=0.002), 10, metricas))
+    assert "".join(fotogramas) == "".join(f"{i} " for i in range(50))
+    assert fotogramas[0] == "0 "
+    assert metricas["fragmentos"] == 50
+    assert metricas["fotogramas"] == len(fotogramas) < 10
+    assert metricas["tiempo_primer_token"] <= metricas["tiempo_total"]
+
+def test_fotogramas_no_retienen_fragmentos_lentos():
+    fotogramas = list(generador_por_fotogramas(_stream(["a", "b", "c"], pausa=0.06), 50))
+    assert fotogramas == ["a", "b", "c"]
+
+def test_fotogramas_respetan_el_ritmo():
+    envios = []
+    for _ in generador_por_fotogramas(_stream(["x"] * 40, pausa=0.003), 20):
+        envios.append(time.perf_counter())
+    intervalos = [b - a for a, b in zip(envios, envios[1:-1])]
+    assert intervalos and min(intervalos) >= 0.045
+
+def test_fotogramas_propagan_errores_tras_lo_recibido():
+    recibido = []
+    with pytest.raises(RuntimeError, match="corte"):
+        for fotograma in generador_por_fotogramas(_stream(["a", "b"], error=RuntimeError("corte")), 30):
+            recibido.append(fotograma)
+    assert "".join(recibido) in ("", "a", "ab")
+
+def test_fotogramas_detienen_el_stream_al_cerrar():
+    consumidos = []
+
+    def infinito():
+        while True:
+            consumidos.append(1)
+            time.sleep(0.005)
+            yield "x"
+
+    fotogramas = generador_por_fotogramas(infinito(), 30)
+    next(fotogramas)
+    fotogramas.close()
+    time.sleep(0.05)
+    total = len(consumidos)
+    time.sleep(0.05)
+    assert len(consumidos) == total
+
+def test_directo_cuenta_cada_fragmento():
+    metricas = {}
+    assert list(generador_directo(_stream(["a", "b", "c"]), metricas)) == ["a", "b", "c"]
+    assert metricas["fragmentos"] == metricas["fotogramas"] == 3
+
+@pytest.mark.parametrize("ritmo, fps, directo", [
+    ("desactivado", 30, True),
+    ("fotogramas", 0, True),
+    ("fotogramas", 30, False),
+])
+def test_pautar_elige_el_generador(monkeypatch, ritmo, fps, directo):
+    monkeypatch.setattr(settings, "RITMO_STREAMING", ritmo)
+    monkeypatch.setattr(settings, "FPS_STREAMING", fps)
+    generador = pautar_stream(_stream(["a"]))
+    assert (generador.gi_code is generador_directo.__code__) == directo
+    assert list(generador) == ["a"]